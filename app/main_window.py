@@ -8,7 +8,13 @@ from tkinter import filedialog, messagebox
 from app import __version__
 from app.progress_window import ProgressWindow
 from service.audio_splitter import split_audio_file
-from utils.config_manager import CONFIG_PATH, load_config
+from service.cancellation import CancellationToken, SplitCancelledError
+from service.concurrency import load_concurrency_settings
+from service.ffmpeg_capabilities import FfmpegCapabilities, discover_capabilities
+from service.output_cache import OutputCache, open_output_cache
+from service.probe_cache import ProbeCache, open_probe_cache
+from service.progress_events import ChunkProgress, ProgressEvent
+from utils.config_manager import CONFIG_PATH, get_config_value, load_config
 
 
 class AudiofilesplitMainWindow:
@@ -26,6 +32,14 @@ class AudiofilesplitMainWindow:
 
         self.progress_window: ProgressWindow | None = None
         self._progress_queue: queue.Queue = queue.Queue()
+        self._probe_cache: ProbeCache | None = None
+        self._output_cache: OutputCache | None = None
+        self._concurrency: tuple[bool, int, int] = (False, 1, os.cpu_count() or 1)
+        self._resume = False
+        self._verify = False
+        self._cancel_token: CancellationToken | None = None
+        self._capabilities: FfmpegCapabilities | None = None
+        self._capabilities_error: Exception | None = None
 
         button_font = ("Yu Gothic UI", font_size)
         button_width = 15
@@ -59,6 +73,25 @@ class AudiofilesplitMainWindow:
         )
         btn_close.pack(pady=button_pady, padx=button_padx)
 
+        self._start_capability_discovery(config)
+
+    def _start_capability_discovery(self, config):
+        """ffmpeg の機能検出を別スレッドで始める(ffmpeg を数回実行するため、GUI のスレッドでは行わない)"""
+        self._capabilities_error = None
+        thread = threading.Thread(
+            target=self._discover_capabilities,
+            args=(open_probe_cache(config),),
+            daemon=True
+        )
+        thread.start()
+
+    def _discover_capabilities(self, probe_cache):
+        """ffmpeg の機能を調べて結果を保持する(結果はプロセス内で再利用されるため、分割時の確認はすぐ終わる)"""
+        try:
+            self._capabilities = discover_capabilities(probe_cache)
+        except Exception as e:
+            self._capabilities_error = e
+
     def _select_file(self, title, filetypes, initialdir):
         """ファイル選択ダイアログを表示"""
         return filedialog.askopenfilename(
@@ -104,6 +137,17 @@ class AudiofilesplitMainWindow:
         target_size_mb = config.getint('Audio', 'target_size_mb')
         output_file_format = config.get('Audio', 'output_file_format')
 
+        # 起動時の検出で ffmpeg が無い・出力形式に対応していないと分かっていれば、ファイルを選ぶ前にエラーにする
+        error = self._capabilities_error
+        if error is not None:
+            # ffmpeg を入れ直した後の次の操作に備えて調べ直す
+            self._start_capability_discovery(config)
+            raise error
+        if self._capabilities is not None:
+            self._capabilities.check_output_format(output_file_format)
+        self._probe_cache = open_probe_cache(config)
+        self._output_cache = open_output_cache(config)
+
         # ファイル選択
         filetypes = [
             ("すべての音声ファイル", "*.mp3 *.m4a *.wav *.mp4"),
@@ -122,9 +166,14 @@ class AudiofilesplitMainWindow:
             os.makedirs(output_path, exist_ok=True)
 
         self._progress_queue = queue.Queue()
+        self._cancel_token = CancellationToken()
         self._show_progress_window()
         self.btn_split_audio.config(state=tk.DISABLED)
 
+        self._concurrency = load_concurrency_settings(config)
+        self._resume = str(get_config_value(config, 'Audio', 'resume_jobs', 'False')).strip().lower() == 'true'
+        self._verify = str(get_config_value(config, 'Audio', 'verify_chunks', 'False')).strip().lower() == 'true'
+
         # 分割処理はGUIをブロックしないよう別スレッドで実行
         thread = threading.Thread(
             target=self._run_split,
@@ -136,7 +185,12 @@ class AudiofilesplitMainWindow:
 
     def _show_progress_window(self):
         """進捗表示ウィンドウを作成"""
-        self.progress_window = ProgressWindow(self.root)
+        self.progress_window = ProgressWindow(self.root, on_cancel=self._cancel_split)
+
+    def _cancel_split(self):
+        """進捗ウィンドウのキャンセルボタンのハンドラ。実行中の ffmpeg を終了させる"""
+        if self._cancel_token is not None:
+            self._cancel_token.cancel()
 
     def _close_progress_window(self):
         """進捗表示ウィンドウを閉じる"""
@@ -146,30 +200,51 @@ class AudiofilesplitMainWindow:
 
     def _run_split(self, file_path, output_dir, target_size_mb, output_format):
         """別スレッドで分割処理を実行。結果はキュー経由でメインスレッドへ通知する"""
+        adaptive, min_workers, max_workers = self._concurrency
         try:
+            # 起動時の検出が終わっていない・ffmpeg が入れ替えられた場合の検出もこのスレッドで行う
+            self._capabilities = discover_capabilities(self._probe_cache)
             split_audio_file(
                 file_path=file_path,
                 output_dir=output_dir,
                 target_chunk_size_mb=target_size_mb,
                 output_format=output_format,
-                progress_callback=self._on_progress
+                progress_callback=self._on_message,
+                event_callback=self._on_progress,
+                probe_cache=self._probe_cache,
+                adaptive_workers=adaptive,
+                min_workers=min_workers,
+                max_workers=max_workers if adaptive else None,
+                resume=self._resume,
+                verify=self._verify,
+                cancel_token=self._cancel_token,
+                capabilities=self._capabilities,
+                output_cache=self._output_cache,
             )
             self._progress_queue.put(('complete', output_dir))
         except Exception as e:
             self._progress_queue.put(('error', e))
 
-    def _on_progress(self, message):
-        """進捗コールバック。root.after を使わずキューに積むだけにする(スレッドセーフ)"""
-        self._progress_queue.put(('progress', message))
+    def _on_message(self, message):
+        """メッセージのコールバック。root.after を使わずキューに積むだけにする(スレッドセーフ)"""
+        self._progress_queue.put(('message', message))
+
+    def _on_progress(self, event: ProgressEvent):
+        """進捗イベントのコールバック。表示に使う ChunkProgress だけをキューに積む(スレッドセーフ)"""
+        if isinstance(event, ChunkProgress):
+            self._progress_queue.put(('progress', event))
 
     def _poll_progress_queue(self):
         """メインスレッドでキューをポーリングし進捗・完了・エラーを処理する"""
         try:
             while True:
                 kind, data = self._progress_queue.get_nowait()
-                if kind == 'progress':
+                if kind == 'message':
                     if self.progress_window is not None:
                         self.progress_window.update_message(data)
+                elif kind == 'progress':
+                    if self.progress_window is not None:
+                        self.progress_window.update_progress(data.percent, data.speed, data.eta_s)
                 elif kind == 'complete':
                     self._on_split_complete(data)
                     return
@@ -191,7 +266,9 @@ class AudiofilesplitMainWindow:
         """分割エラー時の処理"""
         self._close_progress_window()
         self.btn_split_audio.config(state=tk.NORMAL)
-        if isinstance(error, FileNotFoundError):
+        if isinstance(error, SplitCancelledError):
+            messagebox.showinfo("キャンセル", "音声ファイルの分割をキャンセルしました")
+        elif isinstance(error, FileNotFoundError):
             messagebox.showerror("エラー", f"ファイルが見つかりません:\n{str(error)}")
         else:
             messagebox.showerror("エラー", f"変換中にエラーが発生しました:\n{str(error)}")
@@ -1,13 +1,16 @@
 import tkinter as tk
+from collections.abc import Callable
+
+from service.progress import format_progress
 
 
 class ProgressWindow:
     """分割処理中の進捗を表示する Toplevel ウィンドウ"""
 
-    def __init__(self, parent: tk.Tk) -> None:
+    def __init__(self, parent: tk.Tk, on_cancel: Callable[[], None] | None = None) -> None:
         self._window = tk.Toplevel(parent)
         self._window.title("処理中")
-        self._window.geometry("360x100")
+        self._window.geometry("360x150" if on_cancel else "360x120")
         self._window.resizable(False, False)
         self._window.transient(parent)
 
@@ -17,12 +20,45 @@ class ProgressWindow:
             font=("Yu Gothic UI", 9),
             wraplength=340
         )
-        self._label.pack(expand=True, padx=10, pady=10)
+        self._label.pack(expand=True, padx=10, pady=(10, 0))
+
+        self._detail_label = tk.Label(
+            self._window,
+            text="",
+            font=("Yu Gothic UI", 9),
+            wraplength=340
+        )
+        self._detail_label.pack(padx=10, pady=(0, 10))
+
+        self._cancel_button: tk.Button | None = None
+        if on_cancel is not None:
+            self._on_cancel = on_cancel
+            self._cancel_button = tk.Button(
+                self._window,
+                text="キャンセル",
+                font=("Yu Gothic UI", 9),
+                width=10,
+                command=self._cancel
+            )
+            self._cancel_button.pack(pady=(0, 10))
+            # ウィンドウの×ボタンもキャンセル扱いにする
+            self._window.protocol("WM_DELETE_WINDOW", self._cancel)
+
+    def _cancel(self) -> None:
+        """キャンセルを要求し、ボタンを無効化する(ウィンドウは処理の終了後に閉じる)"""
+        if self._cancel_button is not None:
+            self._cancel_button.config(state=tk.DISABLED)
+        self.update_message("キャンセルしています...")
+        self._on_cancel()
 
     def update_message(self, message: str) -> None:
         """ラベルのテキストを更新"""
         self._label.config(text=message)
 
+    def update_progress(self, percent: float, speed: float | None, eta_s: float | None) -> None:
+        """進捗率・処理速度・残り時間の表示を更新"""
+        self._detail_label.config(text=format_progress(percent, speed, eta_s))
+
     def close(self) -> None:
         """ウィンドウを破棄"""
         self._window.destroy()
@@ -0,0 +1,318 @@
+"""
+split_audio_file のベンチマーク
+
+ffmpeg の lavfi ソースで合成した音声(CBR/VBR MP3、m4a の AAC、WAV、映像付き mp4)を
+ローカルに生成し、ストリームコピー/再エンコードと並列数ごとに分割を実行して
+所要時間・実時間比・スループット・ピーク RSS を JSON に書き出す。
+
+    python -m scripts.benchmark --profile quick
+    python -m scripts.benchmark --profile full --workers 1,2,4,8 --output after.json
+    python -m scripts.benchmark --compare before.json after.json
+    python -m scripts.benchmark --startup
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import psutil
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from service.audio_splitter import (
+    _estimate_output_size_mb,
+    _read_native_source,
+    split_audio_file,
+)
+from service.ffmpeg_capabilities import discover_capabilities
+from service.ffmpeg_runner import _can_stream_copy, _probe_audio, _run_command
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_FIXTURE_DIR = PROJECT_ROOT / "cache" / "benchmark"
+
+# 再生時間(分)のプロファイル
+PROFILES = {
+    "quick": [2],
+    "standard": [10, 60],
+    "full": [10, 60, 180],
+}
+
+# 音楽に近いスペクトルにするため、和音にピンクノイズを重ねる(VBR のビットレートが揺れるように)
+_AUDIO_SOURCE = (
+    "aevalsrc=0.3*sin(2*PI*220*t)+0.2*sin(2*PI*277*t)+0.2*sin(2*PI*330*t*(1+0.01*sin(t))):"
+    "s=44100:c=stereo:d={duration}"
+)
+_NOISE_SOURCE = "anoisesrc=color=pink:amplitude=0.1:r=44100:d={duration}"
+
+# fixture 名: (拡張子, エンコード引数, 映像を含むか)
+FIXTURES = {
+    "mp3_cbr": ("mp3", ["-c:a", "libmp3lame", "-b:a", "192k"], False),
+    "mp3_vbr": ("mp3", ["-c:a", "libmp3lame", "-q:a", "2"], False),
+    "aac_m4a": ("m4a", ["-c:a", "aac", "-b:a", "160k"], False),
+    "wav": ("wav", ["-c:a", "pcm_s16le"], False),
+    "mp4_video": ("mp4", ["-c:a", "aac", "-b:a", "128k", "-c:v", "mpeg4", "-q:v", "10"], True),
+}
+
+# 入力の拡張子ごとの分割方式 → 出力形式(ストリームコピーにならない組み合わせは除く)
+STRATEGIES = {
+    "mp3": {"copy": "mp3", "encode": "m4a"},
+    "m4a": {"copy": "m4a", "encode": "mp3"},
+    "mp4": {"copy": "m4a", "encode": "mp3"},
+    "wav": {"encode": "m4a"},
+}
+
+
+def generate_fixture(name: str, duration_min: float, fixture_dir: Path) -> Path:
+    """lavfi で fixture を生成する(同じ名前・長さのファイルがあれば再利用)"""
+    extension, encode_args, with_video = FIXTURES[name]
+    path = fixture_dir / f"{name}_{duration_min:g}min.{extension}"
+    if path.exists():
+        return path
+
+    duration_s = duration_min * 60
+    fixture_dir.mkdir(parents=True, exist_ok=True)
+    cmd = [
+        "ffmpeg", "-y", "-v", "error",
+        "-f", "lavfi", "-i", _AUDIO_SOURCE.format(duration=duration_s),
+        "-f", "lavfi", "-i", _NOISE_SOURCE.format(duration=duration_s),
+    ]
+    if with_video:
+        cmd += ["-f", "lavfi", "-i", f"testsrc2=size=320x240:rate=15:duration={duration_s}"]
+    cmd += ["-filter_complex", "[0:a][1:a]amix=inputs=2:duration=first[a]", "-map", "[a]"]
+    if with_video:
+        cmd += ["-map", "2:v"]
+    cmd += encode_args
+    temp_path = path.with_name(f"{path.stem}.tmp{path.suffix}")
+    cmd.append(str(temp_path))
+    _run_command(cmd)
+    os.replace(temp_path, path)
+    return path
+
+
+class PeakRssSampler:
+    """このプロセスと子プロセス(ffmpeg)の RSS の合計を一定間隔で測り、最大値を記録する"""
+
+    def __init__(self, interval_s: float = 0.05) -> None:
+        self._interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.peak_bytes = 0
+
+    def _sample(self) -> int:
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak_bytes = max(self.peak_bytes, self._sample())
+            self._stop.wait(self._interval_s)
+
+    def __enter__(self) -> "PeakRssSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def run_case(
+    fixture_path: Path,
+    output_format: str,
+    workers: int,
+    target_chunks: int,
+    repeat: int,
+) -> dict:
+    """1ケースを repeat 回実行し、所要時間の中央値で結果をまとめる"""
+    input_bytes = fixture_path.stat().st_size
+    input_mb = input_bytes / (1024 * 1024)
+    duration_s, input_codec = _probe_audio(str(fixture_path))
+    # チャンク数は分割と同じく見積もった出力サイズから決まるため(WAV・MP3 をそのままコピーする場合は入力のサイズ)、
+    # 目標チャンク数になるよう見積もりから目標サイズを決める(わずかに大きくして端数のチャンクを出さない)
+    output_mb = input_mb
+    if _read_native_source(str(fixture_path), output_format) is None:
+        output_mb = _estimate_output_size_mb(
+            str(fixture_path), input_mb, duration_s, output_format, _can_stream_copy(input_codec, output_format),
+        )
+    target_mb = output_mb / target_chunks * 1.001
+
+    wall_times: list[float] = []
+    peak_rss = 0
+    chunks = 0
+    for _ in range(repeat):
+        output_dir = Path(tempfile.mkdtemp(prefix="audiofilesplit-bench-"))
+        try:
+            with PeakRssSampler() as sampler:
+                started = time.perf_counter()
+                outputs = split_audio_file(
+                    str(fixture_path), str(output_dir),
+                    target_chunk_size_mb=target_mb,
+                    output_format=output_format,
+                    max_workers=workers,
+                )
+                wall_times.append(time.perf_counter() - started)
+            peak_rss = max(peak_rss, sampler.peak_bytes)
+            chunks = len(outputs)
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+    if chunks != target_chunks:
+        print(f"  警告: チャンク数が {target_chunks} ではなく {chunks} になりました ({fixture_path.name})", flush=True)
+
+    wall_s = statistics.median(wall_times)
+    return {
+        "input_bytes": input_bytes,
+        "duration_s": round(duration_s, 3),
+        "chunks": chunks,
+        "wall_s": round(wall_s, 4),
+        "wall_s_all": [round(t, 4) for t in wall_times],
+        "x_realtime": round(duration_s / wall_s, 2),
+        "bytes_per_s": round(input_bytes / wall_s),
+        "peak_rss_mb": round(peak_rss / (1024 * 1024), 1),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        )
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run_benchmark(args: argparse.Namespace) -> dict:
+    capabilities = discover_capabilities()
+    durations = [float(d) for d in args.durations.split(",")] if args.durations else PROFILES[args.profile]
+    worker_counts = [int(w) for w in args.workers.split(",")]
+    fixtures = args.fixtures.split(",") if args.fixtures else list(FIXTURES)
+    fixture_dir = Path(args.fixture_dir)
+
+    results = []
+    for duration_min in durations:
+        for name in fixtures:
+            print(f"fixture: {name} ({duration_min:g} 分) を準備しています...", flush=True)
+            fixture_path = generate_fixture(name, duration_min, fixture_dir)
+            for strategy, output_format in STRATEGIES[FIXTURES[name][0]].items():
+                for workers in worker_counts:
+                    case = {
+                        "fixture": name,
+                        "duration_min": duration_min,
+                        "strategy": strategy,
+                        "output_format": output_format,
+                        "workers": workers,
+                    }
+                    case.update(run_case(fixture_path, output_format, workers, args.chunks, args.repeat))
+                    results.append(case)
+                    print(
+                        f"  {strategy:6} -> {output_format:3} workers={workers}: "
+                        f"{case['wall_s']:.2f}s {case['x_realtime']}x "
+                        f"{case['bytes_per_s'] / (1024 * 1024):.1f} MB/s RSS {case['peak_rss_mb']} MB",
+                        flush=True,
+                    )
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "ffmpeg_version": capabilities.version,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "chunks": args.chunks,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+
+# コマンドラインツールの起動時間を測るコマンド(名前: python の引数)
+STARTUP_COMMANDS = {
+    "cli_help": ["-m", "service.cli", "--help"],
+    "cli_missing_input": ["-m", "service.cli", "missing.m4a", "-o", "."],
+    "engine_import": ["-c", "import service.audio_splitter"],
+}
+
+
+def measure_startup(repeat: int) -> dict:
+    """新しいインタプリタでコマンドラインツールを起動し、終了までの時間の中央値を測る"""
+    results = {}
+    for name, arguments in STARTUP_COMMANDS.items():
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, *arguments], cwd=PROJECT_ROOT, capture_output=True)
+            times.append(time.perf_counter() - started)
+        results[name] = round(statistics.median(times), 4)
+    return results
+
+
+def _case_key(case: dict) -> tuple:
+    return case["fixture"], case["duration_min"], case["strategy"], case["workers"]
+
+
+def compare(baseline_path: str, current_path: str) -> None:
+    """2つの結果ファイルで共通するケースの所要時間を比較して表示する"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(current_path, encoding="utf-8") as f:
+        current = json.load(f)
+
+    before = {_case_key(case): case for case in baseline["results"]}
+    print(f"{baseline['meta'].get('commit') or baseline_path} -> {current['meta'].get('commit') or current_path}")
+    for case in current["results"]:
+        old = before.get(_case_key(case))
+        if old is None:
+            continue
+        change = (case["wall_s"] - old["wall_s"]) / old["wall_s"] * 100
+        print(
+            f"{case['fixture']:10} {case['duration_min']:>5g}min {case['strategy']:6} "
+            f"workers={case['workers']:<2} {old['wall_s']:8.2f}s -> {case['wall_s']:8.2f}s ({change:+.1f}%)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="split_audio_file のベンチマーク")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick", help="再生時間のプロファイル")
+    parser.add_argument("--durations", help="再生時間(分)のカンマ区切り。指定時は --profile より優先")
+    parser.add_argument("--fixtures", help=f"対象の fixture のカンマ区切り ({','.join(FIXTURES)})")
+    parser.add_argument("--workers", default="1,4", help="並列数のカンマ区切り")
+    parser.add_argument("--chunks", type=int, default=4, help="1ファイルあたりのチャンク数")
+    parser.add_argument("--repeat", type=int, default=3, help="各ケースの実行回数(中央値を記録)")
+    parser.add_argument("--fixture-dir", default=str(DEFAULT_FIXTURE_DIR), help="fixture の保存先")
+    parser.add_argument("--output", help="結果の JSON の出力先(省略時は benchmark-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="2つの結果を比較して終了")
+    parser.add_argument("--startup", action="store_true", help="コマンドラインツールの起動時間(秒)を測って終了")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.startup:
+        print(json.dumps(measure_startup(max(args.repeat, 5)), indent=2))
+        return
+
+    report = run_benchmark(args)
+    output = args.output or f"benchmark-{report['meta']['commit'] or 'local'}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"結果を保存しました: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,80 @@
+import asyncio
+import logging
 import os
+import tempfile
 import threading
-from collections.abc import Callable
-from concurrent.futures import ThreadPoolExecutor
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
 from math import ceil
+from typing import Any, Literal
 
+from service.cancellation import CancellationToken, SplitCancelledError
+from service.chunk_verifier import ChunkCheck, check_chunk, check_chunks, total_duration_matches
+from service.concurrency import ConcurrencyController
+from service.consumer_stage import ChunkConsumer, ConsumeOrder, ConsumerStage
+from service.cut_planner import (
+    ChunkSpan,
+    _plan_by_packets,
+    _plan_for_silence,
+    _plan_uniform,
+    _spans_from_boundaries,
+)
+from service.ffmpeg_capabilities import FfmpegCapabilities
 from service.ffmpeg_runner import (
+    _ENCODE_BITRATE_MAP,
+    CommandTiming,
+    ProgressHandler,
     _can_stream_copy,
     _probe_audio,
+    _probe_packets,
+    _probe_stream_bitrate,
+    _read_chunk_async,
     _split_one_chunk,
+    _split_one_chunk_async,
+    _split_segments_async,
+)
+from service.job_report import ProcessTiming, SplitReport, SplitResult
+from service.manifest import SplitManifest, _get_manifest_path, _input_fingerprint
+from service.mp3_splitter import Mp3Info, plan_mp3_chunks, read_mp3_chunk, read_mp3_info, write_mp3_chunk
+from service.output_cache import OutputCache
+from service.packet_index import PacketIndex, build_packet_index, open_packet_index
+from service.probe_cache import ProbeCache
+from service.progress import ProgressTracker
+from service.progress_events import (
+    ChunkDone,
+    ChunkStarted,
+    JobDone,
+    JobStarted,
+    ProgressDispatcher,
+    ProgressEvent,
+    ProgressEventCallback,
 )
+from service.silence_detector import _find_quiet_points
+from service.wav_splitter import (
+    WavInfo,
+    fix_streamed_wav,
+    plan_wav_chunks,
+    read_wav_chunk,
+    read_wav_info,
+    write_wav_chunk,
+)
+from utils.log_rotation import log_job_report
 
 ProgressCallback = Callable[[str], None]
+ChunkDoneCallback = Callable[[int, str], None]
+EmitEvent = Callable[[ProgressEvent], None]
+
+# parallel: チャンクごとに ffmpeg を並列起動 / segment: 1回の ffmpeg で全チャンクを出力
+SplitMode = Literal["parallel", "segment", "ranges"]
+ChunkRange = tuple[int, int]
+# 検証で目標サイズを超えたチャンクを分け直すときの、目標に対する余裕と分け直す回数の上限
+_RESPLIT_MARGIN = 0.95
+_MAX_RESPLIT_ROUNDS = 3
+# ビットレートから見積もった出力サイズに加える、コンテナのヘッダ・インデックスの分の余裕
+_CONTAINER_OVERHEAD = 1.02
+# 再エンコード後のビットレートが分からない出力形式で、試しにエンコードする長さ(秒)
+_CALIBRATION_SAMPLE_S = 20.0
 
 
 def _calculate_chunks(file_size_mb: float, target_chunk_size_mb: float) -> int:
@@ -25,105 +89,1186 @@ def _get_output_filename(file_path: str, output_dir: str, chunk_index: int, outp
     return os.path.join(output_dir, output_filename)
 
 
-def _split_into_chunks(
-    file_path: str,
-    output_dir: str,
-    output_format: str,
-    num_chunks: int,
-    chunk_duration_s: float,
-    stream_copy: bool,
+def _get_output_pattern(file_path: str, output_dir: str, output_format: str) -> str:
+    """segment マルチプレクサ用の出力パスパターン(%d が連番)を生成"""
+    base_name = os.path.splitext(os.path.basename(file_path))[0].replace("%", "%%")
+    return os.path.join(output_dir.replace("%", "%%"), f"{base_name}_part%d.{output_format}")
+
+
+@dataclass
+class SplitPlan:
+    """1ファイル分の分割計画"""
+
+    file_path: str
+    output_dir: str
+    output_format: str
+    chunks: list[ChunkSpan]
+    stream_copy: bool
+    encoder: str | None = None
+    # ffmpeg を使わずにデータをコピーして分割する場合の入力の構造(PCM WAV → wav、MP3 → mp3)
+    native: WavInfo | Mp3Info | None = None
+
+    def output_path(self, index: int) -> str:
+        """index 番目のチャンクの出力パス"""
+        return _get_output_filename(self.file_path, self.output_dir, index, self.output_format)
+
+
+def _run_chunk(
+    plan: SplitPlan,
+    index: int,
+    cancel_token: CancellationToken | None = None,
+    on_progress: ProgressHandler | None = None,
+) -> str:
+    """計画の index 番目のチャンクを切り出し、出力パスを返す"""
+    start_s, duration_s = plan.chunks[index]
+    output_path = plan.output_path(index)
+    if plan.native is not None:
+        _write_native_chunk(plan, output_path, start_s, duration_s, cancel_token)
+        return output_path
+    _split_one_chunk(
+        plan.file_path, output_path, start_s, duration_s, plan.output_format, plan.stream_copy,
+        cancel_token, on_progress, plan.encoder,
+    )
+    return output_path
+
+
+def _read_native_source(file_path: str, output_format: str) -> WavInfo | Mp3Info | None:
+    """ffmpeg を使わずに分割できる入力(PCM WAV → wav、MP3 → mp3)なら、その構造を返す"""
+    output_format = output_format.lower()
+    if output_format == "wav":
+        return read_wav_info(file_path)
+    if output_format == "mp3":
+        return read_mp3_info(file_path)
+    return None
+
+
+def _write_native_chunk(
+    plan: SplitPlan,
+    output_path: str,
+    start_s: float,
+    duration_s: float,
+    cancel_token: CancellationToken | None = None,
+) -> None:
+    """ffmpeg を使わずに1チャンクを書き出す"""
+    if isinstance(plan.native, WavInfo):
+        write_wav_chunk(plan.file_path, output_path, plan.native, start_s, duration_s, cancel_token)
+    elif isinstance(plan.native, Mp3Info):
+        write_mp3_chunk(plan.file_path, output_path, plan.native, start_s, duration_s, cancel_token)
+
+
+def _read_native_chunk(plan: SplitPlan, start_s: float, duration_s: float) -> bytes:
+    """ffmpeg を使わずに1チャンクをバイト列として切り出す"""
+    if isinstance(plan.native, WavInfo):
+        return read_wav_chunk(plan.file_path, plan.native, start_s, duration_s)
+    if isinstance(plan.native, Mp3Info):
+        return read_mp3_chunk(plan.file_path, plan.native, start_s, duration_s)
+    raise RuntimeError("ffmpeg を使わずに分割できない入力です")
+
+
+def _remove_outputs(plan: SplitPlan, keep: set[int]) -> None:
+    """キャンセル時に、keep 以外のチャンクの出力(書きかけを含む)を削除する"""
+    for index in range(len(plan.chunks)):
+        if index in keep:
+            continue
+        try:
+            os.remove(plan.output_path(index))
+        except OSError:
+            pass
+
+
+async def _run_chunk_async(
+    plan: SplitPlan,
+    index: int,
+    cancel_token: CancellationToken | None = None,
+    on_progress: ProgressHandler | None = None,
+    timing: CommandTiming | None = None,
+) -> str:
+    """_run_chunk の asyncio 版(ffmpeg を使わないコピーは別スレッドで行う)"""
+    start_s, duration_s = plan.chunks[index]
+    output_path = plan.output_path(index)
+    await _write_span_async(plan, output_path, start_s, duration_s, cancel_token, on_progress, timing)
+    return output_path
+
+
+async def _write_span_async(
+    plan: SplitPlan,
+    output_path: str,
+    start_s: float,
+    duration_s: float,
+    cancel_token: CancellationToken | None = None,
+    on_progress: ProgressHandler | None = None,
+    timing: CommandTiming | None = None,
+) -> None:
+    """入力の start_s から duration_s 秒を、計画と同じ方法(コピー・再エンコード・ネイティブ)で書き出す"""
+    if plan.native is not None:
+        started_at = time.perf_counter()
+        await asyncio.to_thread(_write_native_chunk, plan, output_path, start_s, duration_s, cancel_token)
+        if timing is not None:
+            timing.run_s = time.perf_counter() - started_at
+        return
+    await _split_one_chunk_async(
+        plan.file_path, output_path, start_s, duration_s, plan.output_format, plan.stream_copy,
+        cancel_token, on_progress, plan.encoder, timing,
+    )
+
+
+async def _read_span_async(
+    plan: SplitPlan,
+    start_s: float,
+    duration_s: float,
+    cancel_token: CancellationToken | None = None,
+    timing: CommandTiming | None = None,
+) -> bytes:
+    """_write_span_async と同じ内容をファイルに書かず、メモリ上のバイト列として返す"""
+    started_at = time.perf_counter()
+    if plan.native is not None:
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        data = await asyncio.to_thread(_read_native_chunk, plan, start_s, duration_s)
+        if timing is not None:
+            timing.run_s = time.perf_counter() - started_at
+        return data
+    data = await _read_chunk_async(
+        plan.file_path, start_s, duration_s, plan.output_format, plan.stream_copy,
+        cancel_token, plan.encoder, timing,
+    )
+    if plan.output_format.lower() == "wav":
+        buffer = bytearray(data)
+        fix_streamed_wav(buffer)
+        data = bytes(buffer)
+    return data
+
+
+def _chunk_done_callback(
+    manifest: SplitManifest | None,
+    stage: ConsumerStage | None,
+) -> ChunkDoneCallback | None:
+    """チャンクの出力時に、マニフェストへの記録と後段の処理への受け渡しを順に行う関数を返す"""
+    if stage is None:
+        return manifest.mark_done if manifest is not None else None
+
+    def on_chunk_done(index: int, output_path: str) -> None:
+        if manifest is not None:
+            manifest.mark_done(index, output_path)
+        stage.submit(index, output_path)
+
+    return on_chunk_done
+
+
+async def _split_into_chunks(
+    plan: SplitPlan,
+    notify: ProgressCallback,
+    max_workers: int | None = None,
+    controller: ConcurrencyController | None = None,
+    indices: list[int] | None = None,
+    on_chunk_done: ChunkDoneCallback | None = None,
+    cancel_token: CancellationToken | None = None,
+    tracker: ProgressTracker | None = None,
+    report: SplitReport | None = None,
+    emit: EmitEvent | None = None,
+    throttle: Callable[[], Awaitable[None]] | None = None,
+) -> list[str]:
+    """
+    全チャンク(indices を指定した場合はそのチャンクだけ)を並列に切り出す
+
+    各チャンクは asyncio のサブプロセスとして起動し、同時実行数はセマフォで制限する。
+    controller を指定した場合は、実行中の ffmpeg の数をその上限に合わせて増減させる。
+    on_chunk_done はチャンクが出力されるたびに (チャンク番号, 出力パス) で呼ばれる(別スレッドで実行)。
+    tracker を指定した場合は、各 ffmpeg の実行中の進捗を集計して通知する。
+    report を指定した場合は、各 ffmpeg の起動・実行時間と並列数の上限を記録する。
+    emit を指定した場合は、各チャンクの開始・完了時に ChunkStarted/ChunkDone を送る。
+    throttle を指定した場合は、各チャンクを開始する前に await する(後段の処理が追いつくまで待たせる背圧)。
+    """
+    num_chunks = len(plan.chunks)
+    output_files = [plan.output_path(i) for i in range(num_chunks)]
+    if indices is None:
+        indices = list(range(num_chunks))
+    completed = num_chunks - len(indices)
+
+    async def run_chunk(index: int) -> None:
+        nonlocal completed
+        if cancel_token is not None:
+            # キャンセル後は待機中のチャンクを開始しない
+            cancel_token.raise_if_cancelled()
+        if emit is not None:
+            start_s, duration_s = plan.chunks[index]
+            emit(ChunkStarted(index, start_s, duration_s))
+        timing = CommandTiming()
+        await _run_chunk_async(
+            plan, index, cancel_token, tracker.handler(index) if tracker is not None else None, timing,
+        )
+        if report is not None:
+            report.processes.append(ProcessTiming(index, timing.spawn_s, timing.run_s))
+        if tracker is not None:
+            tracker.finish(index)
+        if on_chunk_done is not None:
+            # マニフェストの更新はチェックサム計算を含むためイベントループを止めないよう別スレッドで行う
+            await asyncio.to_thread(on_chunk_done, index, output_files[index])
+        completed += 1
+        if emit is not None:
+            emit(ChunkDone(index, output_files[index], completed, num_chunks))
+        notify(f"チャンク {completed}/{num_chunks} を出力しました")
+
+    if not indices:
+        return output_files
+
+    if controller is None:
+        max_workers = min(len(indices), max_workers or os.cpu_count() or 1)
+        if report is not None:
+            report.max_parallelism = max_workers
+        notify(f"ファイルの分割を開始します (並列数: {max_workers})")
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def run_limited(index: int) -> None:
+            if throttle is not None:
+                await throttle()
+            async with semaphore:
+                await run_chunk(index)
+
+        await _gather_chunks([run_limited(i) for i in indices])
+        return output_files
+
+    if report is not None:
+        report.max_parallelism = controller.ceiling
+    notify(f"ファイルの分割を開始します (並列数: 自動 {controller.floor}〜{controller.ceiling})")
+    failed = False
+
+    async def run_controlled(index: int) -> None:
+        nonlocal failed
+        limit = controller.limit
+        try:
+            await run_chunk(index)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            controller.release(plan.chunks[index][1])
+        if controller.limit != limit:
+            notify(f"並列数を {controller.limit} に変更しました")
+
+    tasks: list[asyncio.Task] = []
+    try:
+        for index in indices:
+            if throttle is not None:
+                await throttle()
+            # 上限に空きが出るまでの待機はスレッドで行い、イベントループを止めない
+            await asyncio.to_thread(controller.acquire)
+            if failed:
+                controller.release()
+                break
+            tasks.append(asyncio.ensure_future(run_controlled(index)))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    await _gather_chunks(tasks)
+    return output_files
+
+
+async def _gather_chunks(chunks: list) -> None:
+    """
+    全チャンクの完了を待ち、失敗があれば最初の例外を送出する
+
+    1チャンクの失敗で他の実行中のチャンクは止めない(スレッドプール版と同じ動作)。
+    """
+    results = await asyncio.gather(*chunks, return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+
+async def _split_with_segment_muxer(
+    plan: SplitPlan,
     notify: ProgressCallback,
+    on_chunk_done: ChunkDoneCallback | None = None,
+    cancel_token: CancellationToken | None = None,
+    tracker: ProgressTracker | None = None,
+    report: SplitReport | None = None,
+    emit: EmitEvent | None = None,
 ) -> list[str]:
-    """全チャンクを並列に切り出す"""
-    output_files: list[str] = [""] * num_chunks
+    """
+    入力を1回だけ読み込み、segment マルチプレクサで全チャンクを出力する
+
+    tracker は全体を1チャンクとして扱う(ffmpeg は入力先頭からの出力済み時間を報告する)。
+    """
+    num_chunks = len(plan.chunks)
+    output_files: list[str] = []
+    segment_times = [start_s for start_s, _ in plan.chunks[1:]]
+
+    def emit_started(index: int) -> None:
+        if emit is not None and index < num_chunks:
+            start_s, duration_s = plan.chunks[index]
+            emit(ChunkStarted(index, start_s, duration_s))
+
+    def on_segment(filename: str) -> None:
+        output_files.append(os.path.join(plan.output_dir, os.path.basename(filename)))
+        index = len(output_files) - 1
+        if on_chunk_done is not None:
+            on_chunk_done(index, output_files[-1])
+        if emit is not None:
+            emit(ChunkDone(index, output_files[-1], len(output_files), num_chunks))
+        emit_started(index + 1)
+        notify(f"チャンク {len(output_files)}/{num_chunks} を出力しました")
+
+    notify("ファイルの分割を開始します (単一プロセス)")
+    emit_started(0)
+    timing = CommandTiming()
+    await _split_segments_async(
+        plan.file_path,
+        _get_output_pattern(plan.file_path, plan.output_dir, plan.output_format),
+        segment_times, plan.output_format, plan.stream_copy, on_segment, cancel_token,
+        tracker.handler(0) if tracker is not None else None, plan.encoder, timing,
+    )
+    if report is not None:
+        report.processes.append(ProcessTiming(None, timing.spawn_s, timing.run_s))
+    return output_files
+
+
+def _group_ranges(num_chunks: int, max_workers: int | None) -> list[ChunkRange]:
+    """チャンクを連続した範囲 [first, stop) に、数がほぼ均等になるよう max_workers 個(省略時は CPU 数)までまとめる"""
+    num_ranges = max(1, min(num_chunks, max_workers or os.cpu_count() or 1))
+    size, extra = divmod(num_chunks, num_ranges)
+    ranges: list[ChunkRange] = []
+    first = 0
+    for i in range(num_ranges):
+        stop = first + size + (1 if i < extra else 0)
+        ranges.append((first, stop))
+        first = stop
+    return ranges
+
+
+async def _split_into_ranges(
+    plan: SplitPlan,
+    ranges: list[ChunkRange],
+    notify: ProgressCallback,
+    on_chunk_done: ChunkDoneCallback | None = None,
+    cancel_token: CancellationToken | None = None,
+    tracker: ProgressTracker | None = None,
+    report: SplitReport | None = None,
+    emit: EmitEvent | None = None,
+) -> list[str]:
+    """
+    範囲ごとに ffmpeg を1つ起動し、範囲内の全チャンクを segment マルチプレクサで1回の読み込みで出力する
+
+    チャンク数が多くても ffmpeg の数は範囲の数(CPU 数程度)で済み、チャンクごとの起動とシークを省ける。
+    1チャンクだけの範囲は通常どおり切り出す。tracker は範囲を1チャンクとして扱う。
+    """
+    num_chunks = len(plan.chunks)
+    output_files: list[str | None] = [None] * num_chunks
+    pattern = _get_output_pattern(plan.file_path, plan.output_dir, plan.output_format)
     completed = 0
-    lock = threading.Lock()
 
-    def run_chunk(index: int) -> None:
+    def emit_started(index: int) -> None:
+        if emit is not None:
+            start_s, duration_s = plan.chunks[index]
+            emit(ChunkStarted(index, start_s, duration_s))
+
+    def chunk_done(index: int, output_path: str) -> None:
         nonlocal completed
-        start_s = index * chunk_duration_s
-        output_path = _get_output_filename(file_path, output_dir, index, output_format)
-        _split_one_chunk(file_path, output_path, start_s, chunk_duration_s, output_format, stream_copy)
         output_files[index] = output_path
-        with lock:
-            completed += 1
-            notify(f"チャンク {completed}/{num_chunks} を出力しました")
+        if on_chunk_done is not None:
+            on_chunk_done(index, output_path)
+        completed += 1
+        if emit is not None:
+            emit(ChunkDone(index, output_path, completed, num_chunks))
+        notify(f"チャンク {completed}/{num_chunks} を出力しました")
+
+    async def run_range(range_index: int, first: int, stop: int) -> None:
+        on_progress = tracker.handler(range_index) if tracker is not None else None
+        timing = CommandTiming()
+        emit_started(first)
+        if stop - first == 1:
+            await _run_chunk_async(plan, first, cancel_token, on_progress, timing)
+            chunk_done(first, plan.output_path(first))
+        else:
+            range_start_s = plan.chunks[first][0]
+            next_index = first
+
+            def on_segment(filename: str) -> None:
+                nonlocal next_index
+                index = next_index
+                next_index += 1
+                chunk_done(index, os.path.join(plan.output_dir, os.path.basename(filename)))
+                if next_index < stop:
+                    emit_started(next_index)
 
-    max_workers = min(num_chunks, os.cpu_count() or 1)
-    notify(f"ファイルの分割を開始します (並列数: {max_workers})")
+            await _split_segments_async(
+                plan.file_path, pattern,
+                [start_s - range_start_s for start_s, _ in plan.chunks[first + 1:stop]],
+                plan.output_format, plan.stream_copy, on_segment, cancel_token, on_progress, plan.encoder, timing,
+                start_s=range_start_s,
+                duration_s=sum(duration_s for _, duration_s in plan.chunks[first:stop]),
+                start_number=first + 1,
+            )
+        if report is not None:
+            report.processes.append(ProcessTiming(first, timing.spawn_s, timing.run_s))
+        if tracker is not None:
+            tracker.finish(range_index)
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [executor.submit(run_chunk, i) for i in range(num_chunks)]
-        for future in futures:
-            future.result()
+    if report is not None:
+        report.max_parallelism = len(ranges)
+    notify(f"ファイルの分割を開始します (並列数: {len(ranges)}, {num_chunks} チャンク)")
+    await _gather_chunks([run_range(i, first, stop) for i, (first, stop) in enumerate(ranges)])
+    return [path for path in output_files if path is not None]
 
+
+async def _verify_outputs(
+    plan: SplitPlan,
+    output_files: list[str],
+    max_bytes: int,
+    notify: ProgressCallback,
+    max_workers: int | None = None,
+    cancel_token: CancellationToken | None = None,
+    report: SplitReport | None = None,
+    manifest: SplitManifest | None = None,
+) -> list[str]:
+    """
+    出力したチャンクのサイズと再生時間を並列に検証し、問題のあるチャンクだけを作り直す
+
+    長さが計画と一致しない(途中で切れた・読めない)チャンクは同じ区間で1回だけ作り直す。
+    目標サイズを超えたチャンクはその区間だけを小さく分け直し、後ろのチャンクは番号を繰り下げる
+    (ファイル名の変更のみで、作り直さない)。plan.chunks とマニフェストは分け直した後の計画に更新する。
+
+    Returns:
+        検証後の出力パスのリスト
+
+    Raises:
+        RuntimeError: 作り直しても長さが一致しない、分け直しても目標サイズに収まらない、
+            またはチャンクの再生時間の合計が入力と一致しない
+    """
+    if len(output_files) != len(plan.chunks):
+        raise RuntimeError(f"出力されたチャンク数 ({len(output_files)}) が分割計画 ({len(plan.chunks)}) と一致しません")
+    expected_total_s = sum(duration_s for _, duration_s in plan.chunks)
+    notify("出力したチャンクを検証しています...")
+    checks = await check_chunks(
+        [(i, path, duration_s) for i, (path, (_, duration_s)) in enumerate(zip(output_files, plan.chunks))],
+        max_bytes, plan.output_format, max_workers, cancel_token,
+    )
+
+    truncated = [check.index for check in checks if check.truncated]
+    if truncated:
+        notify(f"長さが計画と一致しないチャンクを作り直します: {', '.join(str(i + 1) for i in truncated)}")
+        await _gather_chunks([_run_chunk_async(plan, i, cancel_token) for i in truncated])
+        rechecked = await check_chunks(
+            [(i, output_files[i], plan.chunks[i][1]) for i in truncated],
+            max_bytes, plan.output_format, max_workers, cancel_token,
+        )
+        for check in rechecked:
+            if check.truncated:
+                raise RuntimeError(
+                    f"チャンク {check.index + 1} の長さが計画と一致しません "
+                    f"(出力: {check.duration_s} 秒, 計画: {check.expected_s:.3f} 秒)"
+                )
+            checks[check.index] = check
+            if manifest is not None:
+                await asyncio.to_thread(manifest.mark_done, check.index, check.path)
+        if report is not None:
+            report.redone_chunks = len(truncated)
+
+    oversized = [check for check in checks if check.oversized]
+    if oversized:
+        notify(f"目標サイズを超えたチャンクを分け直します: {', '.join(str(c.index + 1) for c in oversized)}")
+        semaphore = asyncio.Semaphore(max(1, max_workers or os.cpu_count() or 1))
+        pieces = await asyncio.gather(*(
+            _resplit_chunk(plan, check, max_bytes, semaphore, cancel_token) for check in oversized
+        ))
+        output_files, checks = await asyncio.to_thread(
+            _replace_oversized, plan, checks, dict(zip((c.index for c in oversized), pieces)), manifest,
+        )
+        if report is not None:
+            report.resplit_chunks = len(oversized)
+            report.chunk_count = len(plan.chunks)
+
+    if not total_duration_matches(checks, expected_total_s):
+        total_s = sum(check.duration_s or 0.0 for check in checks)
+        raise RuntimeError(
+            f"チャンクの再生時間の合計 ({total_s:.3f} 秒) が入力 ({expected_total_s:.3f} 秒) と一致しません"
+        )
     return output_files
 
 
-def split_audio_file(
+async def _resplit_chunk(
+    plan: SplitPlan,
+    check: ChunkCheck,
+    max_bytes: int,
+    semaphore: asyncio.Semaphore,
+    cancel_token: CancellationToken | None = None,
+) -> list[ChunkCheck]:
+    """
+    目標サイズを超えたチャンクの区間を等分して一時ファイルに書き出す
+
+    出力サイズの比から分割数を決め、まだ超える部分があれば分割数を増やして最大 _MAX_RESPLIT_ROUNDS 回まで試す。
+    結果の index は区間内の順番、expected_s は各部分の長さ。
+    """
+    start_s, duration_s = plan.chunks[check.index]
+    root, ext = os.path.splitext(check.path)
+    count = 1
+    largest = check.size_bytes
+    temp_paths: list[str] = []
+    try:
+        for _ in range(_MAX_RESPLIT_ROUNDS):
+            count = max(count + 1, ceil(count * largest / (max_bytes * _RESPLIT_MARGIN)))
+            spans = _plan_uniform(duration_s, count)
+            temp_paths = [f"{root}.resplit{k + 1}{ext}" for k in range(count)]
+
+            async def write(k: int, path: str, piece_start_s: float, piece_duration_s: float) -> ChunkCheck:
+                async with semaphore:
+                    await _write_span_async(plan, path, start_s + piece_start_s, piece_duration_s, cancel_token)
+                    return await asyncio.to_thread(
+                        check_chunk, k, path, piece_duration_s, max_bytes, plan.output_format,
+                    )
+
+            results = await asyncio.gather(*(
+                write(k, path, piece_start_s, piece_duration_s)
+                for k, (path, (piece_start_s, piece_duration_s)) in enumerate(zip(temp_paths, spans))
+            ))
+            for piece in results:
+                if piece.truncated:
+                    raise RuntimeError(f"チャンク {check.index + 1} を分け直した出力の長さが計画と一致しません")
+            largest = max(piece.size_bytes for piece in results)
+            if largest <= max_bytes:
+                return list(results)
+            _remove_paths(temp_paths)
+    except BaseException:
+        _remove_paths(temp_paths)
+        raise
+    raise RuntimeError(f"チャンク {check.index + 1} を分け直しても目標サイズに収まりません")
+
+
+def _remove_paths(paths: list[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _replace_oversized(
+    plan: SplitPlan,
+    checks: list[ChunkCheck],
+    pieces: dict[int, list[ChunkCheck]],
+    manifest: SplitManifest | None,
+) -> tuple[list[str], list[ChunkCheck]]:
+    """
+    分け直したチャンクを元の位置に差し込み、後ろのチャンクの番号を繰り下げる
+
+    新しい番号は元の番号以上になるため、後ろから順に名前を変えれば上書きは起きない。
+    """
+    chunks: list[ChunkSpan] = []
+    sources: list[int | None] = []
+    temp_paths: dict[int, str] = {}
+    new_checks: list[ChunkCheck] = []
+    for index, span in enumerate(plan.chunks):
+        if index not in pieces:
+            chunks.append(span)
+            sources.append(index)
+            new_checks.append(checks[index])
+            continue
+        start_s = span[0]
+        for piece in pieces[index]:
+            temp_paths[len(chunks)] = piece.path
+            chunks.append((start_s, piece.expected_s))
+            sources.append(None)
+            new_checks.append(piece)
+            start_s += piece.expected_s
+
+    for index in pieces:
+        os.remove(checks[index].path)
+    for new_index in reversed(range(len(chunks))):
+        source = sources[new_index]
+        if source is not None and source != new_index:
+            os.replace(checks[source].path, plan.output_path(new_index))
+    for new_index, temp_path in temp_paths.items():
+        os.replace(temp_path, plan.output_path(new_index))
+
+    plan.chunks = chunks
+    output_files = [plan.output_path(i) for i in range(len(chunks))]
+    if manifest is not None:
+        manifest.rebuild(chunks, sources, output_files)
+    return output_files, new_checks
+
+
+def _plan_chunks(
+    file_path: str,
+    file_size_mb: float,
+    duration_s: float,
+    target_chunk_size_mb: float,
+    output_format: str,
+    by_packets: bool,
+    silence_tolerance_s: float | None,
+    notify: ProgressCallback,
+    cancel_token: CancellationToken | None = None,
+    packet_index: PacketIndex | None = None,
+) -> list[ChunkSpan]:
+    """各チャンクの開始位置と長さを決める(by_packets で packet_index を指定した場合は ffprobe を実行しない)"""
+    if by_packets:
+        notify("パケット情報から分割位置を計算しています...")
+        target_chunk_bytes = int(target_chunk_size_mb * 1024 * 1024)
+        if packet_index is not None:
+            return _plan_by_packets(
+                packet_index.times, packet_index.sizes, duration_s, target_chunk_bytes, output_format,
+                packet_index.keyframes,
+            )
+        packet_times, packet_sizes = _probe_packets(file_path, cancel_token)
+        return _plan_by_packets(packet_times, packet_sizes, duration_s, target_chunk_bytes, output_format)
+
+    if silence_tolerance_s is not None:
+        chunks, tolerance_s = _plan_for_silence(duration_s, file_size_mb, target_chunk_size_mb, silence_tolerance_s)
+        if len(chunks) > 1:
+            notify("無音区間を探して分割位置を調整しています...")
+            boundaries = [start_s for start_s, _ in chunks[1:]]
+            quiet_points = _find_quiet_points(file_path, boundaries, tolerance_s, cancel_token=cancel_token)
+            return _spans_from_boundaries(quiet_points, duration_s)
+        return chunks
+
+    return _plan_uniform(duration_s, _calculate_chunks(file_size_mb, target_chunk_size_mb))
+
+
+def _calibrate_bitrate(
+    file_path: str,
+    duration_s: float,
+    output_format: str,
+    cancel_token: CancellationToken | None = None,
+) -> int:
+    """入力の中央付近を _CALIBRATION_SAMPLE_S 秒だけ再エンコードし、出力のビットレート(bps)を求める"""
+    sample_s = min(_CALIBRATION_SAMPLE_S, duration_s)
+    start_s = max(0.0, (duration_s - sample_s) / 2)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, f"calibration.{output_format}")
+        _split_one_chunk(file_path, output_path, start_s, sample_s, output_format, False, cancel_token)
+        return int(os.path.getsize(output_path) * 8 / sample_s)
+
+
+def _estimate_output_size_mb(
+    file_path: str,
+    file_size_mb: float,
+    duration_s: float,
+    output_format: str,
+    stream_copy: bool,
+    probe_cache: ProbeCache | None = None,
+    cancel_token: CancellationToken | None = None,
+) -> float:
+    """
+    分割後の出力の合計サイズ(MB)を見積もる
+
+    ストリームコピーは入力の音声ストリームのビットレート(映像・カバー画像を含まない)、再エンコードは
+    出力形式のビットレート(_ENCODE_BITRATE_MAP)、無い形式は試しにエンコードした結果から求める。
+    ビットレートが分からない場合は入力ファイルのサイズとする。
+    """
+    try:
+        if stream_copy:
+            if probe_cache is not None:
+                bitrate = probe_cache.get_or_probe(
+                    file_path, "audio_bitrate", lambda: _probe_stream_bitrate(file_path),
+                )
+            else:
+                bitrate = _probe_stream_bitrate(file_path)
+        else:
+            bitrate = _ENCODE_BITRATE_MAP.get(output_format.lower()) or _calibrate_bitrate(
+                file_path, duration_s, output_format, cancel_token,
+            )
+    except SplitCancelledError:
+        raise
+    except (RuntimeError, OSError) as e:
+        logging.warning(f"出力のビットレートを取得できませんでした: {e}")
+        return file_size_mb
+    if not bitrate:
+        return file_size_mb
+    estimated_mb = bitrate / 8 * duration_s * _CONTAINER_OVERHEAD / (1024 * 1024)
+    # ストリームコピーの出力が入力より大きくなることはない
+    return min(estimated_mb, file_size_mb) if stream_copy else estimated_mb
+
+
+def _get_file_size_mb(file_path: str) -> float:
+    """入力ファイルのサイズ(MB)を取得"""
+    try:
+        return os.path.getsize(file_path) / (1024 * 1024)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"ファイルが見つかりません: {file_path}")
+
+
+def _prepare_split(
+    file_path: str,
+    file_size_mb: float,
+    output_dir: str,
+    target_chunk_size_mb: float,
+    output_format: str,
+    notify: ProgressCallback,
+    byte_accurate: bool = False,
+    probe_cache: ProbeCache | None = None,
+    silence_tolerance_s: float | None = None,
+    cancel_token: CancellationToken | None = None,
+    report: SplitReport | None = None,
+    packet_index_dir: str | None = None,
+) -> SplitPlan:
+    """
+    音声情報を解析して分割計画を立て、出力ディレクトリを用意する(output_dir が空ならファイルに書かない計画)
+
+    report を指定した場合は、解析・計画にかかった時間と計画時に読み込んだ量(推定)を記録する。
+    byte_accurate で packet_index_dir を指定した場合、保存済みのパケットインデックスがあれば
+    ffprobe を実行せずに計画し、無ければ作って保存する。
+    PCM WAV を wav に、MP3 を mp3 に分割する場合は ffprobe を使わず、WAV のヘッダ・MP3 のフレームヘッダから
+    サンプル・フレーム単位で計画する(無音区間に合わせる場合を除く)。
+    それ以外のチャンク数は入力ファイルのサイズではなく、見積もった出力サイズ(_estimate_output_size_mb)から決める。
+    """
+    notify("音声情報を解析しています...")
+    started_at = time.perf_counter()
+    native = _read_native_source(file_path, output_format) if silence_tolerance_s is None else None
+    if native is not None:
+        probed_at = time.perf_counter()
+        notify(f"総再生時間: {native.duration_s:.2f} 秒")
+        target_chunk_bytes = int(target_chunk_size_mb * 1024 * 1024)
+        if isinstance(native, WavInfo):
+            chunks = plan_wav_chunks(native, target_chunk_bytes)
+        else:
+            chunks = plan_mp3_chunks(native, target_chunk_bytes)
+        notify(f"推定チャンク数: {len(chunks)}")
+        if report is not None:
+            report.probe_s = probed_at - started_at
+            report.plan_s = time.perf_counter() - probed_at
+            # MP3 はフレームヘッダをたどるため入力全体を読む
+            if isinstance(native, Mp3Info):
+                report.bytes_read += report.input_bytes
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        notify("ffmpeg を使わずに音声データをそのままコピーして分割します")
+        return SplitPlan(file_path, output_dir, output_format, chunks, True, native=native)
+
+    packet_index = open_packet_index(file_path, packet_index_dir) if byte_accurate and packet_index_dir else None
+    if packet_index is not None:
+        duration_s, input_codec = packet_index.duration_s, packet_index.codec
+    elif probe_cache is not None:
+        duration_s, input_codec = probe_cache.get_or_probe(file_path, "audio", lambda: _probe_audio(file_path))
+    else:
+        duration_s, input_codec = _probe_audio(file_path)
+    probed_at = time.perf_counter()
+    notify(f"総再生時間: {duration_s:.2f} 秒")
+
+    stream_copy = _can_stream_copy(input_codec, output_format)
+    by_packets = stream_copy and byte_accurate
+    index_reused = packet_index is not None
+    if by_packets and packet_index is None and packet_index_dir:
+        notify("パケットインデックスを作成しています...")
+        packet_index = build_packet_index(file_path, packet_index_dir, duration_s, input_codec, cancel_token)
+    output_size_mb = file_size_mb
+    if not by_packets:
+        output_size_mb = _estimate_output_size_mb(
+            file_path, file_size_mb, duration_s, output_format, stream_copy, probe_cache, cancel_token,
+        )
+        notify(f"推定出力サイズ: {output_size_mb:.2f} MB")
+    chunks = _plan_chunks(
+        file_path, output_size_mb, duration_s, target_chunk_size_mb,
+        output_format, by_packets, silence_tolerance_s, notify, cancel_token, packet_index,
+    )
+    notify(f"推定チャンク数: {len(chunks)}")
+
+    if report is not None:
+        report.probe_s = probed_at - started_at
+        report.plan_s = time.perf_counter() - probed_at
+        # パケット情報の取得・無音区間の解析はどちらも入力全体を読む(保存済みのインデックスを使った場合は読まない)
+        if by_packets and not index_reused or silence_tolerance_s is not None and len(chunks) > 1:
+            report.bytes_read += report.input_bytes
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    if stream_copy:
+        notify("コーデックが一致するため、再エンコードせずに分割します")
+    else:
+        notify("再エンコードしながら分割します")
+
+    return SplitPlan(file_path, output_dir, output_format, chunks, stream_copy)
+
+
+def _apply_capabilities(plan: SplitPlan, capabilities: FfmpegCapabilities, notify: ProgressCallback) -> None:
+    """再エンコードする計画に、この ffmpeg で使える最速のエンコーダを設定する"""
+    if plan.stream_copy:
+        return
+    plan.encoder = capabilities.check_encoder(plan.output_format)
+    if plan.encoder is not None:
+        notify(f"エンコーダ: {plan.encoder}")
+
+
+def _create_controller(plan: SplitPlan, min_workers: int, max_workers: int | None) -> ConcurrencyController:
+    """
+    同時実行数の自動調整用コントローラを作る
+
+    ストリームコピーは I/O 律速のため下限から、再エンコードは CPU 数から増減を始める。
+    """
+    cpu_count = os.cpu_count() or 1
+    ceiling = max_workers or cpu_count
+    initial = min_workers if plan.stream_copy else min(ceiling, cpu_count)
+    return ConcurrencyController(min_workers, ceiling, initial)
+
+
+def _resume_or_prepare(
+    file_path: str,
+    output_dir: str,
+    output_format: str,
+    params: dict[str, Any],
+    prepare: Callable[[], SplitPlan],
+    notify: ProgressCallback,
+) -> tuple[SplitPlan, SplitManifest, list[int] | None]:
+    """
+    マニフェストが入力・分割条件と一致すれば前回の計画を再利用し、未完了のチャンク番号を返す
+
+    一致しない(初回・条件変更・入力の変更)場合は計画を立て直し、新しいマニフェストを作る。
+    その場合のチャンク番号は None(全チャンクが対象)。
+    """
+    manifest_path = _get_manifest_path(file_path, output_dir)
+    fingerprint = _input_fingerprint(file_path)
+    manifest = SplitManifest.load(manifest_path)
+
+    if manifest is not None and manifest.matches(fingerprint, params):
+        native = _read_native_source(file_path, output_format) if params.get("silence_tolerance_s") is None else None
+        plan = SplitPlan(
+            file_path, output_dir, output_format, manifest.chunks, manifest.stream_copy, native=native,
+        )
+        done = manifest.completed_chunks()
+        notify(f"前回の続きから再開します (完了済み: {len(done)}/{len(plan.chunks)})")
+        return plan, manifest, [i for i in range(len(plan.chunks)) if i not in done]
+
+    plan = prepare()
+    manifest = SplitManifest.create(manifest_path, fingerprint, params, plan.chunks, plan.stream_copy)
+    manifest.save()
+    return plan, manifest, None
+
+
+async def split_audio_file_async(
     file_path: str,
     output_dir: str,
     target_chunk_size_mb: float = 24.5,
     output_format: str = "m4a",
     progress_callback: ProgressCallback | None = None,
-) -> list[str]:
+    split_mode: SplitMode = "parallel",
+    byte_accurate: bool = False,
+    probe_cache: ProbeCache | None = None,
+    snap_to_silence: bool = False,
+    silence_tolerance_s: float = 5.0,
+    max_workers: int | None = None,
+    adaptive_workers: bool = False,
+    min_workers: int = 1,
+    resume: bool = False,
+    cancel_token: CancellationToken | None = None,
+    capabilities: FfmpegCapabilities | None = None,
+    event_callback: ProgressEventCallback | None = None,
+    packet_index_dir: str | None = None,
+    verify: bool = False,
+    consumer: ChunkConsumer | None = None,
+    consumer_workers: int = 1,
+    consumer_order: ConsumeOrder = "completion",
+    max_pending_chunks: int | None = None,
+    output_cache: OutputCache | None = None,
+) -> SplitResult:
     """
-    音声ファイルを指定サイズで分割
+    音声ファイルを指定サイズで分割(asyncio 版)
+
+    ffmpeg は asyncio のサブプロセスとして起動するため、チャンクごとにスレッドを使わない。
+    ffprobe による解析・分割計画は従来どおり同期処理のため、別スレッドで実行する。
+    このコルーチンを実行しているタスクをキャンセルすると、実行中の ffmpeg/ffprobe を終了させ、
+    cancel_token によるキャンセルと同じく出力途中のファイルを削除してから CancelledError を送出する。
 
     Args:
         file_path: 入力ファイルパス
         output_dir: 出力ディレクトリ
         target_chunk_size_mb: 目標チャンクサイズ(MB)
-        output_format: 出力フォーマット (m4a, mp3, mp4等)
-        progress_callback: 進捗コールバック関数 callback(message: str)
+        output_format: 出力フォーマット (m4a, mp3, mp4等)。PCM WAV(RF64 を含む)を wav に、MP3 を mp3 に
+            分割する場合は ffmpeg を使わず、サンプル・フレーム境界で区切ったデータをデコードせずにコピーする
+            (service/wav_splitter.py、service/mp3_splitter.py)。snap_to_silence を指定した場合は ffmpeg で分割する
+        progress_callback: 進捗コールバック関数 callback(message: str)。常にイベントループのスレッドで呼ばれる。
+            分割中は ffmpeg の -progress 出力から求めた全体の進捗率・処理速度・残り時間も通知する
+        split_mode: "parallel" はチャンクごとに ffmpeg を並列実行、
+            "segment" は1回の ffmpeg 実行で入力を順に読み全チャンクを出力、
+            "ranges" は入力を max_workers 個(省略時は CPU 数)の連続した範囲に分け、範囲ごとに1つの ffmpeg で
+            その範囲の全チャンクを出力する(チャンク数が多い長時間の録音向け)。
+            resume で一部のチャンクだけを作り直す場合は、segment/ranges も "parallel" と同じ方法で実行する
+        byte_accurate: True の場合、ストリームコピー時にパケット単位のサイズから
+            分割位置を決め、各チャンクを目標サイズ以下で最大限詰める(VBR 向け)
+        probe_cache: 指定した場合、ffprobe の前にキャッシュを参照する
+        snap_to_silence: True の場合、各分割位置を前後 silence_tolerance_s 秒以内の
+            最も近い無音(低レベル)区間へ移す。移動しても目標サイズを超えないようチャンク数を決める。
+            byte_accurate によるパケット単位の計画が有効な場合はそちらを優先する
+        silence_tolerance_s: 無音区間を探す範囲(秒)
+        max_workers: 同時に実行する ffmpeg の数(省略時は CPU 数)。
+            adaptive_workers が True の場合は自動調整の上限
+        adaptive_workers: True の場合、スループット・実行待ちのプロセス数・空きメモリを見ながら
+            同時実行数を min_workers〜max_workers の範囲で自動調整する(parallel モードのみ)
+        min_workers: 自動調整の下限
+        resume: True の場合、出力ディレクトリに分割計画と各チャンクの状態(サイズ・チェックサム)を
+            記録したマニフェストを書き、再実行時は欠けている・壊れているチャンクだけを作り直す
+        cancel_token: 指定した場合、cancel() で実行中の ffmpeg を終了させ、未開始のチャンクを取りやめ、
+            出力途中のファイルを削除して SplitCancelledError を送出する
+        capabilities: discover_capabilities の結果。指定した場合は処理を始める前に出力形式への対応を確認し、
+            再エンコード時はビルドに含まれる最速のエンコーダを使う
+        event_callback: 指定した場合、JobStarted/ChunkStarted/ChunkProgress/ChunkDone/JobDone を
+            専用スレッドから順に渡す。callback が遅くても分割は待たず、溜まった ChunkProgress は最新のものに間引く。
+            指定した場合、progress_callback には進捗率のテキストを送らない
+        packet_index_dir: byte_accurate で指定した場合、パケット情報をメモリマップ可能なインデックス
+            (service/packet_index.py)としてこのディレクトリに保存し、同じ入力の2回目以降は目標サイズが違っても
+            ffprobe を実行せずにインデックスから分割位置を計算する。入力が変更されていれば作り直す
+        verify: True の場合、分割後に全チャンクのサイズと再生時間(WAV はヘッダ、MP3 はフレーム数、
+            それ以外は ffprobe)を並列に検証する。長さが計画と一致しないチャンクは作り直し、
+            目標サイズを超えたチャンクはその区間だけを小さく分け直して後ろのチャンクの番号を繰り下げる。
+            再生時間の合計が入力と一致しなければ RuntimeError
+        consumer: 指定した場合、チャンクが出力されるたびに consumer(チャンク番号, 出力パス) を専用のスレッドプール
+            (consumer_workers 個)で呼ぶ。分割の完了を待たずに後段の処理(アップロード・文字起こしなど)が始まる。
+            consumer_order が "index" の場合はチャンク番号の順に、"completion" の場合は出力された順に渡す。
+            戻り値は SplitResult.consumer_results にチャンク番号の順で入る。consumer が失敗すると以降のチャンクは
+            開始せず RuntimeError。verify を指定した場合は検証後にまとめて渡す。resume で再開した場合は
+            今回出力したチャンクだけを渡す
+        consumer_workers: consumer を同時に実行する数
+        consumer_order: "completion" または "index"
+        max_pending_chunks: 開始済みで consumer の処理が終わっていないチャンク数の上限(省略時は consumer_workers と
+            ffmpeg の同時実行数の和)。consumer が追いつかず上限に達すると次のチャンクの開始を待たせる
+            (parallel モードのみ。segment/ranges は1つの ffmpeg が全チャンクを続けて出力するため待たせない)
+        output_cache: 指定した場合、入力の内容の指紋(サイズと先頭・末尾・等間隔のブロックのハッシュ)と分割条件が
+            同じ結果がキャッシュにあれば、ffmpeg を実行せずにキャッシュのチャンクを output_dir へ複製
+            (reflink に対応していなければコピー)する。無ければ分割後に結果をキャッシュに保存する(service/output_cache.py)
 
     Returns:
-        生成されたファイルパスのリスト
+        生成されたファイルパスのリスト(SplitResult)。分割した場合は report 属性に
+        解析・計画・各 ffmpeg の時間や読み書きした量をまとめた SplitReport を持つ(ログにも出力する)
 
     Raises:
         FileNotFoundError: 入力ファイルが存在しない
         RuntimeError: ffmpeg/ffprobe 関連のエラー
+        SplitCancelledError: cancel_token によりキャンセルされた(RuntimeError のサブクラス)
     """
+    loop = asyncio.get_running_loop()
+    loop_thread = threading.get_ident()
+
     def notify(message: str) -> None:
-        if progress_callback:
+        if not progress_callback:
+            return
+        if threading.get_ident() == loop_thread:
             progress_callback(message)
+        else:
+            loop.call_soon_threadsafe(progress_callback, message)
 
-    try:
-        file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
-    except FileNotFoundError:
-        raise FileNotFoundError(f"ファイルが見つかりません: {file_path}")
+    if capabilities is not None:
+        capabilities.check_output_format(output_format, segment=split_mode in ("segment", "ranges"))
+
+    started_at = time.perf_counter()
+    file_size_mb = _get_file_size_mb(file_path)
 
     notify(f"ファイル: {file_path}, サイズ: {file_size_mb:.2f} MB")
 
     if file_size_mb <= target_chunk_size_mb:
         notify("ファイルサイズが指定された上限以下のため、分割は不要です")
-        return []
+        return SplitResult([])
 
-    try:
-        notify("音声情報を解析しています...")
-        duration_s, input_codec = _probe_audio(file_path)
-        notify(f"総再生時間: {duration_s:.2f} 秒")
+    report = SplitReport(file_path, split_mode, int(file_size_mb * 1024 * 1024))
+    # タスクのキャンセル時に解析中の ffprobe も終了できるよう、常にトークンを使う
+    token = cancel_token if cancel_token is not None else CancellationToken()
+    dispatcher = ProgressDispatcher(event_callback) if event_callback is not None else None
+    emit = dispatcher.emit if dispatcher is not None else None
+    plan: SplitPlan | None = None
+    manifest: SplitManifest | None = None
+    stage: ConsumerStage | None = None
 
-        num_chunks = _calculate_chunks(file_size_mb, target_chunk_size_mb)
-        chunk_duration_s = duration_s / num_chunks
-        notify(f"推定チャンク数: {num_chunks}")
+    async def finish(output_files: list[str], submit_to: ConsumerStage | None) -> SplitResult:
+        """後段の処理の完了を待ち、レポートをまとめる(submit_to には出力をまとめて渡す)"""
+        consumer_results: list[Any] | None = None
+        if submit_to is not None:
+            # 検証で分け直したチャンクも含め、出力した全チャンクの番号の順に渡す
+            submit_to.expect(list(range(len(output_files))))
+            for index, output_path in enumerate(output_files):
+                submit_to.submit(index, output_path)
+        if stage is not None:
+            notify("後段の処理の完了を待っています...")
+            consumer_results = await stage.drain()
+            report.first_result_s = stage.first_result_s or 0.0
+        report.bytes_written = sum(os.path.getsize(path) for path in output_files if os.path.exists(path))
+        report.total_s = time.perf_counter() - started_at
+        log_job_report(report.to_dict())
+        if emit is not None:
+            emit(JobDone(len(output_files), report.total_s, report.x_realtime))
+        notify("ファイルの分割が完了しました")
+        return SplitResult(output_files, report, consumer_results)
 
-        os.makedirs(output_dir, exist_ok=True)
+    try:
+        def prepare() -> SplitPlan:
+            return _prepare_split(
+                file_path, file_size_mb, output_dir, target_chunk_size_mb, output_format, notify,
+                byte_accurate=byte_accurate,
+                probe_cache=probe_cache,
+                silence_tolerance_s=silence_tolerance_s if snap_to_silence else None,
+                cancel_token=token,
+                report=report,
+                packet_index_dir=packet_index_dir,
+            )
 
-        stream_copy = _can_stream_copy(input_codec, output_format)
-        if stream_copy:
-            notify("コーデックが一致するため、再エンコードせずに分割します")
+        params = {
+            "target_chunk_size_mb": target_chunk_size_mb,
+            "output_format": output_format,
+            "byte_accurate": byte_accurate,
+            "silence_tolerance_s": silence_tolerance_s if snap_to_silence else None,
+        }
+        cache_key: str | None = None
+        if output_cache is not None:
+            cache_key = await asyncio.to_thread(
+                output_cache.key_for, file_path, {**params, "split_mode": split_mode, "verify": verify},
+            )
+            cached = await asyncio.to_thread(
+                output_cache.restore, cache_key,
+                lambda index: _get_output_filename(file_path, output_dir, index, output_format),
+            )
+            if cached is not None:
+                notify(f"同じ内容・条件の分割結果をキャッシュから出力しました ({len(cached)} ファイル)")
+                report.strategy = "cache"
+                report.chunk_count = len(cached)
+                if consumer is not None:
+                    stage = ConsumerStage(consumer, consumer_workers, consumer_order, started_at=started_at)
+                return await finish(cached, stage)
+
+        indices: list[int] | None = None
+        if resume:
+            plan, manifest, indices = await asyncio.to_thread(
+                _resume_or_prepare, file_path, output_dir, output_format, params, prepare, notify,
+            )
         else:
-            notify("再エンコードしながら分割します")
+            plan = await asyncio.to_thread(prepare)
+        if capabilities is not None:
+            _apply_capabilities(plan, capabilities, notify)
 
-        output_files = _split_into_chunks(
-            file_path, output_dir, output_format,
-            num_chunks, chunk_duration_s, stream_copy, notify,
-        )
-        notify("ファイルの分割が完了しました")
-        return output_files
+        if consumer is not None:
+            split_workers = max_workers or os.cpu_count() or 1
+            stage = ConsumerStage(
+                consumer, consumer_workers, consumer_order,
+                max_pending_chunks or consumer_workers + split_workers, started_at,
+            )
+            if not verify:
+                # verify の場合はチャンク数が検証で変わりうるため、finish でまとめて渡すときに決める
+                stage.expect(indices if indices is not None else list(range(len(plan.chunks))))
+        on_chunk_done = _chunk_done_callback(manifest, stage if not verify else None)
+        durations = [duration_s for _, duration_s in plan.chunks]
+        report.duration_s = sum(durations)
+        report.strategy = "native" if plan.native is not None else "copy" if plan.stream_copy else "encode"
+        report.encoder = plan.encoder
+        report.chunk_count = len(plan.chunks)
+        report.resumed_chunks = len(plan.chunks) - len(indices) if indices is not None else 0
+        if emit is not None:
+            emit(JobStarted(file_path, len(plan.chunks), report.duration_s, plan.stream_copy))
+
+        # イベントを受け取る側は ChunkProgress で進捗を表示するため、テキストの進捗は送らない
+        text_notify = notify if emit is None else None
+        track = bool(progress_callback) or emit is not None
+        split_started_at = time.perf_counter()
+        if split_mode == "segment" and indices is None and plan.native is None:
+            tracker = ProgressTracker([sum(durations)], text_notify, on_event=emit) if track else None
+            output_files = await _split_with_segment_muxer(
+                plan, notify, on_chunk_done, token, tracker, report, emit,
+            )
+            report.bytes_read += report.input_bytes
+        elif split_mode == "ranges" and indices is None and plan.native is None:
+            ranges = _group_ranges(len(plan.chunks), max_workers)
+            range_durations = [sum(durations[first:stop]) for first, stop in ranges]
+            tracker = ProgressTracker(range_durations, text_notify, on_event=emit) if track else None
+            output_files = await _split_into_ranges(plan, ranges, notify, on_chunk_done, token, tracker, report, emit)
+            report.bytes_read += report.input_bytes
+        else:
+            tracker = None
+            if track:
+                completed = set(range(len(durations))) - set(indices) if indices is not None else ()
+                tracker = ProgressTracker(durations, text_notify, completed, on_event=emit)
+            controller = _create_controller(plan, min_workers, max_workers) if adaptive_workers else None
+            output_files = await _split_into_chunks(
+                plan, notify, max_workers, controller, indices, on_chunk_done, token, tracker, report, emit,
+                stage.acquire if stage is not None and not verify else None,
+            )
+            # 各チャンクは入力のうち自分の範囲だけを読む
+            executed_s = sum(durations[i] for i in indices) if indices is not None else report.duration_s
+            if report.duration_s > 0:
+                report.bytes_read += int(report.input_bytes * executed_s / report.duration_s)
+        report.split_s = time.perf_counter() - split_started_at
+        if verify:
+            verify_started_at = time.perf_counter()
+            output_files = await _verify_outputs(
+                plan, output_files, int(target_chunk_size_mb * 1024 * 1024), notify, max_workers, token,
+                report, manifest,
+            )
+            report.verify_s = time.perf_counter() - verify_started_at
+        if output_cache is not None and cache_key is not None:
+            await asyncio.to_thread(output_cache.store, cache_key, output_files)
+        return await finish(output_files, stage if verify else None)
 
+    except (SplitCancelledError, asyncio.CancelledError):
+        token.cancel()
+        if plan is not None:
+            # 再開可能なジョブでは完了済みのチャンクを残し、それ以外は書きかけも含めて削除する
+            keep = manifest.completed_chunks() if manifest is not None else set()
+            _remove_outputs(plan, keep)
+        notify("分割をキャンセルしました")
+        raise
     except RuntimeError:
         raise
     except Exception as e:
         raise RuntimeError(f"処理中にエラーが発生しました: {e}")
+    finally:
+        if stage is not None:
+            stage.close()
+        if dispatcher is not None:
+            # 残っているイベントを届け終えるまで、イベントループを止めずに待つ
+            await asyncio.to_thread(dispatcher.close)
+
+
+def split_audio_file(
+    file_path: str,
+    output_dir: str,
+    target_chunk_size_mb: float = 24.5,
+    output_format: str = "m4a",
+    progress_callback: ProgressCallback | None = None,
+    split_mode: SplitMode = "parallel",
+    byte_accurate: bool = False,
+    probe_cache: ProbeCache | None = None,
+    snap_to_silence: bool = False,
+    silence_tolerance_s: float = 5.0,
+    max_workers: int | None = None,
+    adaptive_workers: bool = False,
+    min_workers: int = 1,
+    resume: bool = False,
+    cancel_token: CancellationToken | None = None,
+    capabilities: FfmpegCapabilities | None = None,
+    event_callback: ProgressEventCallback | None = None,
+    packet_index_dir: str | None = None,
+    verify: bool = False,
+    consumer: ChunkConsumer | None = None,
+    consumer_workers: int = 1,
+    consumer_order: ConsumeOrder = "completion",
+    max_pending_chunks: int | None = None,
+    output_cache: OutputCache | None = None,
+) -> SplitResult:
+    """
+    音声ファイルを指定サイズで分割
+
+    split_audio_file_async を新しいイベントループで実行する同期版。引数・戻り値・例外は
+    split_audio_file_async と同じ。実行中のイベントループの中からは呼べないため、
+    asyncio のアプリケーションからは split_audio_file_async を await すること。
+    """
+    return asyncio.run(split_audio_file_async(
+        file_path,
+        output_dir,
+        target_chunk_size_mb=target_chunk_size_mb,
+        output_format=output_format,
+        progress_callback=progress_callback,
+        split_mode=split_mode,
+        byte_accurate=byte_accurate,
+        probe_cache=probe_cache,
+        snap_to_silence=snap_to_silence,
+        silence_tolerance_s=silence_tolerance_s,
+        max_workers=max_workers,
+        adaptive_workers=adaptive_workers,
+        min_workers=min_workers,
+        resume=resume,
+        cancel_token=cancel_token,
+        capabilities=capabilities,
+        event_callback=event_callback,
+        packet_index_dir=packet_index_dir,
+        verify=verify,
+        consumer=consumer,
+        consumer_workers=consumer_workers,
+        consumer_order=consumer_order,
+        max_pending_chunks=max_pending_chunks,
+        output_cache=output_cache,
+    ))
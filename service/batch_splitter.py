@@ -0,0 +1,237 @@
+import glob
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from service.audio_splitter import (
+    ProgressCallback,
+    SplitPlan,
+    _apply_capabilities,
+    _get_file_size_mb,
+    _prepare_split,
+    _remove_outputs,
+    _run_chunk,
+)
+from service.cancellation import CancellationToken
+from service.concurrency import ConcurrencyController
+from service.ffmpeg_capabilities import FfmpegCapabilities
+from service.probe_cache import ProbeCache
+
+# ディレクトリ指定時に対象とする拡張子(GUI のファイル選択ダイアログと同じ)
+AUDIO_EXTENSIONS = (".mp3", ".m4a", ".wav", ".mp4")
+
+# 実行中のファイルと並行して解析・計画を進めるスレッド数
+_PLANNER_WORKERS = 2
+
+
+@dataclass
+class BatchResult:
+    """一括分割の結果"""
+
+    output_files: dict[str, list[str]] = field(default_factory=dict)
+    skipped: list[str] = field(default_factory=list)
+    errors: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def total_chunks(self) -> int:
+        return sum(len(files) for files in self.output_files.values())
+
+
+def _collect_input_files(source: str) -> list[str]:
+    """ディレクトリ(直下の音声ファイル)またはグロブパターンから入力ファイルを列挙"""
+    if os.path.isdir(source):
+        paths = [
+            os.path.join(source, name) for name in os.listdir(source)
+            if name.lower().endswith(AUDIO_EXTENSIONS)
+        ]
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(path for path in paths if os.path.isfile(path))
+
+
+def _output_name_collisions(files: list[str]) -> list[list[str]]:
+    """出力ファイル名の元になる名前(拡張子を除いたファイル名)が重なる入力ファイルの組を返す"""
+    groups: dict[str, list[str]] = {}
+    for path in files:
+        stem = os.path.normcase(os.path.splitext(os.path.basename(path))[0])
+        groups.setdefault(stem, []).append(path)
+    return [paths for paths in groups.values() if len(paths) > 1]
+
+
+def split_audio_batch(
+    source: str,
+    output_dir: str,
+    target_chunk_size_mb: float = 24.5,
+    output_format: str = "m4a",
+    progress_callback: ProgressCallback | None = None,
+    max_workers: int | None = None,
+    byte_accurate: bool = False,
+    probe_cache: ProbeCache | None = None,
+    adaptive_workers: bool = False,
+    min_workers: int = 1,
+    cancel_token: CancellationToken | None = None,
+    capabilities: FfmpegCapabilities | None = None,
+    packet_index_dir: str | None = None,
+) -> BatchResult:
+    """
+    ディレクトリまたはグロブパターンに一致する音声ファイルをまとめて分割
+
+    全ファイルのチャンクを1つのワーカープールで実行する。
+    ファイルの解析・分割計画は別スレッドで先行して進め、計画ができたファイルから
+    順にチャンクを投入するため、小さなファイルが多くても CPU が遊ばない。
+    1ファイルの失敗は errors に記録し、他のファイルの処理は続ける。失敗したファイルの出力済みのチャンクは削除する。
+    出力先は全ファイルで共通のため、拡張子を除いた名前が同じファイル(rec.mp3 と rec.wav など)は
+    互いのチャンクを上書きしないよう分割せず、errors に記録する。
+
+    Args:
+        source: 入力ディレクトリまたはグロブパターン
+        output_dir: 出力ディレクトリ
+        target_chunk_size_mb: 目標チャンクサイズ(MB)
+        output_format: 出力フォーマット (m4a, mp3, mp4等)
+        progress_callback: 進捗コールバック関数 callback(message: str)
+        max_workers: 同時に実行する ffmpeg の数(省略時は CPU 数)
+        byte_accurate: split_audio_file の同名引数と同じ
+        probe_cache: 指定した場合、ffprobe の前にキャッシュを参照する
+        adaptive_workers: True の場合、同時実行数を min_workers〜max_workers の範囲で自動調整する
+        min_workers: 自動調整の下限
+        cancel_token: 指定した場合、cancel() で実行中の ffmpeg を終了させ、
+            未完了のファイルの出力を削除して SplitCancelledError を送出する
+        capabilities: split_audio_file の同名引数と同じ
+        packet_index_dir: split_audio_file の同名引数と同じ
+
+    Returns:
+        ファイルごとの出力パス・分割不要だったファイル・エラーをまとめた BatchResult
+
+    Raises:
+        SplitCancelledError: cancel_token によりキャンセルされた
+    """
+    lock = threading.Lock()
+
+    def notify(message: str) -> None:
+        if progress_callback:
+            with lock:
+                progress_callback(message)
+
+    if capabilities is not None:
+        capabilities.check_output_format(output_format)
+
+    files = _collect_input_files(source)
+    result = BatchResult()
+    notify(f"対象ファイル数: {len(files)}")
+    if not files:
+        return result
+
+    for paths in _output_name_collisions(files):
+        names = ", ".join(os.path.basename(path) for path in paths)
+        for file_path in paths:
+            result.errors[file_path] = f"出力ファイル名が重複するため分割しません: {names}"
+        notify(f"エラー: 出力ファイル名が重複するため分割しません: {names}")
+    targets = [path for path in files if path not in result.errors]
+
+    def plan_file(file_path: str) -> SplitPlan | None:
+        name = os.path.basename(file_path)
+        file_size_mb = _get_file_size_mb(file_path)
+        if file_size_mb <= target_chunk_size_mb:
+            return None
+
+        def file_notify(message: str) -> None:
+            notify(f"{name}: {message}")
+
+        plan = _prepare_split(
+            file_path, file_size_mb, output_dir, target_chunk_size_mb, output_format, file_notify,
+            byte_accurate=byte_accurate,
+            probe_cache=probe_cache,
+            cancel_token=cancel_token,
+            packet_index_dir=packet_index_dir,
+        )
+        if capabilities is not None:
+            _apply_capabilities(plan, capabilities, file_notify)
+        return plan
+
+    plans: dict[str, SplitPlan] = {}
+    pending: dict[str, int] = {}
+    outputs: dict[str, list[str]] = {}
+
+    workers = max_workers or os.cpu_count() or 1
+    controller = ConcurrencyController(min_workers, workers, workers) if adaptive_workers else None
+
+    def run_chunk(plan: SplitPlan, index: int) -> None:
+        try:
+            if plan.file_path in result.errors:
+                return
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            output_path = _run_chunk(plan, index, cancel_token)
+        finally:
+            if controller is not None:
+                controller.release(plan.chunks[index][1])
+        with lock:
+            outputs[plan.file_path][index] = output_path
+            pending[plan.file_path] -= 1
+            remaining = pending[plan.file_path]
+        if remaining == 0:
+            notify(f"{os.path.basename(plan.file_path)}: 分割が完了しました")
+
+    if controller is not None:
+        notify(f"一括分割を開始します (並列数: 自動 {controller.floor}〜{controller.ceiling})")
+    else:
+        notify(f"一括分割を開始します (並列数: {workers})")
+
+    chunk_futures: dict[Future, str] = {}
+    with ThreadPoolExecutor(max_workers=workers) as chunk_pool, \
+            ThreadPoolExecutor(max_workers=max(1, min(_PLANNER_WORKERS, len(targets)))) as plan_pool:
+        plan_futures = {plan_pool.submit(plan_file, path): path for path in targets}
+        for future in as_completed(plan_futures):
+            file_path = plan_futures[future]
+            try:
+                plan = future.result()
+            except Exception as e:
+                result.errors[file_path] = str(e)
+                notify(f"{os.path.basename(file_path)}: エラー: {e}")
+                continue
+            if plan is None:
+                result.skipped.append(file_path)
+                continue
+            with lock:
+                plans[file_path] = plan
+                outputs[file_path] = [""] * len(plan.chunks)
+                pending[file_path] = len(plan.chunks)
+            for index in range(len(plan.chunks)):
+                if controller is not None:
+                    controller.acquire()
+                chunk_futures[chunk_pool.submit(run_chunk, plan, index)] = file_path
+
+        for future in as_completed(chunk_futures):
+            file_path = chunk_futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                if file_path not in result.errors:
+                    result.errors[file_path] = str(e)
+                    notify(f"{os.path.basename(file_path)}: エラー: {e}")
+
+    # 失敗したファイルは、出力できたチャンクも含めて削除する
+    for file_path, plan in plans.items():
+        if file_path in result.errors:
+            _remove_outputs(plan, set())
+
+    if cancel_token is not None and cancel_token.cancelled:
+        # 全チャンクが揃ったファイルは残し、途中のファイルは書きかけも含めて削除する
+        for file_path, plan in plans.items():
+            if pending[file_path] > 0:
+                _remove_outputs(plan, set())
+        notify("一括分割をキャンセルしました")
+        cancel_token.raise_if_cancelled()
+
+    for file_path in files:
+        if file_path in outputs and file_path not in result.errors:
+            result.output_files[file_path] = outputs[file_path]
+    result.skipped.sort()
+
+    notify(
+        f"一括分割が完了しました (成功: {len(result.output_files)}, "
+        f"分割不要: {len(result.skipped)}, エラー: {len(result.errors)}, "
+        f"チャンク数: {result.total_chunks})"
+    )
+    return result
@@ -0,0 +1,60 @@
+import asyncio
+import subprocess
+import threading
+
+
+# subprocess と asyncio のどちらで起動したプロセスも登録できる
+_Process = subprocess.Popen | asyncio.subprocess.Process
+
+
+class SplitCancelledError(RuntimeError):
+    """分割処理がキャンセルされた"""
+
+
+class CancellationToken:
+    """
+    分割処理を外部から中止するためのトークン
+
+    cancel() を呼ぶと、登録中の ffmpeg/ffprobe プロセスを即座に終了させ、
+    以降のチャンクは開始前に SplitCancelledError で打ち切られる。
+    """
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._processes: set[_Process] = set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """キャンセルを要求し、実行中のプロセスを終了させる"""
+        with self._lock:
+            self._event.set()
+            processes = list(self._processes)
+        for process in processes:
+            _kill(process)
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise SplitCancelledError("処理がキャンセルされました")
+
+    def register(self, process: _Process) -> None:
+        """実行中のプロセスを登録(キャンセル済みなら即座に終了させる)"""
+        with self._lock:
+            if not self._event.is_set():
+                self._processes.add(process)
+                return
+        _kill(process)
+
+    def unregister(self, process: _Process) -> None:
+        with self._lock:
+            self._processes.discard(process)
+
+
+def _kill(process: _Process) -> None:
+    try:
+        process.kill()
+    except OSError:
+        pass
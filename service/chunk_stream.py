@@ -0,0 +1,199 @@
+import asyncio
+import contextlib
+import os
+import queue
+import threading
+from collections.abc import AsyncGenerator, Callable, Iterator
+from dataclasses import dataclass
+
+from service.audio_splitter import (
+    SplitPlan,
+    _apply_capabilities,
+    _get_file_size_mb,
+    _get_output_filename,
+    _prepare_split,
+    _read_span_async,
+)
+from service.cancellation import CancellationToken
+from service.ffmpeg_capabilities import FfmpegCapabilities
+from service.probe_cache import ProbeCache
+
+ProgressCallback = Callable[[str], None]
+
+# 同期版のジェネレータで、バックグラウンドのイベントループと受け渡しを待つ間隔(秒)
+_HANDOFF_POLL_S = 0.1
+
+
+@dataclass(frozen=True)
+class AudioChunk:
+    """メモリ上に切り出した1チャンク(data は出力形式のファイルの内容そのもの)"""
+
+    index: int
+    start_s: float
+    duration_s: float
+    data: bytes
+
+
+class FileSink:
+    """
+    AudioChunk を split_audio_file と同じ名前のファイルとして output_dir に書き出す
+
+    iter_audio_chunks の出力先の1つとして使う。呼び出すと書き出したパスを返す。
+    """
+
+    def __init__(self, file_path: str, output_dir: str, output_format: str) -> None:
+        self.file_path = file_path
+        self.output_dir = output_dir
+        self.output_format = output_format
+        os.makedirs(output_dir, exist_ok=True)
+
+    def __call__(self, chunk: AudioChunk) -> str:
+        output_path = _get_output_filename(self.file_path, self.output_dir, chunk.index, self.output_format)
+        temp_path = f"{output_path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(chunk.data)
+        os.replace(temp_path, output_path)
+        return output_path
+
+
+async def iter_audio_chunks_async(
+    file_path: str,
+    target_chunk_size_mb: float = 24.5,
+    output_format: str = "m4a",
+    progress_callback: ProgressCallback | None = None,
+    max_workers: int | None = None,
+    byte_accurate: bool = False,
+    probe_cache: ProbeCache | None = None,
+    cancel_token: CancellationToken | None = None,
+    capabilities: FfmpegCapabilities | None = None,
+) -> AsyncGenerator[AudioChunk, None]:
+    """
+    音声ファイルを分割し、各チャンクをファイルに書かずにチャンク番号の順に返す(asyncio 版)
+
+    ffmpeg は標準出力へ書き出し(mp4 系はフラグメント形式)、PCM WAV → wav・MP3 → mp3 は入力の該当範囲を
+    直接読み取る。先に進めるのは max_workers 個(省略時は CPU 数)までで、受け取られていないチャンクも
+    この数に含めるため、メモリ使用量はおよそ max_workers × チャンクサイズに収まる。
+    split_audio_file と違い、目標サイズ以下のファイルも1チャンクとして返す。
+    途中でジェネレータを閉じると、先読み中の ffmpeg を終了させる(cancel_token はキャンセルしない)。
+
+    Raises:
+        FileNotFoundError: 入力ファイルが存在しない
+        RuntimeError: ffmpeg/ffprobe 関連のエラー
+        SplitCancelledError: cancel_token によりキャンセルされた
+    """
+    def notify(message: str) -> None:
+        if progress_callback:
+            progress_callback(message)
+
+    if capabilities is not None:
+        capabilities.check_output_format(output_format)
+
+    file_size_mb = _get_file_size_mb(file_path)
+    token = cancel_token if cancel_token is not None else CancellationToken()
+
+    def prepare() -> SplitPlan:
+        plan = _prepare_split(
+            file_path, file_size_mb, "", target_chunk_size_mb, output_format, notify,
+            byte_accurate=byte_accurate,
+            probe_cache=probe_cache,
+            cancel_token=token,
+        )
+        if capabilities is not None:
+            _apply_capabilities(plan, capabilities, notify)
+        return plan
+
+    plan = await asyncio.to_thread(prepare)
+    num_chunks = len(plan.chunks)
+    window = max(1, max_workers or os.cpu_count() or 1)
+    tasks: dict[int, asyncio.Task[bytes]] = {}
+    next_index = 0
+    try:
+        for index in range(num_chunks):
+            while next_index < num_chunks and next_index < index + window:
+                start_s, duration_s = plan.chunks[next_index]
+                tasks[next_index] = asyncio.ensure_future(_read_span_async(plan, start_s, duration_s, token))
+                next_index += 1
+            data = await tasks.pop(index)
+            start_s, duration_s = plan.chunks[index]
+            notify(f"チャンク {index + 1}/{num_chunks} を出力しました")
+            yield AudioChunk(index, start_s, duration_s, data)
+    finally:
+        # 途中で閉じられた・失敗した場合は先読み中のチャンクを取りやめる(実行中の ffmpeg は終了させる)
+        for task in tasks.values():
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+
+def iter_audio_chunks(
+    file_path: str,
+    target_chunk_size_mb: float = 24.5,
+    output_format: str = "m4a",
+    progress_callback: ProgressCallback | None = None,
+    max_workers: int | None = None,
+    byte_accurate: bool = False,
+    probe_cache: ProbeCache | None = None,
+    cancel_token: CancellationToken | None = None,
+    capabilities: FfmpegCapabilities | None = None,
+) -> Iterator[AudioChunk]:
+    """
+    iter_audio_chunks_async の同期版
+
+    バックグラウンドのスレッドでイベントループを動かすため、呼び出し側がチャンクを処理している間も
+    次のチャンクの切り出しは進む。引数・例外は iter_audio_chunks_async と同じ。
+    """
+    # 受け渡し待ちは1つだけにし、残りは iter_audio_chunks_async の先読みの数で抑える
+    handoff: queue.Queue[tuple[str, object]] = queue.Queue(maxsize=1)
+    stopped = threading.Event()
+    running: list[tuple[asyncio.AbstractEventLoop, asyncio.Task]] = []
+
+    def put(item: tuple[str, object]) -> None:
+        while not stopped.is_set():
+            try:
+                handoff.put(item, timeout=_HANDOFF_POLL_S)
+                return
+            except queue.Full:
+                continue
+
+    async def pump() -> None:
+        task = asyncio.current_task()
+        assert task is not None
+        running.append((asyncio.get_running_loop(), task))
+        if stopped.is_set():
+            return
+        async with contextlib.aclosing(iter_audio_chunks_async(
+            file_path, target_chunk_size_mb, output_format, progress_callback, max_workers,
+            byte_accurate, probe_cache, cancel_token, capabilities,
+        )) as chunks:
+            async for chunk in chunks:
+                await asyncio.to_thread(put, ("chunk", chunk))
+
+    def run() -> None:
+        try:
+            asyncio.run(pump())
+            put(("done", None))
+        except BaseException as e:
+            put(("error", e))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        while True:
+            kind, value = handoff.get()
+            if kind == "chunk":
+                assert isinstance(value, AudioChunk)
+                yield value
+            elif kind == "error":
+                assert isinstance(value, BaseException)
+                raise value
+            else:
+                return
+    finally:
+        # 途中で閉じられた場合は、先読み中の ffmpeg を終了させてからスレッドの終了を待つ
+        stopped.set()
+        for loop, task in running:
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                pass
+        thread.join()
@@ -0,0 +1,101 @@
+import asyncio
+import os
+from dataclasses import dataclass
+
+from service.cancellation import CancellationToken
+from service.ffmpeg_runner import _probe_audio
+from service.mp3_splitter import read_mp3_info
+from service.wav_splitter import read_wav_info
+
+# 長さの許容誤差。再エンコードではエンコーダの遅延・パディング、ストリームコピーではパケット単位の
+# シークにより、チャンクの長さは計画から数十ミリ秒ずれる
+_DURATION_TOLERANCE_S = 0.5
+_DURATION_TOLERANCE_RATIO = 0.01
+
+
+def _duration_tolerance(expected_s: float) -> float:
+    return max(_DURATION_TOLERANCE_S, expected_s * _DURATION_TOLERANCE_RATIO)
+
+
+@dataclass(frozen=True)
+class ChunkCheck:
+    """1チャンクの検証結果(duration_s は読み取れなかった場合 None)"""
+
+    index: int
+    path: str
+    size_bytes: int
+    max_bytes: int
+    duration_s: float | None
+    expected_s: float
+
+    @property
+    def oversized(self) -> bool:
+        return self.size_bytes > self.max_bytes
+
+    @property
+    def truncated(self) -> bool:
+        """出力が無い・読めない、または長さが計画と一致しない"""
+        if self.duration_s is None:
+            return True
+        return abs(self.duration_s - self.expected_s) > _duration_tolerance(self.expected_s)
+
+
+def _measure_duration(path: str, output_format: str) -> float | None:
+    """
+    出力ファイルの再生時間(読み取れなければ None)
+
+    WAV はヘッダ、MP3 はフレーム数から求める(ビットレートからの推定では途中で切れたファイルを見逃すため)。
+    それ以外は ffprobe でコンテナの再生時間を取得する。
+    """
+    output_format = output_format.lower()
+    if output_format == "wav":
+        wav = read_wav_info(path)
+        if wav is not None:
+            return wav.duration_s
+    elif output_format == "mp3":
+        mp3 = read_mp3_info(path)
+        if mp3 is not None:
+            return mp3.duration_s
+    try:
+        return _probe_audio(path)[0]
+    except (RuntimeError, OSError):
+        return None
+
+
+def check_chunk(index: int, path: str, expected_s: float, max_bytes: int, output_format: str) -> ChunkCheck:
+    """チャンクのサイズと再生時間を調べる"""
+    try:
+        size_bytes = os.path.getsize(path)
+    except OSError:
+        return ChunkCheck(index, path, 0, max_bytes, None, expected_s)
+    duration_s = _measure_duration(path, output_format) if size_bytes > 0 else None
+    return ChunkCheck(index, path, size_bytes, max_bytes, duration_s, expected_s)
+
+
+async def check_chunks(
+    chunks: list[tuple[int, str, float]],
+    max_bytes: int,
+    output_format: str,
+    max_workers: int | None = None,
+    cancel_token: CancellationToken | None = None,
+) -> list[ChunkCheck]:
+    """
+    (チャンク番号, 出力パス, 計画の長さ) の各チャンクを max_workers 個(省略時は CPU 数)ずつ並列に検証する
+
+    結果は chunks と同じ順に返す。
+    """
+    semaphore = asyncio.Semaphore(max(1, max_workers or os.cpu_count() or 1))
+
+    async def check(index: int, path: str, expected_s: float) -> ChunkCheck:
+        async with semaphore:
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            return await asyncio.to_thread(check_chunk, index, path, expected_s, max_bytes, output_format)
+
+    return list(await asyncio.gather(*(check(*chunk) for chunk in chunks)))
+
+
+def total_duration_matches(checks: list[ChunkCheck], expected_total_s: float) -> bool:
+    """チャンクの再生時間の合計が入力の再生時間と一致するか"""
+    total_s = sum(check.duration_s or 0.0 for check in checks)
+    return abs(total_s - expected_total_s) <= max(1.0, expected_total_s * _DURATION_TOLERANCE_RATIO)
@@ -0,0 +1,220 @@
+"""
+GUI を使わずに音声ファイルを分割するコマンドラインツール
+
+    python -m service.cli input.m4a -o output --target-mb 20 --format m4a --workers 4
+
+標準出力には1行に1つの JSON を書き出す。分割中は進捗("event" が job_started・chunk_progress など)、
+最後に結果("event": "result")を出力する。--quiet を指定すると結果だけを出力する。
+既定値は utils/config.ini(GUI と同じ設定)から読み、引数で上書きする。
+
+cron やコンテナから起動するため、tkinter・app パッケージは読み込まない。分割処理のモジュール(numpy を含む)は
+引数の解釈が終わってから読み込み、--help や引数の誤りではすぐに終了する。
+"""
+import argparse
+import configparser
+import contextlib
+import json
+import os
+import re
+import signal
+import sys
+import threading
+import time
+from dataclasses import asdict
+from typing import Any, TextIO
+
+# 起動時間の計測の基準(インタプリタ自体の起動は含まない)
+_STARTED_AT = time.perf_counter()
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_NOT_FOUND = 3
+EXIT_SPLIT_ERROR = 4
+EXIT_CANCELLED = 130
+
+_SPLIT_MODES = ("parallel", "segment", "ranges")
+
+
+class JsonLinesWriter:
+    """1行に1つの JSON を書き出す(進捗イベントは別スレッドから届くためロックする)"""
+
+    def __init__(self, stream: TextIO, quiet: bool = False) -> None:
+        self._stream = stream
+        self._quiet = quiet
+        self._lock = threading.Lock()
+
+    def write(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._stream.write(line + "\n")
+            self._stream.flush()
+
+    def message(self, message: str) -> None:
+        if not self._quiet:
+            self.write({"event": "message", "message": message})
+
+    def progress(self, event: Any) -> None:
+        if not self._quiet:
+            self.write({"event": _event_name(event), **asdict(event)})
+
+
+def _event_name(event: Any) -> str:
+    """ChunkProgress → chunk_progress"""
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", type(event).__name__).lower()
+
+
+def _load_defaults() -> configparser.ConfigParser:
+    """utils/config.ini を読む(無い・壊れている場合は空の設定。load_config の表示は標準エラーへ)"""
+    from utils.config_manager import load_config
+
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            return load_config()
+    except (OSError, configparser.Error):
+        return configparser.ConfigParser()
+
+
+def _config_bool(config: configparser.ConfigParser, section: str, key: str) -> bool:
+    return config.get(section, key, fallback="False").strip().lower() in ("true", "1", "yes", "on")
+
+
+def _build_parser(config: configparser.ConfigParser) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m service.cli",
+        description="音声ファイルを目標サイズ以下のチャンクに分割し、結果を JSON で出力する",
+    )
+    parser.add_argument("input", help="入力ファイル")
+    parser.add_argument(
+        "-o", "--output-dir", default=config.get("Paths", "output_path", fallback=None),
+        help="出力ディレクトリ(省略時は設定ファイルの [Paths] output_path)",
+    )
+    parser.add_argument(
+        "--target-mb", type=float, default=config.getfloat("Audio", "target_size_mb", fallback=24.5),
+        help="目標チャンクサイズ(MB)",
+    )
+    parser.add_argument(
+        "--format", dest="output_format", default=config.get("Audio", "output_file_format", fallback="m4a"),
+        help="出力フォーマット (m4a, mp3, mp4, wav)",
+    )
+    parser.add_argument("--workers", type=int, help="ffmpeg の同時実行数(省略時は CPU 数)")
+    parser.add_argument("--adaptive", action="store_true", help="同時実行数を自動調整する(--workers が上限)")
+    parser.add_argument("--mode", choices=_SPLIT_MODES, default="parallel", help="分割方式")
+    parser.add_argument("--byte-accurate", action="store_true", help="パケット単位で目標サイズまで詰める(VBR 向け)")
+    parser.add_argument("--snap-to-silence", action="store_true", help="分割位置を近くの無音区間へ移す")
+    parser.add_argument(
+        "--resume", action=argparse.BooleanOptionalAction, default=_config_bool(config, "Audio", "resume_jobs"),
+        help="中断したジョブの未完了のチャンクだけを作り直す",
+    )
+    parser.add_argument(
+        "--verify", action=argparse.BooleanOptionalAction, default=_config_bool(config, "Audio", "verify_chunks"),
+        help="分割後に各チャンクを検証し、目標サイズを超えたチャンクを分け直す",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="キャッシュ(ffprobe の結果・分割結果)を使わない")
+    parser.add_argument("-q", "--quiet", action="store_true", help="進捗を出力せず、結果だけを出力する")
+    return parser
+
+
+def _install_signal_handlers(cancel: Any) -> None:
+    """SIGTERM(コンテナの停止など)で分割をキャンセルする。SIGINT は KeyboardInterrupt のまま扱う"""
+    if threading.current_thread() is not threading.main_thread():
+        return
+    with contextlib.suppress(ValueError, OSError):
+        signal.signal(signal.SIGTERM, lambda _signum, _frame: cancel())
+
+
+def _result(status: str, exit_code: int, **fields: Any) -> dict[str, Any]:
+    return {"event": "result", "status": status, "exit_code": exit_code, **fields}
+
+
+def main(argv: list[str] | None = None, stdout: TextIO | None = None) -> int:
+    """
+    コマンドラインツールの本体
+
+    Returns:
+        終了コード。0: 成功 / 1: 予期しないエラー / 2: 引数の誤り / 3: 入力ファイルが無い /
+        4: ffmpeg/ffprobe 関連のエラー / 130: キャンセル(SIGINT/SIGTERM)
+    """
+    config = _load_defaults()
+    parser = _build_parser(config)
+    args = parser.parse_args(argv)
+    writer = JsonLinesWriter(stdout or sys.stdout, quiet=args.quiet)
+
+    if not args.output_dir:
+        parser.error("出力ディレクトリ(-o)を指定してください")
+    if args.target_mb <= 0:
+        parser.error("--target-mb には正の値を指定してください")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers には 1 以上を指定してください")
+    if not os.path.isfile(args.input):
+        writer.write(_result(
+            "error", EXIT_NOT_FOUND, error="FileNotFoundError", message=f"ファイルが見つかりません: {args.input}",
+        ))
+        return EXIT_NOT_FOUND
+
+    # 分割処理のモジュールはここで初めて読み込む
+    import_started = time.perf_counter()
+    from service.audio_splitter import split_audio_file
+    from service.cancellation import CancellationToken, SplitCancelledError
+    from service.ffmpeg_capabilities import discover_capabilities
+    from service.output_cache import open_output_cache
+    from service.probe_cache import open_probe_cache
+    startup = {
+        "startup_s": round(time.perf_counter() - _STARTED_AT, 4),
+        "import_s": round(time.perf_counter() - import_started, 4),
+    }
+
+    token = CancellationToken()
+    _install_signal_handlers(token.cancel)
+    try:
+        probe_cache = None if args.no_cache else open_probe_cache(config)
+        output_cache = None if args.no_cache else open_output_cache(config)
+        capabilities = discover_capabilities(probe_cache)
+        capabilities.check_output_format(args.output_format, segment=args.mode == "segment")
+        result = split_audio_file(
+            args.input,
+            args.output_dir,
+            target_chunk_size_mb=args.target_mb,
+            output_format=args.output_format,
+            progress_callback=writer.message,
+            event_callback=writer.progress,
+            split_mode=args.mode,
+            byte_accurate=args.byte_accurate,
+            probe_cache=probe_cache,
+            snap_to_silence=args.snap_to_silence,
+            max_workers=args.workers,
+            adaptive_workers=args.adaptive,
+            resume=args.resume,
+            verify=args.verify,
+            cancel_token=token,
+            capabilities=capabilities,
+            output_cache=output_cache,
+        )
+    except (SplitCancelledError, KeyboardInterrupt):
+        token.cancel()
+        writer.write(_result("cancelled", EXIT_CANCELLED, message="処理がキャンセルされました", **startup))
+        return EXIT_CANCELLED
+    except FileNotFoundError as e:
+        writer.write(_result("error", EXIT_NOT_FOUND, error=type(e).__name__, message=str(e), **startup))
+        return EXIT_NOT_FOUND
+    except RuntimeError as e:
+        writer.write(_result("error", EXIT_SPLIT_ERROR, error=type(e).__name__, message=str(e), **startup))
+        return EXIT_SPLIT_ERROR
+    except Exception as e:
+        writer.write(_result("error", EXIT_FAILED, error=type(e).__name__, message=str(e), **startup))
+        return EXIT_FAILED
+
+    report = getattr(result, "report", None)
+    writer.write(_result(
+        "ok", EXIT_OK,
+        input=args.input,
+        output_dir=args.output_dir,
+        outputs=list(result),
+        report=report.to_dict() if report is not None else None,
+        **startup,
+    ))
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import configparser
+import os
+import threading
+import time
+from collections.abc import Callable
+
+from utils.config_manager import get_config_value
+
+# 過負荷とみなす CPU 1つあたりの実行待ちプロセス数と、空きメモリの下限(MB)。
+# CPU 律速の再エンコードは CPU 使用率が 100% でも正常なため、使用率では判断しない
+_OVERLOAD_RUN_QUEUE_PER_CPU = 1.5
+_MIN_AVAILABLE_MB = 512.0
+# スループットが何割変化したら増減の判断をするか
+_IMPROVE_RATIO = 1.05
+_DEGRADE_RATIO = 0.90
+
+
+def _run_queue_length() -> float:
+    """実行中・実行待ちのプロセス数(Linux は現在の値、それ以外は1分間の平均負荷)"""
+    try:
+        with open("/proc/loadavg", encoding="ascii") as f:
+            # "0.13 0.50 0.53 2/72 8659" の4番目が 実行可能なプロセス数/全プロセス数(読んでいる自分自身を含む)
+            return max(0.0, float(f.read().split()[3].split("/")[0]) - 1)
+    except (OSError, ValueError, IndexError):
+        import psutil
+
+        return psutil.getloadavg()[0]
+
+
+def _sample_system_load() -> tuple[float, float]:
+    """CPU 1つあたりの実行待ちプロセス数と空きメモリ(MB)を取得"""
+    # 自動調整を使う場合だけ必要なため、コマンドラインツールの起動時には読み込まない
+    import psutil
+
+    return _run_queue_length() / (os.cpu_count() or 1), psutil.virtual_memory().available / (1024 * 1024)
+
+
+class ConcurrencyController:
+    """
+    実行中の ffmpeg プロセス数を AIMD 方式で調整するコントローラ
+
+    同時実行数と同じ数のチャンクが完了するたびに、その間のスループット
+    (処理した再生時間 / 経過時間)と実行待ちのプロセス数・空きメモリを評価する。
+    スループットが伸びていれば1つ増やし(加算増加)、CPU 数を超えてプロセスが実行を待っているか
+    メモリが逼迫したか、スループットが落ちた場合は半分に減らす(乗算減少)。値は floor 以上 ceiling 以下。
+    減らした後は、比べる基準のスループットも同じ割合で下げる(減らしたこと自体による低下で減らし続けないため)。
+    """
+
+    def __init__(
+        self,
+        floor: int,
+        ceiling: int,
+        initial: int | None = None,
+        sample_load: Callable[[], tuple[float, float]] = _sample_system_load,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.floor = max(1, floor)
+        self.ceiling = max(self.floor, ceiling)
+        self._limit = min(self.ceiling, max(self.floor, initial if initial is not None else self.floor))
+        self._sample_load = sample_load
+        self._clock = clock
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._window_start = clock()
+        self._window_media_s = 0.0
+        self._window_done = 0
+        self._previous_rate: float | None = None
+
+    @property
+    def limit(self) -> int:
+        """現在の同時実行数の上限"""
+        return self._limit
+
+    def acquire(self) -> None:
+        """実行枠が空くまで待つ"""
+        with self._condition:
+            while self._in_flight >= self._limit:
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, media_s: float = 0.0) -> None:
+        """実行枠を返し、処理した再生時間を記録する"""
+        with self._condition:
+            self._in_flight -= 1
+            self._window_media_s += media_s
+            self._window_done += 1
+            if self._window_done >= self._limit:
+                self._adjust()
+            self._condition.notify_all()
+
+    def _adjust(self) -> None:
+        now = self._clock()
+        elapsed = max(now - self._window_start, 1e-6)
+        rate = self._window_media_s / elapsed
+        run_queue_per_cpu, available_mb = self._sample_load()
+
+        previous_limit = self._limit
+        if run_queue_per_cpu > _OVERLOAD_RUN_QUEUE_PER_CPU or available_mb < _MIN_AVAILABLE_MB:
+            self._limit = max(self.floor, self._limit // 2)
+        elif self._previous_rate is None or rate >= self._previous_rate * _IMPROVE_RATIO:
+            self._limit = min(self.ceiling, self._limit + 1)
+        elif rate < self._previous_rate * _DEGRADE_RATIO:
+            self._limit = max(self.floor, self._limit // 2)
+
+        if self._limit < previous_limit:
+            self._previous_rate = rate * self._limit / previous_limit
+        else:
+            self._previous_rate = rate
+        self._window_start = now
+        self._window_media_s = 0.0
+        self._window_done = 0
+
+
+def load_concurrency_settings(config: configparser.ConfigParser) -> tuple[bool, int, int]:
+    """設定ファイルの [Concurrency] セクションから (自動調整の有無, 下限, 上限) を読む"""
+    cpu_count = os.cpu_count() or 1
+    adaptive = str(get_config_value(config, 'Concurrency', 'adaptive', 'False') or 'False')
+    try:
+        floor = int(str(get_config_value(config, 'Concurrency', 'min_workers', 1) or 1))
+        ceiling = int(str(get_config_value(config, 'Concurrency', 'max_workers', cpu_count) or cpu_count))
+    except ValueError:
+        floor, ceiling = 1, cpu_count
+    return adaptive.strip().lower() in ('true', '1', 'yes', 'on'), max(1, floor), max(1, floor, ceiling)
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Literal
+
+# 出力されたチャンクを呼び出し側の処理へ渡す関数 consumer(チャンク番号, 出力パス)
+ChunkConsumer = Callable[[int, str], Any]
+# completion: 出力された順 / index: チャンク番号の順
+ConsumeOrder = Literal["completion", "index"]
+
+
+class ConsumerStage:
+    """
+    出力されたチャンクを呼び出し側の後段の処理(アップロード・文字起こしなど)へ渡す段
+
+    consumer は専用のスレッドプール(workers 個)で実行するため、分割の完了を待たずに並行して進む。
+    order="index" の場合は、前のチャンクを渡し終えるまで後のチャンクを保留する。
+    max_pending は開始済み(ffmpeg の実行中を含む)で consumer の処理が終わっていないチャンク数の上限で、
+    consumer が追いつかず上限に達すると、acquire で次のチャンクの開始を待たせる(背圧)。
+    consumer が失敗した場合、以降のチャンクは開始せず、drain で RuntimeError を送出する。
+    """
+
+    def __init__(
+        self,
+        consumer: ChunkConsumer,
+        workers: int = 1,
+        order: ConsumeOrder = "completion",
+        max_pending: int | None = None,
+        started_at: float | None = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self._consumer = consumer
+        self._order = order
+        self._executor = ThreadPoolExecutor(max(1, workers), thread_name_prefix="chunk-consumer")
+        self._slots = asyncio.Semaphore(max(1, max_pending or 2 * max(1, workers)))
+        self._loop = asyncio.get_running_loop()
+        self._clock = clock
+        # 処理が既に終わっていれば add_done_callback はロックを持ったまま _on_done を呼ぶため、再入可能にする
+        self._lock = threading.RLock()
+        self._expected: list[int] = []
+        self._held: dict[int, str] = {}
+        self._next = 0
+        self._futures: dict[int, Future] = {}
+        self._error: BaseException | None = None
+        # 最初の consumer の処理が終わるまでの時間(started_at、省略時は作成時から)
+        self._started_at = started_at if started_at is not None else clock()
+        self.first_result_s: float | None = None
+
+    def expect(self, indices: list[int]) -> None:
+        """このジョブで出力するチャンク番号(order="index" の順序に使う)"""
+        with self._lock:
+            self._expected = list(indices)
+            self._next = 0
+
+    async def acquire(self) -> None:
+        """次のチャンクを開始する前に呼ぶ。未処理のチャンクが上限に達していれば空きが出るまで待つ"""
+        self._raise_if_failed()
+        await self._slots.acquire()
+        self._raise_if_failed()
+
+    def submit(self, index: int, output_path: str) -> None:
+        """出力されたチャンクを渡す(どのスレッドから呼んでもよい)"""
+        with self._lock:
+            if self._order == "completion":
+                self._start(index, output_path)
+                return
+            self._held[index] = output_path
+            while self._next < len(self._expected) and self._expected[self._next] in self._held:
+                ready = self._expected[self._next]
+                self._next += 1
+                self._start(ready, self._held.pop(ready))
+
+    def _start(self, index: int, output_path: str) -> None:
+        future = self._executor.submit(self._consumer, index, output_path)
+        self._futures[index] = future
+        future.add_done_callback(lambda f: self._on_done(index, f))
+
+    def _on_done(self, index: int, future: Future) -> None:
+        if future.cancelled():
+            return
+        error = future.exception()
+        with self._lock:
+            if error is not None and self._error is None:
+                self._error = RuntimeError(f"チャンク {index + 1} の後処理に失敗しました: {error}")
+            if error is None and self.first_result_s is None:
+                self.first_result_s = self._clock() - self._started_at
+        try:
+            self._loop.call_soon_threadsafe(self._slots.release)
+        except RuntimeError:
+            # イベントループが既に終了している(キャンセル後など)
+            pass
+
+    def _raise_if_failed(self) -> None:
+        with self._lock:
+            error = self._error
+        if error is not None:
+            raise error
+
+    async def drain(self) -> list[Any]:
+        """
+        渡した全チャンクの処理を待ち、consumer の戻り値をチャンク番号の順に返す
+
+        Raises:
+            RuntimeError: consumer が失敗した
+        """
+        with self._lock:
+            futures = dict(self._futures)
+        await asyncio.gather(*(asyncio.wrap_future(f) for f in futures.values()), return_exceptions=True)
+        self._executor.shutdown(wait=False)
+        self._raise_if_failed()
+        return [futures[index].result() for index in sorted(futures)]
+
+    def close(self) -> None:
+        """未開始の処理を取りやめる(実行中の consumer は最後まで実行される)"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,98 @@
+from math import ceil
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+# (開始秒, 長さ秒)
+ChunkSpan = tuple[float, float]
+
+# 出力コンテナごとのオーバーヘッド見積もり (固定バイト数, パケットあたりのバイト数)
+# mp4/m4a は moov 内のサンプルテーブル(stsz/stts/stco 等)がパケット数に比例して増える
+_MUX_OVERHEAD = {"m4a": (8192, 16), "mp4": (8192, 16), "mp3": (2048, 0)}
+_DEFAULT_MUX_OVERHEAD = (8192, 16)
+
+
+def _plan_uniform(duration_s: float, num_chunks: int) -> list[ChunkSpan]:
+    """再生時間を等分した分割計画(固定ビットレート前提)"""
+    chunk_duration_s = duration_s / num_chunks
+    return [(index * chunk_duration_s, chunk_duration_s) for index in range(num_chunks)]
+
+
+def _plan_for_silence(
+    duration_s: float,
+    file_size_mb: float,
+    target_chunk_size_mb: float,
+    tolerance_s: float,
+) -> tuple[list[ChunkSpan], float]:
+    """
+    分割位置を前後 tolerance_s 秒動かしても目標サイズを超えないよう、等分の分割計画を立てる
+
+    Returns:
+        (分割計画, 実際に使う探索幅)。チャンクが短く探索幅が大きすぎる場合は幅を縮める
+    """
+    max_chunk_s = duration_s * target_chunk_size_mb / file_size_mb
+    tolerance_s = min(tolerance_s, max_chunk_s / 4)
+    num_chunks = ceil(duration_s / (max_chunk_s - 2 * tolerance_s))
+    return _plan_uniform(duration_s, num_chunks), tolerance_s
+
+
+def _spans_from_boundaries(boundaries: list[float], duration_s: float) -> list[ChunkSpan]:
+    """分割位置の列から分割計画を作る(先頭は0秒、前の位置以前になった分割位置は捨てる)"""
+    starts = [0.0]
+    for boundary in boundaries:
+        if boundary > starts[-1]:
+            starts.append(boundary)
+    bounds = starts + [max(duration_s, starts[-1])]
+    return [(bounds[i], bounds[i + 1] - bounds[i]) for i in range(len(starts))]
+
+
+def _budget_cuts(costs: ArrayLike, budget: int, keyframes: ArrayLike | None = None) -> list[int]:
+    """
+    先頭から各区間のコストの合計が budget を超えないよう最大限詰めたときの、2番目以降の区間の先頭の番号
+
+    1要素だけで budget を超える場合は、その要素単独の区間とする。
+    keyframes(要素ごとのキーフレームフラグ)を指定した場合は、区間内で最後のキーフレームの前で区切る。
+    累積和を二分探索するため、計算量は区間の数に比例する(要素が数百万あっても速い)。
+    """
+    cost_array = np.asarray(costs, dtype=np.int64)
+    # cumulative[k] は先頭 k 要素のコストの合計
+    cumulative = np.concatenate(([0], np.cumsum(cost_array)))
+    keyframe_indices = np.flatnonzero(np.asarray(keyframes)) if keyframes is not None else None
+    count = len(cost_array)
+
+    cuts: list[int] = []
+    first = 0
+    while True:
+        stop = int(np.searchsorted(cumulative, cumulative[first] + budget, side="right")) - 1
+        stop = max(stop, first + 1)
+        if stop >= count:
+            return cuts
+        if keyframe_indices is not None:
+            position = int(np.searchsorted(keyframe_indices, stop, side="right")) - 1
+            if position >= 0 and keyframe_indices[position] > first:
+                stop = int(keyframe_indices[position])
+        cuts.append(stop)
+        first = stop
+
+
+def _plan_by_packets(
+    packet_times: ArrayLike,
+    packet_sizes: ArrayLike,
+    duration_s: float,
+    target_chunk_bytes: int,
+    output_format: str,
+    keyframes: ArrayLike | None = None,
+) -> list[ChunkSpan]:
+    """
+    パケットごとのサイズと時刻から、各チャンクが目標バイト数を超えない範囲で
+    最大限詰まるよう分割位置(パケット境界)を決める
+
+    ストリームコピー時のみ有効(出力サイズ ≒ パケットサイズの合計 + コンテナのオーバーヘッド)。
+    1パケットだけで目標を超える場合は、そのパケット単独のチャンクとする。
+    keyframes(パケットごとのキーフレームフラグ)を指定した場合は、チャンク内で最後のキーフレームの前で分割する。
+    """
+    fixed_bytes, per_packet_bytes = _MUX_OVERHEAD.get(output_format.lower(), _DEFAULT_MUX_OVERHEAD)
+    costs = np.asarray(packet_sizes, dtype=np.int64) + per_packet_bytes
+    times = np.asarray(packet_times, dtype=np.float64)
+    cuts = _budget_cuts(costs, target_chunk_bytes - fixed_bytes, keyframes)
+    return _spans_from_boundaries([float(times[cut]) for cut in cuts], duration_s)
@@ -0,0 +1,137 @@
+import logging
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from typing import Any
+
+from service.ffmpeg_runner import _ENCODER_MAP, _MUXER_MAP, _not_found_error, _run_command
+from service.probe_cache import ProbeCache
+
+# 出力フォーマットごとのエンコーダの候補(速い順)。ビルドに含まれる最初のものを使う
+_ENCODER_PREFERENCE = {
+    "m4a": ("aac_at", "libfdk_aac", "aac"),
+    "mp4": ("aac_at", "libfdk_aac", "aac"),
+    "mp3": ("libmp3lame", "mp3_mf"),
+}
+
+# 同じプロセス内で調べ直さないよう、(ffmpeg のパス, 更新時刻) ごとに結果を保持する
+_memo: dict[tuple[str, int], "FfmpegCapabilities"] = {}
+_memo_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class FfmpegCapabilities:
+    """インストールされている ffmpeg のバージョンと、使えるエンコーダ・マルチプレクサ"""
+
+    ffmpeg_path: str
+    version: str
+    encoders: frozenset[str]
+    muxers: frozenset[str]
+
+    def encoder_for(self, output_format: str) -> str | None:
+        """出力フォーマットに使う最速のエンコーダ(候補が無いフォーマットは None)"""
+        for encoder in _ENCODER_PREFERENCE.get(output_format.lower(), ()):
+            if encoder in self.encoders:
+                return encoder
+        return None
+
+    def check_output_format(self, output_format: str, segment: bool = False) -> None:
+        """出力フォーマット(と segment マルチプレクサ)に対応していなければ RuntimeError"""
+        muxer = _MUXER_MAP.get(output_format.lower())
+        if muxer is not None and muxer not in self.muxers:
+            raise RuntimeError(f"ffmpeg が出力形式 {output_format} に対応していません")
+        if segment and "segment" not in self.muxers:
+            raise RuntimeError("ffmpeg が segment マルチプレクサに対応していません")
+
+    def check_encoder(self, output_format: str) -> str | None:
+        """再エンコードに使うエンコーダを返す。既知のフォーマットで候補が1つも無ければ RuntimeError"""
+        encoder = self.encoder_for(output_format)
+        if encoder is None and output_format.lower() in _ENCODER_PREFERENCE:
+            raise RuntimeError(f"ffmpeg に {output_format} のエンコーダ({_ENCODER_MAP[output_format.lower()]})がありません")
+        return encoder
+
+
+def _parse_encoders(text: str) -> frozenset[str]:
+    """ffmpeg -encoders の出力から音声エンコーダ名を取り出す"""
+    names: set[str] = set()
+    started = False
+    for line in text.splitlines():
+        fields = line.split()
+        if not started:
+            started = bool(fields) and set(fields[0]) == {"-"}
+            continue
+        if len(fields) >= 2 and fields[0].startswith("A"):
+            names.add(fields[1])
+    return frozenset(names)
+
+
+def _parse_muxers(text: str) -> frozenset[str]:
+    """ffmpeg -muxers の出力からマルチプレクサ名を取り出す"""
+    names: set[str] = set()
+    started = False
+    for line in text.splitlines():
+        fields = line.split()
+        if not started:
+            started = bool(fields) and set(fields[0]) == {"-"}
+            continue
+        if len(fields) >= 2 and "E" in fields[0]:
+            names.update(fields[1].split(","))
+    return frozenset(names)
+
+
+def _parse_version(text: str) -> str:
+    """ffmpeg -version の1行目からバージョンを取り出す"""
+    fields = text.split()
+    if len(fields) >= 3 and fields[:2] == ["ffmpeg", "version"]:
+        return fields[2]
+    return ""
+
+
+def _run_discovery(ffmpeg_path: str) -> dict[str, Any]:
+    """ffmpeg -version/-encoders/-muxers を実行して結果を(キャッシュ可能な形で)返す"""
+    version = _run_command([ffmpeg_path, "-hide_banner", "-version"]).stdout
+    encoders = _run_command([ffmpeg_path, "-hide_banner", "-encoders"]).stdout
+    muxers = _run_command([ffmpeg_path, "-hide_banner", "-muxers"]).stdout
+    return {
+        "version": _parse_version(version),
+        "encoders": sorted(_parse_encoders(encoders)),
+        "muxers": sorted(_parse_muxers(muxers)),
+    }
+
+
+def discover_capabilities(probe_cache: ProbeCache | None = None) -> FfmpegCapabilities:
+    """
+    PATH 上の ffmpeg/ffprobe を確認し、使えるエンコーダ・マルチプレクサを調べる
+
+    結果は ffmpeg のパスと更新時刻ごとにプロセス内で保持し、probe_cache を指定した場合は
+    アプリの再起動後も再利用する。ffmpeg を入れ替えると更新時刻が変わるため調べ直す。
+
+    Raises:
+        RuntimeError: ffmpeg/ffprobe が見つからない、または実行できない
+    """
+    ffmpeg_path = shutil.which("ffmpeg")
+    if ffmpeg_path is None:
+        raise _not_found_error(["ffmpeg"])
+    if shutil.which("ffprobe") is None:
+        raise _not_found_error(["ffprobe"])
+
+    key = (os.path.normcase(os.path.abspath(ffmpeg_path)), os.stat(ffmpeg_path).st_mtime_ns)
+    with _memo_lock:
+        capabilities = _memo.get(key)
+        if capabilities is not None:
+            return capabilities
+
+        if probe_cache is not None:
+            value = probe_cache.get_or_probe(ffmpeg_path, "ffmpeg_capabilities", lambda: _run_discovery(ffmpeg_path))
+        else:
+            value = _run_discovery(ffmpeg_path)
+        capabilities = FfmpegCapabilities(
+            ffmpeg_path=ffmpeg_path,
+            version=value["version"],
+            encoders=frozenset(value["encoders"]),
+            muxers=frozenset(value["muxers"]),
+        )
+        logging.info(f"ffmpeg {capabilities.version} ({ffmpeg_path})")
+        _memo[key] = capabilities
+        return capabilities
@@ -1,14 +1,62 @@
+import asyncio
 import subprocess
+import threading
+import time
+from array import array
+from collections import deque
+from collections.abc import Callable, Generator
+from dataclasses import dataclass
+
+from service.cancellation import CancellationToken
 
 # 出力フォーマットごとの音声コーデック名(ストリームコピー可否の判定に使用)
 _COPY_CODEC_MAP = {"m4a": "aac", "mp4": "aac", "mp3": "mp3"}
 
 # 出力フォーマットごとの再エンコード用エンコーダ
 _ENCODER_MAP = {"m4a": "aac", "mp4": "aac", "mp3": "libmp3lame"}
+# 出力フォーマット(拡張子)ごとに ffmpeg が使うマルチプレクサ
+_MUXER_MAP = {"m4a": "ipod", "mp4": "mp4", "mp3": "mp3"}
+# 標準出力へ書き出すときに読み取る単位
+_PIPE_READ_BYTES = 1024 * 1024
+# 再エンコード時のビットレート(bps)。分割計画はこの値から出力サイズを見積もる
+_ENCODE_BITRATE_MAP = {"m4a": 128_000, "mp4": 128_000, "mp3": 128_000}
+
+# -progress が出力するキー(segment の出力ファイル名と区別するために使う)
+_PROGRESS_KEYS = frozenset({
+    "frame", "fps", "bitrate", "total_size", "out_time_us", "out_time_ms", "out_time",
+    "dup_frames", "drop_frames", "speed", "progress",
+})
+
+# ffmpeg の進捗通知 callback(出力済みの再生時間(秒), 処理速度(実時間比、不明なら None))
+ProgressHandler = Callable[[float, float | None], None]
+
+
+@dataclass
+class CommandTiming:
+    """サブプロセスの起動にかかった時間と、起動から終了までの時間(秒)"""
+
+    spawn_s: float = 0.0
+    run_s: float = 0.0
 
 
-def _run_command(cmd: list[str]) -> subprocess.CompletedProcess[str]:
+def _not_found_error(cmd: list[str]) -> RuntimeError:
+    return RuntimeError(
+        f"{cmd[0]} が見つかりません。ffmpeg をインストールし、PATH を通してください"
+    )
+
+
+def _failed_error(cmd: list[str], stderr: str) -> RuntimeError:
+    return RuntimeError(f"{cmd[0]} の実行に失敗しました: {stderr.strip()[-500:]}")
+
+
+def _run_command(
+    cmd: list[str],
+    cancel_token: CancellationToken | None = None,
+) -> subprocess.CompletedProcess[str]:
     """ffmpeg/ffprobe コマンドを実行(コンソールウィンドウは非表示)"""
+    if cancel_token is not None:
+        return _run_command_cancellable(cmd, cancel_token)
+
     creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
     try:
         return subprocess.run(
@@ -21,12 +69,159 @@ def _run_command(cmd: list[str]) -> subprocess.CompletedProcess[str]:
             check=True,
         )
     except FileNotFoundError:
-        raise RuntimeError(
-            f"{cmd[0]} が見つかりません。ffmpeg をインストールし、PATH を通してください"
-        )
+        raise _not_found_error(cmd)
     except subprocess.CalledProcessError as e:
-        stderr = (e.stderr or "").strip()
-        raise RuntimeError(f"{cmd[0]} の実行に失敗しました: {stderr[-500:]}")
+        raise _failed_error(cmd, e.stderr or "")
+
+
+def _run_command_cancellable(cmd: list[str], cancel_token: CancellationToken) -> subprocess.CompletedProcess[str]:
+    """_run_command と同じだが、キャンセル時にプロセスを終了させ SplitCancelledError を送出する"""
+    cancel_token.raise_if_cancelled()
+    creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+    try:
+        process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            creationflags=creationflags,
+        )
+    except FileNotFoundError:
+        raise _not_found_error(cmd)
+
+    cancel_token.register(process)
+    try:
+        stdout, stderr = process.communicate()
+    finally:
+        cancel_token.unregister(process)
+
+    cancel_token.raise_if_cancelled()
+    if process.returncode != 0:
+        raise _failed_error(cmd, stderr or "")
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+
+def _run_command_streaming(
+    cmd: list[str],
+    on_line: Callable[[str], object],
+    cancel_token: CancellationToken | None = None,
+) -> None:
+    """コマンドを実行し、標準出力を1行ずつ on_line へ渡す(stderr は末尾のみ保持)"""
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+    creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+    try:
+        process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            creationflags=creationflags,
+        )
+    except FileNotFoundError:
+        raise _not_found_error(cmd)
+
+    assert process.stdout is not None and process.stderr is not None
+    if cancel_token is not None:
+        cancel_token.register(process)
+    # stderr のパイプが詰まらないよう別スレッドで読み捨て、末尾だけ残す
+    stderr_tail: deque[str] = deque(maxlen=50)
+    stderr_thread = threading.Thread(target=stderr_tail.extend, args=(process.stderr,), daemon=True)
+    stderr_thread.start()
+
+    try:
+        for line in process.stdout:
+            on_line(line.rstrip("\r\n"))
+    except BaseException:
+        process.kill()
+        raise
+    finally:
+        returncode = process.wait()
+        stderr_thread.join()
+        process.stdout.close()
+        process.stderr.close()
+        if cancel_token is not None:
+            cancel_token.unregister(process)
+
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+    if returncode != 0:
+        raise _failed_error(cmd, "".join(stderr_tail))
+
+
+def _iter_command_output(
+    cmd: list[str],
+    read_size: int,
+    cancel_token: CancellationToken | None = None,
+) -> Generator[bytes, None, None]:
+    """
+    コマンドを実行し、標準出力(バイナリ)を read_size バイトずつ返す
+
+    呼び出し側が途中で読むのをやめた場合(ジェネレータの close)はプロセスを終了させる。
+    """
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+    creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+    try:
+        process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            creationflags=creationflags,
+        )
+    except FileNotFoundError:
+        raise _not_found_error(cmd)
+
+    assert process.stdout is not None and process.stderr is not None
+    if cancel_token is not None:
+        cancel_token.register(process)
+    stderr_tail: deque[bytes] = deque(maxlen=50)
+    stderr_thread = threading.Thread(target=stderr_tail.extend, args=(process.stderr,), daemon=True)
+    stderr_thread.start()
+
+    finished = False
+    try:
+        while data := process.stdout.read(read_size):
+            yield data
+        finished = True
+    finally:
+        if not finished:
+            process.kill()
+        returncode = process.wait()
+        stderr_thread.join()
+        process.stdout.close()
+        process.stderr.close()
+        if cancel_token is not None:
+            cancel_token.unregister(process)
+
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+    if returncode != 0:
+        raise _failed_error(cmd, b"".join(stderr_tail).decode("utf-8", errors="replace"))
+
+
+def _iter_pcm(
+    file_path: str,
+    sample_rate: int,
+    read_size: int,
+    cancel_token: CancellationToken | None = None,
+) -> Generator[bytes, None, None]:
+    """音声をモノラル 16bit PCM にデコードしながらパイプ経由で少しずつ返す"""
+    return _iter_command_output([
+        "ffmpeg", "-v", "error", "-nostdin",
+        "-i", file_path,
+        "-map", "0:a:0", "-vn", "-sn", "-dn",
+        "-ac", "1", "-ar", str(sample_rate),
+        "-f", "s16le", "-acodec", "pcm_s16le",
+        "pipe:1",
+    ], read_size, cancel_token)
 
 
 def _probe_audio(file_path: str) -> tuple[float, str]:
@@ -56,35 +251,415 @@ def _probe_audio(file_path: str) -> tuple[float, str]:
     return duration, info.get("codec_name", "")
 
 
+def _probe_stream_bitrate(file_path: str) -> int:
+    """
+    ffprobe で先頭の音声ストリームのビットレート(bps)を取得。コンテナに記録されていなければ 0
+
+    映像・カバー画像・タグを含まないため、ストリームコピー時の出力サイズはファイルサイズよりこちらに近い。
+    """
+    result = _run_command([
+        "ffprobe", "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "stream=bit_rate",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        file_path,
+    ])
+    try:
+        return max(int(result.stdout.split()[0]), 0)
+    except (ValueError, IndexError):
+        return 0
+
+
+def _probe_packets(file_path: str, cancel_token: CancellationToken | None = None) -> tuple[array, array]:
+    """
+    ffprobe で音声ストリームの全パケットの時刻(秒)とサイズ(バイト)を取得
+
+    パケット数が多くてもメモリを抑えられるよう、行単位で読み array に格納する。
+    pts が無いパケットは dts で代用し、どちらも無ければ読み飛ばす。
+    """
+    times = array("d")
+    sizes = array("q")
+
+    def on_line(line: str) -> None:
+        fields = line.split(",")
+        if len(fields) < 3:
+            return
+        pts_time, dts_time, size = fields[:3]
+        try:
+            times.append(float(pts_time if pts_time not in ("", "N/A") else dts_time))
+            sizes.append(int(size))
+        except ValueError:
+            if len(times) > len(sizes):
+                times.pop()
+
+    _run_command_streaming([
+        "ffprobe", "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "packet=pts_time,dts_time,size",
+        "-of", "csv=p=0",
+        file_path,
+    ], on_line, cancel_token)
+
+    if not sizes:
+        raise RuntimeError("音声パケットの情報を取得できませんでした")
+    return times, sizes
+
+
+def _probe_packet_records(
+    file_path: str,
+    cancel_token: CancellationToken | None = None,
+) -> tuple[array, array, array, array]:
+    """
+    ffprobe で音声ストリームの全パケットの時刻(秒)・サイズ・ファイル内の位置・キーフレームフラグを取得
+
+    位置が不明なパケットは -1、キーフレームは 1(それ以外は 0)。読み飛ばす条件は _probe_packets と同じ。
+    """
+    times = array("d")
+    sizes = array("q")
+    positions = array("q")
+    keyframes = array("B")
+
+    def on_line(line: str) -> None:
+        fields = line.split(",")
+        if len(fields) < 5:
+            return
+        pts_time, dts_time, size, pos, flags = fields[:5]
+        try:
+            time_s = float(pts_time if pts_time not in ("", "N/A") else dts_time)
+            size_bytes = int(size)
+        except ValueError:
+            return
+        times.append(time_s)
+        sizes.append(size_bytes)
+        positions.append(int(pos) if pos.isdigit() else -1)
+        keyframes.append(1 if flags.startswith("K") else 0)
+
+    _run_command_streaming([
+        "ffprobe", "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "packet=pts_time,dts_time,size,pos,flags",
+        "-of", "csv=p=0",
+        file_path,
+    ], on_line, cancel_token)
+
+    if not sizes:
+        raise RuntimeError("音声パケットの情報を取得できませんでした")
+    return times, sizes, positions, keyframes
+
+
+def _progress_line_handler(on_progress: ProgressHandler) -> Callable[[str], bool]:
+    """
+    ffmpeg -progress の key=value 行を解釈する関数を返す
+
+    返した関数は進捗の行なら True を返す。1ブロック(progress= の行で終わる)ごとに
+    out_time_us と speed から on_progress を呼ぶ。古い ffmpeg の out_time_ms もマイクロ秒として扱う。
+    """
+    block: dict[str, str] = {}
+
+    def on_line(line: str) -> bool:
+        key, sep, value = line.partition("=")
+        key = key.strip()
+        if not sep or key not in _PROGRESS_KEYS and not key.startswith("stream_"):
+            return False
+        block[key] = value.strip()
+        if key != "progress":
+            return True
+
+        out_time_us = block.get("out_time_us", block.get("out_time_ms", ""))
+        speed = block.get("speed", "").rstrip("x").strip()
+        block.clear()
+        try:
+            out_time_s = int(out_time_us) / 1_000_000
+        except ValueError:
+            return True
+        try:
+            speed_x: float | None = float(speed)
+        except ValueError:
+            speed_x = None
+        on_progress(max(out_time_s, 0.0), speed_x)
+        return True
+
+    return on_line
+
+
 def _can_stream_copy(input_codec: str, output_format: str) -> bool:
     """入力コーデックと出力フォーマットが一致し、再エンコード不要かを判定"""
     expected = _COPY_CODEC_MAP.get(output_format.lower())
     return expected is not None and input_codec.lower() == expected
 
 
-def _split_one_chunk(
+def _codec_args(output_format: str, stream_copy: bool, encoder: str | None = None) -> list[str]:
+    """ストリームコピー/再エンコードに応じたコーデック指定を返す(encoder 省略時は既定のエンコーダ)"""
+    if stream_copy:
+        return ["-c", "copy", "-avoid_negative_ts", "make_zero"]
+    codec = encoder or _ENCODER_MAP.get(output_format.lower())
+    args = ["-c:a", codec] if codec else []
+    bitrate = _ENCODE_BITRATE_MAP.get(output_format.lower())
+    if codec and bitrate:
+        args += ["-b:a", f"{bitrate // 1000}k"]
+    return args
+
+
+def _chunk_command(
     file_path: str,
     output_path: str,
     start_s: float,
     duration_s: float,
     output_format: str,
     stream_copy: bool,
-) -> None:
-    """1チャンクを ffmpeg で切り出す(-ss を -i の前に置き高速シーク)"""
-    cmd = [
-        "ffmpeg", "-y",
-        "-ss", f"{start_s:.3f}",
+    with_progress: bool,
+    encoder: str | None = None,
+) -> list[str]:
+    """1チャンクを切り出す ffmpeg コマンド(-ss を -i の前に置き高速シーク)"""
+    cmd = ["ffmpeg", "-y"]
+    if with_progress:
+        cmd += ["-progress", "pipe:1", "-nostats"]
+    cmd += [
+        "-ss", f"{start_s:.6f}",
         "-i", file_path,
-        "-t", f"{duration_s:.3f}",
+        "-t", f"{duration_s:.6f}",
         "-map", "0:a:0",
     ]
+    cmd += _codec_args(output_format, stream_copy, encoder)
+    cmd.append(output_path)
+    return cmd
 
-    if stream_copy:
-        cmd += ["-c", "copy", "-avoid_negative_ts", "make_zero"]
+
+def _pipe_format_args(output_format: str) -> list[str]:
+    """
+    標準出力へ書き出すときの出力形式の指定
+
+    パイプはシークできず mp4 のインデックス(moov)を末尾から書き戻せないため、mp4 系はフラグメント形式にする。
+    """
+    output_format = output_format.lower()
+    muxer = _MUXER_MAP.get(output_format, output_format)
+    args = ["-f", muxer]
+    if muxer in ("ipod", "mp4"):
+        args += ["-movflags", "frag_keyframe+empty_moov+default_base_moof"]
+    return args
+
+
+def _segment_command(
+    file_path: str,
+    output_pattern: str,
+    segment_times: list[float],
+    output_format: str,
+    stream_copy: bool,
+    with_progress: bool,
+    encoder: str | None = None,
+    start_s: float = 0.0,
+    duration_s: float | None = None,
+    start_number: int = 1,
+) -> list[str]:
+    """
+    segment マルチプレクサで全チャンクを出力する ffmpeg コマンド(セグメント一覧は標準出力)
+
+    start_s/duration_s を指定した場合は入力のその範囲だけを読む(segment_times は start_s からの相対位置)。
+    出力ファイルの連番は start_number から始まる。
+    """
+    cmd = ["ffmpeg", "-y", "-v", "error"]
+    if with_progress:
+        cmd += ["-progress", "pipe:1", "-nostats"]
+    if start_s > 0:
+        cmd += ["-ss", f"{start_s:.6f}"]
+    cmd += ["-i", file_path]
+    if duration_s is not None:
+        cmd += ["-t", f"{duration_s:.6f}"]
+    cmd += ["-map", "0:a:0"]
+    cmd += _codec_args(output_format, stream_copy, encoder)
+    cmd += [
+        "-f", "segment",
+        "-segment_times", ",".join(f"{t:.6f}" for t in segment_times),
+        "-segment_start_number", str(start_number),
+        "-reset_timestamps", "1",
+        "-segment_list", "pipe:1",
+        "-segment_list_type", "flat",
+        output_pattern,
+    ]
+    return cmd
+
+
+def _segment_line_handler(
+    on_segment: Callable[[str], None],
+    on_progress: ProgressHandler | None,
+) -> Callable[[str], None]:
+    """segment 実行時の標準出力の行を、-progress の行とセグメント一覧に振り分ける関数を返す"""
+    on_progress_line = _progress_line_handler(on_progress) if on_progress is not None else None
+
+    def on_line(line: str) -> None:
+        if not line or on_progress_line is not None and on_progress_line(line):
+            return
+        on_segment(line)
+
+    return on_line
+
+
+def _split_one_chunk(
+    file_path: str,
+    output_path: str,
+    start_s: float,
+    duration_s: float,
+    output_format: str,
+    stream_copy: bool,
+    cancel_token: CancellationToken | None = None,
+    on_progress: ProgressHandler | None = None,
+    encoder: str | None = None,
+) -> None:
+    """
+    1チャンクを ffmpeg で切り出す
+
+    on_progress を指定した場合は -progress pipe:1 で実行中の進捗を受け取り、逐次通知する。
+    encoder は再エンコード時に使うエンコーダ(省略時は出力フォーマットの既定)。
+    """
+    cmd = _chunk_command(
+        file_path, output_path, start_s, duration_s, output_format, stream_copy,
+        on_progress is not None, encoder,
+    )
+    if on_progress is None:
+        _run_command(cmd, cancel_token)
     else:
-        codec = _ENCODER_MAP.get(output_format.lower())
-        if codec:
-            cmd += ["-c:a", codec]
+        _run_command_streaming(cmd, _progress_line_handler(on_progress), cancel_token)
 
-    cmd.append(output_path)
-    _run_command(cmd)
+
+async def _run_command_async(
+    cmd: list[str],
+    on_line: Callable[[str], object] | None = None,
+    cancel_token: CancellationToken | None = None,
+    timing: CommandTiming | None = None,
+    on_data: Callable[[bytes], None] | None = None,
+) -> None:
+    """
+    asyncio のサブプロセスとしてコマンドを実行する(on_line 指定時は標準出力を1行ずつ渡す)
+
+    on_data を指定した場合は、標準出力を行に分けずにバイナリのまま読み取った順に渡す。
+
+    待機中のタスクがキャンセルされた場合や cancel_token がキャンセルされた場合は
+    プロセスを終了させてから例外を送出する。timing を指定した場合は起動・実行にかかった時間を記録する。
+    """
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+    creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+    started_at = time.perf_counter()
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            creationflags=creationflags,
+        )
+    except FileNotFoundError:
+        raise _not_found_error(cmd)
+
+    spawned_at = time.perf_counter()
+    stdout, stderr = process.stdout, process.stderr
+    assert stdout is not None and stderr is not None
+    if cancel_token is not None:
+        cancel_token.register(process)
+    stderr_tail: deque[bytes] = deque(maxlen=50)
+
+    async def drain_stderr() -> None:
+        async for line in stderr:
+            stderr_tail.append(line)
+
+    stderr_task = asyncio.ensure_future(drain_stderr())
+    try:
+        if on_data is not None:
+            while block := await stdout.read(_PIPE_READ_BYTES):
+                on_data(block)
+        else:
+            async for raw_line in stdout:
+                if on_line is not None:
+                    on_line(raw_line.decode("utf-8", errors="replace").rstrip("\r\n"))
+        await stderr_task
+        returncode = await process.wait()
+    except BaseException:
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+        stderr_task.cancel()
+        await process.wait()
+        raise
+    finally:
+        if cancel_token is not None:
+            cancel_token.unregister(process)
+        if timing is not None:
+            timing.spawn_s = spawned_at - started_at
+            timing.run_s = time.perf_counter() - spawned_at
+
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+    if returncode != 0:
+        raise _failed_error(cmd, b"".join(stderr_tail).decode("utf-8", errors="replace"))
+
+
+async def _split_one_chunk_async(
+    file_path: str,
+    output_path: str,
+    start_s: float,
+    duration_s: float,
+    output_format: str,
+    stream_copy: bool,
+    cancel_token: CancellationToken | None = None,
+    on_progress: ProgressHandler | None = None,
+    encoder: str | None = None,
+    timing: CommandTiming | None = None,
+) -> None:
+    """_split_one_chunk の asyncio 版(スレッドを使わずに ffmpeg の終了を待つ)"""
+    cmd = _chunk_command(
+        file_path, output_path, start_s, duration_s, output_format, stream_copy,
+        on_progress is not None, encoder,
+    )
+    on_line = _progress_line_handler(on_progress) if on_progress is not None else None
+    await _run_command_async(cmd, on_line, cancel_token, timing)
+
+
+async def _read_chunk_async(
+    file_path: str,
+    start_s: float,
+    duration_s: float,
+    output_format: str,
+    stream_copy: bool,
+    cancel_token: CancellationToken | None = None,
+    encoder: str | None = None,
+    timing: CommandTiming | None = None,
+) -> bytes:
+    """1チャンクを ffmpeg の標準出力へ書き出させ、ファイルを作らずにメモリ上で受け取る"""
+    cmd = _chunk_command(
+        file_path, "pipe:1", start_s, duration_s, output_format, stream_copy, False, encoder,
+    )
+    cmd[-1:-1] = _pipe_format_args(output_format)
+    buffer = bytearray()
+    await _run_command_async(cmd, None, cancel_token, timing, on_data=buffer.extend)
+    return bytes(buffer)
+
+
+async def _split_segments_async(
+    file_path: str,
+    output_pattern: str,
+    segment_times: list[float],
+    output_format: str,
+    stream_copy: bool,
+    on_segment: Callable[[str], None],
+    cancel_token: CancellationToken | None = None,
+    on_progress: ProgressHandler | None = None,
+    encoder: str | None = None,
+    timing: CommandTiming | None = None,
+    start_s: float = 0.0,
+    duration_s: float | None = None,
+    start_number: int = 1,
+) -> None:
+    """
+    segment マルチプレクサで全チャンクを1回の ffmpeg 実行で切り出す
+
+    output_pattern は %d を1つ含む出力パス(番号は start_number 始まり)。
+    セグメントが書き終わるたびに、そのファイルパスで on_segment を呼ぶ。
+    on_progress を指定した場合は、セグメント一覧と同じ標準出力に -progress の行も流し、
+    入力先頭からの出力済み時間を通知する。start_s/duration_s は _segment_command を参照。
+    """
+    cmd = _segment_command(
+        file_path, output_pattern, segment_times, output_format, stream_copy,
+        on_progress is not None, encoder, start_s, duration_s, start_number,
+    )
+    await _run_command_async(cmd, _segment_line_handler(on_segment, on_progress), cancel_token, timing)
@@ -0,0 +1,584 @@
+"""
+監視フォルダに置かれた音声ファイルを自動で分割する常駐プロセス
+
+    python -m service.folder_watcher
+    python -m service.folder_watcher --watch-dir downloads --output-dir output --polling
+
+設定ファイルの [Paths] downloads_path を監視し、書き込みが終わったファイルを output_path へ分割する。
+Linux では inotify、それ以外(または inotify が使えない場合)は一定間隔のディレクトリの走査で変化を検出する。
+"""
+import argparse
+import ctypes
+import json
+import logging
+import os
+import queue
+import select
+import signal
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from service.cancellation import CancellationToken, SplitCancelledError
+from utils.config_manager import get_config_value
+
+# 対象とする拡張子(GUI のファイル選択ダイアログ・一括分割と同じ)
+AUDIO_EXTENSIONS = (".mp3", ".m4a", ".wav", ".mp4")
+
+# split(入力ファイル, 出力ディレクトリ, キャンセル用トークン) → 出力パスのリスト
+SplitFunction = Callable[[str, str, CancellationToken], list[str]]
+ProgressCallback = Callable[[str], None]
+
+# inotify のイベント(<sys/inotify.h>)。書き込み中の変化は IN_MODIFY ではなくサイズの確認で追う
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE_SELF | _IN_MOVE_SELF
+_INOTIFY_EVENT = struct.Struct("iIII")
+# 1回の read で受け取るバイト数(数百ファイルのイベントが一度に届いても取りこぼさない程度)
+_INOTIFY_READ_BYTES = 1024 * 1024
+
+# 書き込み完了のイベント(inotify の IN_CLOSE_WRITE/IN_MOVED_TO)が届いたファイルの待ち時間(秒)
+_CLOSED_SETTLE_S = 0.5
+# イベントループの待ち時間の下限(秒)
+_MIN_WAIT_S = 0.05
+
+
+@dataclass(frozen=True)
+class WatchSettings:
+    """設定ファイルの [Watch] セクションの値"""
+
+    settle_s: float = 2.0
+    poll_interval_s: float = 1.0
+    max_jobs: int = 2
+    use_inotify: bool = True
+
+
+def load_watch_settings(config) -> WatchSettings:
+    """設定ファイルの [Watch] セクションから監視の設定を読む(不正な値は既定値)"""
+    defaults = WatchSettings()
+    try:
+        settle_s = float(str(get_config_value(config, 'Watch', 'settle_seconds', str(defaults.settle_s))))
+        poll_interval_s = float(
+            str(get_config_value(config, 'Watch', 'poll_interval_seconds', str(defaults.poll_interval_s)))
+        )
+        max_jobs = int(str(get_config_value(config, 'Watch', 'max_jobs', defaults.max_jobs)))
+    except ValueError:
+        settle_s, poll_interval_s, max_jobs = defaults.settle_s, defaults.poll_interval_s, defaults.max_jobs
+    use_inotify = str(get_config_value(config, 'Watch', 'use_inotify', 'True') or 'True')
+    return WatchSettings(
+        settle_s=max(0.0, settle_s),
+        poll_interval_s=max(_MIN_WAIT_S, poll_interval_s),
+        max_jobs=max(1, max_jobs),
+        use_inotify=use_inotify.strip().lower() in ('true', '1', 'yes', 'on'),
+    )
+
+
+def _file_key(file_path: str) -> str:
+    return os.path.normcase(os.path.abspath(file_path))
+
+
+class WatchState:
+    """
+    分割済み・失敗したファイルを記録する JSON ファイル
+
+    ファイルのサイズと更新時刻が記録と同じ間は、再起動しても分割し直さない。
+    分割中に停止したファイルは記録されないため、次回の起動時にもう一度分割する。
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                entries = json.load(f)
+            if isinstance(entries, dict):
+                self._entries = entries
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.warning(f"監視フォルダの状態の読み込みに失敗しました: {e}")
+
+    def is_processed(self, file_path: str, size: int, mtime_ns: int) -> bool:
+        with self._lock:
+            entry = self._entries.get(_file_key(file_path))
+        return entry is not None and entry.get("size") == size and entry.get("mtime_ns") == mtime_ns
+
+    def record(self, file_path: str, size: int, mtime_ns: int, status: str, detail: dict | None = None) -> None:
+        """分割の結果(status は "done" または "failed")を記録して保存する"""
+        with self._lock:
+            self._entries[_file_key(file_path)] = {
+                "size": size, "mtime_ns": mtime_ns, "status": status, "at": time.time(), **(detail or {}),
+            }
+            self._save()
+
+    def prune(self, existing: set[str]) -> None:
+        """監視フォルダから無くなったファイルの記録を削除する"""
+        keys = {_file_key(path) for path in existing}
+        with self._lock:
+            removed = [key for key in self._entries if key not in keys]
+            for key in removed:
+                del self._entries[key]
+            if removed:
+                self._save()
+
+    def _save(self) -> None:
+        temp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logging.warning(f"監視フォルダの状態の保存に失敗しました: {e}")
+
+
+class _InotifySource:
+    """inotify でディレクトリ直下のファイルの作成・書き込み完了・移動を受け取る(Linux のみ)"""
+
+    def __init__(self, directory: str) -> None:
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 に失敗しました")
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"inotify_add_watch に失敗しました: {directory}")
+        # interrupt で select を起こすためのパイプ
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+
+    def wait(self, timeout_s: float) -> tuple[list[tuple[str, bool]], bool]:
+        """
+        イベントを待つ
+
+        Returns:
+            ([(ファイル名, 書き込みが完了したか)], ディレクトリ全体を調べ直す必要があるか)
+        """
+        ready, _, _ = select.select([self._fd, self._wake_r], [], [], timeout_s)
+        if self._wake_r in ready:
+            try:
+                os.read(self._wake_r, 4096)
+            except BlockingIOError:
+                pass
+        if self._fd not in ready:
+            return [], False
+        try:
+            data = os.read(self._fd, _INOTIFY_READ_BYTES)
+        except BlockingIOError:
+            return [], False
+
+        names: list[tuple[str, bool]] = []
+        rescan = False
+        offset = 0
+        while offset + _INOTIFY_EVENT.size <= len(data):
+            _wd, mask, _cookie, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            name = data[offset + _INOTIFY_EVENT.size:offset + _INOTIFY_EVENT.size + length].rstrip(b"\0")
+            offset += _INOTIFY_EVENT.size + length
+            if mask & (_IN_Q_OVERFLOW | _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_IGNORED):
+                # キューがあふれた(イベントを取りこぼした)・ディレクトリが無くなった
+                rescan = True
+            elif name:
+                names.append((os.fsdecode(name), bool(mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO))))
+        return names, rescan
+
+    def interrupt(self) -> None:
+        """wait をすぐに戻らせる(どのスレッドから呼んでもよい)"""
+        try:
+            os.write(self._wake_w, b"\0")
+        except (BlockingIOError, OSError):
+            pass
+
+    def close(self) -> None:
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            os.close(fd)
+
+
+class _PollingSource:
+    """一定間隔でディレクトリを走査し、サイズか更新時刻が変わったファイルを返す"""
+
+    def __init__(self, directory: str, interval_s: float) -> None:
+        self._directory = directory
+        self._interval_s = interval_s
+        self._wake = threading.Event()
+        self._last = _snapshot(directory)
+        self._last_scan = time.monotonic()
+
+    def wait(self, timeout_s: float) -> tuple[list[tuple[str, bool]], bool]:
+        remaining = self._last_scan + self._interval_s - time.monotonic()
+        if self._wake.wait(max(0.0, min(remaining, timeout_s))) or remaining > timeout_s:
+            self._wake.clear()
+            return [], False
+        current = _snapshot(self._directory)
+        self._last_scan = time.monotonic()
+        changed = [(name, False) for name, signature in current.items() if self._last.get(name) != signature]
+        self._last = current
+        return changed, False
+
+    def interrupt(self) -> None:
+        self._wake.set()
+
+    def close(self) -> None:
+        pass
+
+
+def _snapshot(directory: str) -> dict[str, tuple[int, int]]:
+    """ディレクトリ直下のファイル名 → (サイズ, 更新時刻)"""
+    snapshot: dict[str, tuple[int, int]] = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+                except OSError:
+                    continue
+    except OSError as e:
+        logging.warning(f"監視フォルダを読み込めません: {e}")
+    return snapshot
+
+
+@dataclass
+class _PendingFile:
+    """書き込みが終わるのを待っているファイル"""
+
+    size: int
+    mtime_ns: int
+    changed_at: float
+    closed: bool
+
+
+class FolderWatcher:
+    """
+    監視フォルダに置かれた音声ファイルを検出し、書き込みが終わったものから順に分割する
+
+    ファイルは、サイズと更新時刻が settle_s 秒変わらなくなった時点(inotify で書き込み完了の
+    イベントが届いた場合は _CLOSED_SETTLE_S 秒)で書き込みが終わったとみなす。同じファイルのイベントは
+    1つにまとめ、分割は max_jobs 個まで同時に実行し、残りは検出した順に待たせる。
+    出力ファイル名の元になる名前(拡張子を除いたファイル名)が監視フォルダ内の他のファイルと重なるファイルは、
+    出力を上書きし合わないよう、重なりが無くなるまで分割を保留する。
+    分割の結果は state に記録し、再起動後も分割済みのファイルは分割し直さない。
+    inotify のイベントがあふれた場合はディレクトリ全体を調べ直す。
+    """
+
+    def __init__(
+        self,
+        watch_dir: str,
+        output_dir: str,
+        split: SplitFunction,
+        state: WatchState,
+        settings: WatchSettings | None = None,
+        progress_callback: ProgressCallback | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if _file_key(watch_dir) == _file_key(output_dir):
+            raise RuntimeError("監視フォルダと出力先に同じフォルダは指定できません")
+        self.watch_dir = watch_dir
+        self.output_dir = output_dir
+        self.settings = settings or WatchSettings()
+        self._split = split
+        self._state = state
+        self._progress_callback = progress_callback
+        self._clock = clock
+        self._stop_event = threading.Event()
+        self._source: _InotifySource | _PollingSource | None = None
+        self._token = CancellationToken()
+        self._pending: dict[str, _PendingFile] = {}
+        self._ready: deque[str] = deque()
+        self._queued: set[str] = set()
+        self._running: set[str] = set()
+        self._clashing: set[str] = set()
+        self._finished: queue.SimpleQueue[str] = queue.SimpleQueue()
+
+    def _notify(self, message: str) -> None:
+        logging.info(message)
+        if self._progress_callback:
+            self._progress_callback(message)
+
+    def stop(self, cancel_running: bool = True) -> None:
+        """run を終了させる(どのスレッド・シグナルハンドラから呼んでもよい)"""
+        self._stop_event.set()
+        if cancel_running:
+            self._token.cancel()
+        self._interrupt()
+
+    def _interrupt(self) -> None:
+        source = self._source
+        if source is not None:
+            source.interrupt()
+
+    def run(self) -> None:
+        """stop が呼ばれるまでフォルダを監視し、分割を実行する"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        source = self._source = self._open_source()
+        executor = ThreadPoolExecutor(self.settings.max_jobs, thread_name_prefix="watch-split")
+        try:
+            existing = self._scan()
+            self._state.prune(existing)
+            self._notify(f"監視を開始しました: {self.watch_dir} (出力先: {self.output_dir})")
+            while not self._stop_event.is_set():
+                names, rescan = source.wait(self._wait_timeout())
+                if rescan:
+                    self._scan()
+                for name, closed in names:
+                    self._observe(os.path.join(self.watch_dir, name), closed)
+                self._collect_finished()
+                self._check_pending()
+                self._start_ready(executor)
+        finally:
+            if not self._stop_event.is_set():
+                # 例外(KeyboardInterrupt など)で抜けた場合は、実行中の ffmpeg を終了させてから待つ
+                self.stop()
+            executor.shutdown(wait=True, cancel_futures=True)
+            self._source = None
+            source.close()
+            self._notify("監視を終了しました")
+
+    def _open_source(self) -> _InotifySource | _PollingSource:
+        if self.settings.use_inotify and sys.platform.startswith("linux"):
+            try:
+                return _InotifySource(self.watch_dir)
+            except (OSError, AttributeError) as e:
+                logging.warning(f"inotify を使えないため、フォルダを定期的に走査します: {e}")
+        return _PollingSource(self.watch_dir, self.settings.poll_interval_s)
+
+    def _scan(self) -> set[str]:
+        """ディレクトリ直下の全ファイルを確認する(起動時・イベントを取りこぼした場合)"""
+        paths = {os.path.join(self.watch_dir, name) for name in _snapshot(self.watch_dir)}
+        for path in paths:
+            self._observe(path, closed=False)
+        return paths
+
+    def _observe(self, file_path: str, closed: bool) -> None:
+        """ファイルの変化を受け取る。同じファイルの変化は1つの待ち状態にまとめる"""
+        if not file_path.lower().endswith(AUDIO_EXTENSIONS) or os.path.basename(file_path).startswith("."):
+            return
+        if file_path in self._running or file_path in self._queued or file_path in self._clashing:
+            return
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            self._pending.pop(file_path, None)
+            return
+        if self._state.is_processed(file_path, stat.st_size, stat.st_mtime_ns):
+            return
+        pending = self._pending.get(file_path)
+        if pending is None or (pending.size, pending.mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            self._pending[file_path] = _PendingFile(stat.st_size, stat.st_mtime_ns, self._clock(), closed)
+        elif closed:
+            pending.closed = True
+
+    def _settle_s(self, pending: _PendingFile) -> float:
+        return min(_CLOSED_SETTLE_S, self.settings.settle_s) if pending.closed else self.settings.settle_s
+
+    def _check_pending(self) -> None:
+        """サイズと更新時刻が一定時間変わらなかったファイルを分割待ちにする"""
+        now = self._clock()
+        for file_path, pending in list(self._pending.items()):
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                del self._pending[file_path]
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (pending.size, pending.mtime_ns):
+                # まだ書き込み中
+                self._pending[file_path] = _PendingFile(stat.st_size, stat.st_mtime_ns, now, False)
+                continue
+            if stat.st_size > 0 and now - pending.changed_at >= self._settle_s(pending):
+                del self._pending[file_path]
+                self._ready.append(file_path)
+                self._queued.add(file_path)
+
+    def _wait_timeout(self) -> float:
+        """次に待ち状態のファイルを確認するまでの時間"""
+        timeout = self.settings.poll_interval_s
+        if self._ready and len(self._running) < self.settings.max_jobs:
+            return _MIN_WAIT_S
+        now = self._clock()
+        for pending in self._pending.values():
+            timeout = min(timeout, pending.changed_at + self._settle_s(pending) - now)
+        return max(_MIN_WAIT_S, timeout)
+
+    def _audio_files(self) -> list[str]:
+        return [
+            os.path.join(self.watch_dir, name) for name in _snapshot(self.watch_dir)
+            if name.lower().endswith(AUDIO_EXTENSIONS) and not name.startswith(".")
+        ]
+
+    def _clashing_names(self, file_path: str, audio_files: list[str]) -> list[str]:
+        """file_path と出力ファイル名が重なる監視フォルダ内の他のファイル名"""
+        from service.batch_splitter import _output_name_collisions
+
+        for paths in _output_name_collisions(audio_files):
+            if file_path in paths:
+                return [os.path.basename(path) for path in paths if path != file_path]
+        return []
+
+    def _release_clashing(self) -> None:
+        """重なりが無くなった(または削除された)保留中のファイルを待ち状態に戻す"""
+        if not self._clashing:
+            return
+        audio_files = self._audio_files()
+        for file_path in list(self._clashing):
+            if not self._clashing_names(file_path, audio_files):
+                self._clashing.discard(file_path)
+                self._observe(file_path, closed=False)
+
+    def _start_ready(self, executor: ThreadPoolExecutor) -> None:
+        self._release_clashing()
+        audio_files: list[str] | None = None
+        while self._ready and len(self._running) < self.settings.max_jobs and not self._stop_event.is_set():
+            file_path = self._ready.popleft()
+            self._queued.discard(file_path)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            if audio_files is None:
+                audio_files = self._audio_files()
+            clashing = self._clashing_names(file_path, audio_files)
+            if clashing:
+                self._clashing.add(file_path)
+                self._notify(
+                    f"{os.path.basename(file_path)}: 出力ファイル名が重複するため分割を保留します: {', '.join(clashing)}"
+                )
+                continue
+            self._running.add(file_path)
+            executor.submit(self._run_job, file_path, stat.st_size, stat.st_mtime_ns)
+
+    def _run_job(self, file_path: str, size: int, mtime_ns: int) -> None:
+        name = os.path.basename(file_path)
+        try:
+            self._notify(f"{name}: 分割を開始します")
+            outputs = self._split(file_path, self.output_dir, self._token)
+            self._state.record(file_path, size, mtime_ns, "done", {"outputs": len(outputs)})
+            self._notify(f"{name}: 分割が完了しました ({len(outputs)} ファイル)")
+        except SplitCancelledError:
+            # 記録しないため、次回の起動時にもう一度分割する
+            self._notify(f"{name}: 分割を中止しました")
+        except Exception as e:
+            self._state.record(file_path, size, mtime_ns, "failed", {"error": str(e)})
+            logging.error(f"{name}: 分割に失敗しました: {e}")
+        finally:
+            self._finished.put(file_path)
+            # 空いた枠ですぐに次のファイルを始める
+            self._interrupt()
+
+    def _collect_finished(self) -> None:
+        """終わったジョブを外し、分割中に書き換えられたファイルは改めて待ち状態にする"""
+        while True:
+            try:
+                file_path = self._finished.get_nowait()
+            except queue.Empty:
+                return
+            self._running.discard(file_path)
+            if not self._stop_event.is_set():
+                self._observe(file_path, closed=False)
+
+
+def _make_split(config, settings: WatchSettings) -> SplitFunction:
+    """設定ファイルの [Audio]・[Concurrency]・[Cache] に従って分割する関数を作る(GUI と同じ設定)"""
+    from service.audio_splitter import split_audio_file
+    from service.concurrency import load_concurrency_settings
+    from service.ffmpeg_capabilities import discover_capabilities
+    from service.output_cache import open_output_cache
+    from service.probe_cache import open_probe_cache
+
+    target_size_mb = config.getfloat('Audio', 'target_size_mb')
+    output_format = config.get('Audio', 'output_file_format')
+    resume = str(get_config_value(config, 'Audio', 'resume_jobs', 'False')).strip().lower() == 'true'
+    verify = str(get_config_value(config, 'Audio', 'verify_chunks', 'False')).strip().lower() == 'true'
+    probe_cache = open_probe_cache(config)
+    output_cache = open_output_cache(config)
+    capabilities = discover_capabilities(probe_cache)
+    capabilities.check_output_format(output_format)
+    adaptive, min_workers, max_workers = load_concurrency_settings(config)
+    # 同時に分割するファイルの間で ffmpeg の同時実行数を分け合う
+    job_workers = max(1, (max_workers if adaptive else os.cpu_count() or 1) // settings.max_jobs)
+
+    def split(file_path: str, output_dir: str, cancel_token: CancellationToken) -> list[str]:
+        name = os.path.basename(file_path)
+        return split_audio_file(
+            file_path,
+            output_dir,
+            target_chunk_size_mb=target_size_mb,
+            output_format=output_format,
+            progress_callback=lambda message: logging.debug(f"{name}: {message}"),
+            probe_cache=probe_cache,
+            max_workers=job_workers,
+            adaptive_workers=adaptive,
+            min_workers=min(min_workers, job_workers),
+            resume=resume,
+            verify=verify,
+            cancel_token=cancel_token,
+            capabilities=capabilities,
+            output_cache=output_cache,
+        )
+
+    return split
+
+
+def _state_path(config) -> str:
+    cache_directory = str(get_config_value(config, 'Cache', 'cache_directory', 'cache') or 'cache')
+    if not os.path.isabs(cache_directory):
+        project_root = os.path.dirname(os.path.dirname(__file__))
+        cache_directory = os.path.join(project_root, cache_directory)
+    return os.path.join(cache_directory, 'watch_state.json')
+
+
+def main(argv: list[str] | None = None) -> int:
+    from utils.config_manager import load_config
+    from utils.log_rotation import setup_logging
+
+    config = load_config()
+    parser = argparse.ArgumentParser(
+        prog="python -m service.folder_watcher",
+        description="監視フォルダに置かれた音声ファイルを自動で分割する",
+    )
+    parser.add_argument("--watch-dir", default=config.get('Paths', 'downloads_path', fallback=None),
+                        help="監視フォルダ(省略時は設定ファイルの [Paths] downloads_path)")
+    parser.add_argument("--output-dir", default=config.get('Paths', 'output_path', fallback=None),
+                        help="出力先(省略時は設定ファイルの [Paths] output_path)")
+    parser.add_argument("--polling", action="store_true", help="inotify を使わずにフォルダを定期的に走査する")
+    args = parser.parse_args(argv)
+    if not args.watch_dir or not args.output_dir:
+        parser.error("監視フォルダと出力先を指定してください")
+
+    setup_logging(config)
+    settings = load_watch_settings(config)
+    if args.polling:
+        settings = WatchSettings(settings.settle_s, settings.poll_interval_s, settings.max_jobs, use_inotify=False)
+    try:
+        watcher = FolderWatcher(
+            args.watch_dir, args.output_dir, _make_split(config, settings), WatchState(_state_path(config)),
+            settings, progress_callback=print,
+        )
+    except RuntimeError as e:
+        print(f"エラー: {e}", file=sys.stderr)
+        return 1
+
+    signal.signal(signal.SIGTERM, lambda _signum, _frame: watcher.stop())
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
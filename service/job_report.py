@@ -0,0 +1,79 @@
+from dataclasses import asdict, dataclass, field
+from typing import Any, Literal
+
+
+@dataclass
+class ProcessTiming:
+    """ffmpeg 1回分の起動時間と実行時間(index はチャンク番号。segment モードの1プロセスは None)"""
+
+    index: int | None
+    spawn_s: float
+    run_s: float
+
+
+@dataclass
+class SplitReport:
+    """
+    1ジョブ分のパフォーマンスレポート
+
+    遅くなった原因の切り分けに使う。解析(probe_s)・計画(plan_s)が長ければ ffprobe や
+    ディスクの読み込み、spawn_s が大きければプロセス起動、effective_parallelism が
+    max_parallelism より大きく下回れば並列化が効いていない(ディスクや CPU が飽和している)ことを示す。
+    bytes_read は入力サイズと読み込む範囲からの推定値。
+    """
+
+    file_path: str
+    split_mode: str
+    input_bytes: int
+    duration_s: float = 0.0
+    strategy: Literal["copy", "encode", "native", "cache", ""] = ""
+    encoder: str | None = None
+    chunk_count: int = 0
+    resumed_chunks: int = 0
+    redone_chunks: int = 0
+    resplit_chunks: int = 0
+    max_parallelism: int = 1
+    probe_s: float = 0.0
+    plan_s: float = 0.0
+    split_s: float = 0.0
+    verify_s: float = 0.0
+    first_result_s: float = 0.0
+    total_s: float = 0.0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    processes: list[ProcessTiming] = field(default_factory=list)
+
+    @property
+    def effective_parallelism(self) -> float:
+        """ffmpeg の実行時間の合計を分割処理の経過時間で割った値(平均の同時実行数)"""
+        if self.split_s <= 0:
+            return 0.0
+        return sum(p.run_s for p in self.processes) / self.split_s
+
+    @property
+    def x_realtime(self) -> float:
+        """ジョブ全体の実時間比(再生時間 / 所要時間)"""
+        return self.duration_s / self.total_s if self.total_s > 0 else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        data["effective_parallelism"] = round(self.effective_parallelism, 2)
+        data["x_realtime"] = round(self.x_realtime, 2)
+        data["spawn_s_total"] = round(sum(p.spawn_s for p in self.processes), 4)
+        data["run_s_total"] = round(sum(p.run_s for p in self.processes), 4)
+        return data
+
+
+class SplitResult(list[str]):
+    """split_audio_file の戻り値。出力パスのリストに、ジョブのパフォーマンスレポートを添えたもの"""
+
+    def __init__(
+        self,
+        output_files: list[str],
+        report: SplitReport | None = None,
+        consumer_results: list[Any] | None = None,
+    ) -> None:
+        super().__init__(output_files)
+        self.report = report
+        # consumer を指定した場合の戻り値(チャンク番号の順)
+        self.consumer_results = consumer_results
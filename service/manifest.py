@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any
+
+from service.cut_planner import ChunkSpan
+
+_MANIFEST_VERSION = 1
+# 入力の識別に使う先頭・末尾の読み取りサイズ
+_FINGERPRINT_BLOCK = 1024 * 1024
+
+
+def _get_manifest_path(file_path: str, output_dir: str) -> str:
+    """分割ジョブのマニフェストの保存先(出力ディレクトリ内)"""
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(output_dir, f"{base_name}_manifest.json")
+
+
+def _input_fingerprint(file_path: str) -> dict[str, Any]:
+    """入力ファイルの識別情報(サイズ・更新時刻・先頭と末尾のハッシュ)"""
+    stat = os.stat(file_path)
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        digest.update(f.read(_FINGERPRINT_BLOCK))
+        if stat.st_size > _FINGERPRINT_BLOCK:
+            f.seek(max(_FINGERPRINT_BLOCK, stat.st_size - _FINGERPRINT_BLOCK))
+            digest.update(f.read(_FINGERPRINT_BLOCK))
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+
+
+def _file_sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+class SplitManifest:
+    """
+    分割ジョブの計画と各チャンクの状態を記録するマニフェスト(JSON)
+
+    チャンクが完了するたびにサイズとチェックサムを記録して保存し直す(一時ファイル経由で置き換え)。
+    再実行時は入力と分割条件が一致すれば計画を再利用し、検証に通ったチャンクは作り直さない。
+    """
+
+    def __init__(self, path: str, data: dict[str, Any]) -> None:
+        self.path = path
+        self.data = data
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(
+        cls,
+        path: str,
+        fingerprint: dict[str, Any],
+        params: dict[str, Any],
+        chunks: list[ChunkSpan],
+        stream_copy: bool,
+    ) -> "SplitManifest":
+        data = {
+            "version": _MANIFEST_VERSION,
+            "input": fingerprint,
+            "params": params,
+            "stream_copy": stream_copy,
+            "chunks": [
+                {"start_s": start_s, "duration_s": duration_s, "status": "pending"}
+                for start_s, duration_s in chunks
+            ],
+        }
+        return cls(path, data)
+
+    @classmethod
+    def load(cls, path: str) -> "SplitManifest | None":
+        """マニフェストを読み込む。無い・壊れている場合は None"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != _MANIFEST_VERSION:
+            return None
+        return cls(path, data)
+
+    @property
+    def chunks(self) -> list[ChunkSpan]:
+        return [(chunk["start_s"], chunk["duration_s"]) for chunk in self.data["chunks"]]
+
+    @property
+    def stream_copy(self) -> bool:
+        return bool(self.data["stream_copy"])
+
+    def matches(self, fingerprint: dict[str, Any], params: dict[str, Any]) -> bool:
+        """入力ファイルと分割条件が記録時と同じか"""
+        return self.data.get("input") == fingerprint and self.data.get("params") == params
+
+    def completed_chunks(self) -> set[int]:
+        """完了済みで、出力ファイルのサイズとチェックサムが記録と一致するチャンク番号"""
+        valid: set[int] = set()
+        for index, chunk in enumerate(self.data["chunks"]):
+            if chunk.get("status") != "done":
+                continue
+            output_path = chunk.get("path", "")
+            try:
+                if os.path.getsize(output_path) == chunk["size"] and _file_sha256(output_path) == chunk["sha256"]:
+                    valid.add(index)
+            except (OSError, KeyError):
+                pass
+        return valid
+
+    def mark_done(self, index: int, output_path: str) -> None:
+        """チャンクの完了を記録して保存"""
+        size = os.path.getsize(output_path)
+        checksum = _file_sha256(output_path)
+        with self._lock:
+            self.data["chunks"][index].update(
+                {"status": "done", "path": output_path, "size": size, "sha256": checksum}
+            )
+            self._save_locked()
+
+    def rebuild(self, chunks: list[ChunkSpan], sources: list[int | None], output_paths: list[str]) -> None:
+        """
+        分割計画を chunks に置き換えて保存する
+
+        sources[i] は新しい i 番目のチャンクの元の番号(新しく作ったチャンクは None)。元のチャンクの
+        サイズとチェックサムは引き継ぎ、新しいチャンクは output_paths[i] から計算して完了として記録する。
+        """
+        entries: list[dict[str, Any]] = []
+        for (start_s, duration_s), source, output_path in zip(chunks, sources, output_paths):
+            entry: dict[str, Any] = {"start_s": start_s, "duration_s": duration_s, "status": "pending"}
+            if source is not None:
+                entry.update({k: v for k, v in self.data["chunks"][source].items() if k in ("status", "size", "sha256")})
+            else:
+                entry.update({"status": "done", "size": os.path.getsize(output_path), "sha256": _file_sha256(output_path)})
+            if entry["status"] == "done":
+                entry["path"] = output_path
+            entries.append(entry)
+        with self._lock:
+            self.data["chunks"] = entries
+            self._save_locked()
+
+    def save(self) -> None:
+        with self._lock:
+            self._save_locked()
+
+    def _save_locked(self) -> None:
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
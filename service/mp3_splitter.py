@@ -0,0 +1,267 @@
+import mmap
+import struct
+from array import array
+from dataclasses import dataclass
+
+import numpy as np
+
+from service.cancellation import CancellationToken
+from service.cut_planner import ChunkSpan, _budget_cuts
+from service.wav_splitter import _copy_range
+
+# Layer III のビットレート(kbps)。インデックス 0(フリーフォーマット)と 15 は扱わない
+_BITRATES_MPEG1 = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+_BITRATES_MPEG2 = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+# バージョンのビット(0: MPEG2.5, 2: MPEG2, 3: MPEG1)ごとのサンプルレート
+_SAMPLE_RATES = {0: (11025, 12000, 8000), 2: (22050, 24000, 16000), 3: (44100, 48000, 32000)}
+# フレームの同一性の判定に使うヘッダのビット(同期・バージョン・レイヤー・サンプルレート)
+_HEADER_MASK = 0xFFFE0C00
+_XING_FLAGS = 0x0003  # フレーム数とバイト数を持つ
+# 先頭のタグを除いたファイルのうち、フレームとして読めた割合の下限(末尾のタグ程度は許容する)
+_MIN_COVERAGE = 0.9
+
+
+@dataclass(frozen=True)
+class _FrameHeader:
+    version: int
+    bitrate_index: int
+    sample_rate: int
+    length: int
+    mono: bool
+    protected: bool
+
+    @property
+    def samples(self) -> int:
+        return 1152 if self.version == 3 else 576
+
+    @property
+    def side_info_bytes(self) -> int:
+        if self.version == 3:
+            return 17 if self.mono else 32
+        return 9 if self.mono else 17
+
+
+def _parse_header(word: int) -> _FrameHeader | None:
+    """32bit のフレームヘッダを解釈する。MPEG Layer III 以外・不正な値は None"""
+    if word & 0xFFE00000 != 0xFFE00000:
+        return None
+    version = (word >> 19) & 3
+    layer = (word >> 17) & 3
+    bitrate_index = (word >> 12) & 0xF
+    sample_rate_index = (word >> 10) & 3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    padding = (word >> 9) & 1
+    if version == 3:
+        length = 144 * _BITRATES_MPEG1[bitrate_index] * 1000 // sample_rate + padding
+    else:
+        length = 72 * _BITRATES_MPEG2[bitrate_index] * 1000 // sample_rate + padding
+    return _FrameHeader(
+        version=version,
+        bitrate_index=bitrate_index,
+        sample_rate=sample_rate,
+        length=length,
+        mono=(word >> 6) & 3 == 3,
+        protected=not word & 0x10000,
+    )
+
+
+def _id3v2_size(data: mmap.mmap) -> int:
+    """先頭の ID3v2 タグのバイト数(無ければ 0)"""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = 0
+    for byte in data[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _is_info_frame(data: mmap.mmap, offset: int, header: _FrameHeader) -> bool:
+    """Xing/Info/VBRI のメタデータを持つ(音声ではない)先頭フレームか"""
+    xing_at = offset + 4 + (2 if header.protected else 0) + header.side_info_bytes
+    return data[xing_at:xing_at + 4] in (b"Xing", b"Info") or data[offset + 36:offset + 40] == b"VBRI"
+
+
+@dataclass(frozen=True)
+class Mp3Info:
+    """
+    MP3(MPEG Layer III)の音声フレームの位置
+
+    frame_offsets は各フレームの先頭位置で、末尾に最後のフレームの終わりの位置を加えたもの。
+    header は先頭の音声フレームのヘッダ(出力の Xing/Info フレームの雛形)。
+    """
+
+    frame_offsets: array
+    sample_rate: int
+    samples_per_frame: int
+    header: int
+    vbr: bool
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.frame_offsets) - 1
+
+    @property
+    def duration_s(self) -> float:
+        return self.frame_count * self.samples_per_frame / self.sample_rate
+
+
+def read_mp3_info(file_path: str) -> Mp3Info | None:
+    """
+    入力をメモリマップしてフレームヘッダをたどり、音声フレームの位置を集める
+
+    先頭の ID3v2 タグと Xing/Info/VBRI フレームは除き、末尾の ID3v1/APE タグなど
+    フレームとして解釈できないデータの手前で止める。MPEG Layer III 以外・フリーフォーマットなど
+    扱えない場合は None(ffmpeg で分割する)。
+    """
+    try:
+        with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return _scan_frames(data)
+    except (OSError, ValueError):
+        return None
+
+
+def _scan_frames(data: mmap.mmap) -> Mp3Info | None:
+    size = len(data)
+    offset = _id3v2_size(data)
+    # 2フレーム続けてヘッダとして解釈できる位置を先頭とみなす(音声データ中の偽の同期を避ける)
+    first: _FrameHeader | None = None
+    first_word = 0
+    limit = min(size - 4, offset + 64 * 1024)
+    while offset < limit:
+        offset = data.find(b"\xff", offset, limit)
+        if offset < 0:
+            return None
+        word = struct.unpack_from(">I", data, offset)[0]
+        header = _parse_header(word)
+        if header is not None and offset + header.length + 4 <= size:
+            next_word = struct.unpack_from(">I", data, offset + header.length)[0]
+            if next_word & _HEADER_MASK == word & _HEADER_MASK and _parse_header(next_word) is not None:
+                first, first_word = header, word
+                break
+        offset += 1
+    if first is None:
+        return None
+
+    if _is_info_frame(data, offset, first):
+        offset += first.length
+        if offset + 4 > size:
+            return None
+        first_word = struct.unpack_from(">I", data, offset)[0]
+    audio_start = offset
+
+    offsets = array("q")
+    # ヘッダの種類はビットレートとパディング程度しかないため、解釈した結果(フレーム長)を使い回す
+    lengths: dict[int, int] = {}
+    expected = first_word & _HEADER_MASK
+    while offset + 4 <= size:
+        word = struct.unpack_from(">I", data, offset)[0]
+        if word & _HEADER_MASK != expected:
+            break
+        length = lengths.get(word)
+        if length is None:
+            header = _parse_header(word)
+            if header is None:
+                break
+            length = lengths[word] = header.length
+        if offset + length > size:
+            break
+        offsets.append(offset)
+        offset += length
+    if not offsets:
+        return None
+    offsets.append(offset)
+    # 偶然ヘッダに見えたデータではなく、ファイルの大部分がフレームであることを確かめる
+    if offset - audio_start < (size - audio_start) * _MIN_COVERAGE:
+        return None
+    bitrates = {(word >> 12) & 0xF for word in lengths}
+
+    return Mp3Info(
+        frame_offsets=offsets,
+        sample_rate=first.sample_rate,
+        samples_per_frame=first.samples,
+        header=first_word,
+        vbr=len(bitrates) > 1,
+    )
+
+
+def _info_frame(info: Mp3Info, frame_count: int, data_bytes: int) -> bytes:
+    """
+    チャンク先頭に置く Xing(VBR)/Info(CBR)フレーム(フレーム数と合計バイト数を持つ)
+
+    雛形のヘッダから CRC とパディングを外し、タグが収まる最小のビットレートを選ぶ。
+    """
+    word = (info.header | 0x10000) & ~0x200
+    for bitrate_index in range(1, 15):
+        candidate = (word & ~0xF000) | (bitrate_index << 12)
+        header = _parse_header(candidate)
+        if header is not None and header.length >= 4 + header.side_info_bytes + 16:
+            break
+    else:
+        raise RuntimeError("Xing フレームを作成できません")
+    tag_at = 4 + header.side_info_bytes
+    frame = bytearray(header.length)
+    struct.pack_into(">I", frame, 0, candidate)
+    frame[tag_at:tag_at + 4] = b"Xing" if info.vbr else b"Info"
+    struct.pack_into(">III", frame, tag_at + 4, _XING_FLAGS, frame_count, header.length + data_bytes)
+    return bytes(frame)
+
+
+def plan_mp3_chunks(info: Mp3Info, target_chunk_bytes: int) -> list[ChunkSpan]:
+    """
+    各チャンクが Xing/Info フレームを含めて目標バイト数を超えないよう、フレーム境界で最大限詰めて分ける
+    """
+    frame_sizes = np.diff(np.frombuffer(info.frame_offsets, dtype=np.int64))
+    budget = target_chunk_bytes - len(_info_frame(info, 0, 0))
+    bounds = [0] + _budget_cuts(frame_sizes, budget) + [info.frame_count]
+    seconds_per_frame = info.samples_per_frame / info.sample_rate
+    return [
+        (bounds[i] * seconds_per_frame, (bounds[i + 1] - bounds[i]) * seconds_per_frame)
+        for i in range(len(bounds) - 1)
+    ]
+
+
+def _frame_range(info: Mp3Info, start_s: float, duration_s: float) -> tuple[int, int]:
+    """分割計画の (開始秒, 長さ秒) を、フレーム番号の範囲 [first, stop) に戻す"""
+    frames_per_s = info.sample_rate / info.samples_per_frame
+    first = min(round(start_s * frames_per_s), info.frame_count)
+    stop = min(round((start_s + duration_s) * frames_per_s), info.frame_count)
+    return first, stop
+
+
+def write_mp3_chunk(
+    file_path: str,
+    output_path: str,
+    info: Mp3Info,
+    start_s: float,
+    duration_s: float,
+    cancel_token: CancellationToken | None = None,
+) -> int:
+    """
+    Xing/Info フレームを書き、入力のフレームの該当範囲をそのままコピーする
+
+    Returns:
+        書き込んだ音声フレームのバイト数
+    """
+    first, stop = _frame_range(info, start_s, duration_s)
+    offset = info.frame_offsets[first]
+    size = info.frame_offsets[stop] - offset
+    with open(file_path, "rb") as src, open(output_path, "wb", buffering=0) as dst:
+        dst.write(_info_frame(info, stop - first, size))
+        _copy_range(src.fileno(), dst.fileno(), offset, size, cancel_token)
+    return size
+
+
+def read_mp3_chunk(file_path: str, info: Mp3Info, start_s: float, duration_s: float) -> bytes:
+    """write_mp3_chunk と同じ内容のチャンクを、ファイルに書かずにバイト列として返す"""
+    first, stop = _frame_range(info, start_s, duration_s)
+    offset = info.frame_offsets[first]
+    size = info.frame_offsets[stop] - offset
+    with open(file_path, "rb") as src:
+        src.seek(offset)
+        data = src.read(size)
+    if len(data) < size:
+        raise RuntimeError("入力ファイルが途中で終わっています")
+    return _info_frame(info, stop - first, size) + data
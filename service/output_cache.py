@@ -0,0 +1,242 @@
+import configparser
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from collections.abc import Callable
+from typing import Any
+
+from utils.config_manager import get_config_value
+
+_CACHE_VERSION = 1
+# 内容の指紋に使う先頭・末尾の読み取りサイズと、その間から等間隔に読むブロックの数・サイズ
+_EDGE_BLOCK = 1024 * 1024
+_STRIDE_BLOCKS = 32
+_STRIDE_BLOCK = 64 * 1024
+# ファイルのデータを共有せずに複製する ioctl(Linux の FICLONE。Btrfs・XFS などが対応)
+_FICLONE = 0x40049409
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    key TEXT PRIMARY KEY,
+    files TEXT NOT NULL,
+    nbytes INTEGER NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+
+def content_fingerprint(file_path: str) -> str:
+    """
+    入力ファイルの内容の指紋(サイズ・先頭と末尾・その間の等間隔のブロックのハッシュ)
+
+    パスや更新時刻は含めないため、別の場所にコピーされた同じ録音は同じ指紋になる。
+    ファイル全体は読まず、数 MB の読み込みで済む。
+    """
+    size = os.path.getsize(file_path)
+    digest = hashlib.sha256(f"{_CACHE_VERSION}:{size}".encode())
+    with open(file_path, "rb") as f:
+        if size <= 2 * _EDGE_BLOCK + _STRIDE_BLOCKS * _STRIDE_BLOCK:
+            return hashlib.file_digest(f, lambda: digest).hexdigest()
+        digest.update(f.read(_EDGE_BLOCK))
+        span = size - 2 * _EDGE_BLOCK - _STRIDE_BLOCK
+        for index in range(_STRIDE_BLOCKS):
+            f.seek(_EDGE_BLOCK + span * index // (_STRIDE_BLOCKS - 1))
+            digest.update(f.read(_STRIDE_BLOCK))
+        f.seek(size - _EDGE_BLOCK)
+        digest.update(f.read(_EDGE_BLOCK))
+    return digest.hexdigest()
+
+
+def _reflink(src: str, dst: str) -> bool:
+    """dst に src の reflink(書き込むと別のデータになる複製)を作る。対応していなければ False"""
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src, "rb") as source, open(dst, "wb") as target:
+            fcntl.ioctl(target.fileno(), _FICLONE, source.fileno())
+    except OSError:
+        return False
+    return True
+
+
+def _clone_or_copy(src: str, dst: str) -> None:
+    """
+    dst を src の複製に置き換える(reflink に対応したファイルシステムでは瞬時に、それ以外はコピー)
+
+    ハードリンクにすると、出力先のチャンクが開き直して書き換えられたとき(ffmpeg -y での再分割など)に
+    キャッシュと、同じエントリから出力した他のフォルダのチャンクまで書き換わるため使わない。
+    """
+    temp_path = f"{dst}.{uuid.uuid4().hex}.tmp"
+    try:
+        if not _reflink(src, temp_path):
+            shutil.copyfile(src, temp_path)
+        os.replace(temp_path, dst)
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.remove(temp_path)
+        raise
+
+
+class OutputCache:
+    """
+    分割結果(チャンクのファイル)を、入力の内容の指紋と分割条件ごとに保存するキャッシュ
+
+    チャンクは directory/outputs/<キー>/ に複製(reflink に対応していなければコピー)して保存し、一覧と
+    最後に使われた時刻を SQLite に記録する。チャンクの合計サイズが max_bytes を超えたら、最後に使われた時刻が
+    古いものから削除する。出力先とはデータを共有しないため、出力されたチャンクを上書きしてもキャッシュは変わらない。
+    保存時のサイズ・更新時刻と一致しないチャンクがあれば(キャッシュのディレクトリが直接書き換えられた場合)、
+    キャッシュに無いものとして扱う。
+    キャッシュの読み書きに失敗しても処理は止めず、通常どおり分割する。
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 2 * 1024 * 1024 * 1024) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._db_path = os.path.join(directory, "output_cache.sqlite3")
+        self._objects_dir = os.path.join(directory, "outputs")
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(self._objects_dir, exist_ok=True)
+        conn = sqlite3.connect(self._db_path, timeout=5)
+        conn.execute(_SCHEMA)
+        return conn
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self._objects_dir, key)
+
+    @staticmethod
+    def key_for(file_path: str, params: dict[str, Any]) -> str:
+        """入力の内容の指紋と分割条件から、キャッシュのキーを作る"""
+        payload = json.dumps({"input": content_fingerprint(file_path), "params": params}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def restore(self, key: str, output_path_for: Callable[[int], str]) -> list[str] | None:
+        """
+        キャッシュされた各チャンクを output_path_for(チャンク番号) へ複製する
+
+        Returns:
+            出力したパスのリスト。キャッシュに無い・壊れている場合は None
+        """
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    row = conn.execute("SELECT files FROM outputs WHERE key = ?", (key,)).fetchone()
+                    if row is None:
+                        return None
+                    signatures = json.loads(row[0])
+                    cached = self._cached_paths(key, len(signatures))
+                    if cached is None or [_signature(path) for path in cached] != signatures:
+                        # 削除・書き換えられたチャンクがある
+                        conn.execute("DELETE FROM outputs WHERE key = ?", (key,))
+                        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+                        return None
+                    conn.execute("UPDATE outputs SET last_used = ? WHERE key = ?", (time.time(), key))
+            finally:
+                conn.close()
+        except (sqlite3.Error, OSError, ValueError) as e:
+            logging.warning(f"出力キャッシュの読み込みに失敗しました: {e}")
+            return None
+
+        output_paths = [output_path_for(index) for index in range(len(cached))]
+        try:
+            for src, dst in zip(cached, output_paths):
+                os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+                _clone_or_copy(src, dst)
+        except OSError as e:
+            logging.warning(f"出力キャッシュからの出力に失敗しました: {e}")
+            return None
+        return output_paths
+
+    def _cached_paths(self, key: str, count: int) -> list[str] | None:
+        entry_dir = self._entry_dir(key)
+        try:
+            names = sorted(os.listdir(entry_dir))
+        except OSError:
+            return None
+        if len(names) != count:
+            return None
+        return [os.path.join(entry_dir, name) for name in names]
+
+    def store(self, key: str, output_files: list[str]) -> None:
+        """チャンクをキャッシュに保存し、上限を超えた分を古い順に削除する"""
+        if not output_files:
+            return
+        entry_dir = self._entry_dir(key)
+        temp_dir = f"{entry_dir}.{uuid.uuid4().hex}.tmp"
+        try:
+            nbytes = sum(os.path.getsize(path) for path in output_files)
+            if nbytes > self.max_bytes:
+                return
+            conn = self._connect()
+            try:
+                os.makedirs(temp_dir)
+                signatures = []
+                for index, path in enumerate(output_files):
+                    extension = os.path.splitext(path)[1]
+                    cached_path = os.path.join(temp_dir, f"{index:05d}{extension}")
+                    _clone_or_copy(path, cached_path)
+                    signatures.append(_signature(cached_path))
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                os.replace(temp_dir, entry_dir)
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?)",
+                        (key, json.dumps(signatures), nbytes, time.time()),
+                    )
+                    self._evict(conn)
+            finally:
+                conn.close()
+        except (sqlite3.Error, OSError) as e:
+            logging.warning(f"出力キャッシュの保存に失敗しました: {e}")
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """合計サイズが上限以下になるまで LRU 順に削除"""
+        total = conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM outputs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT key, nbytes FROM outputs ORDER BY last_used").fetchall()
+        for key, nbytes in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM outputs WHERE key = ?", (key,))
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total -= nbytes
+
+
+def _signature(path: str) -> list[int] | None:
+    """キャッシュ内のチャンクの [サイズ, 更新時刻](書き換えられると変わる)"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def open_output_cache(config: configparser.ConfigParser) -> OutputCache | None:
+    """設定ファイルの [Cache] セクションから出力キャッシュを作成(無効なら None)"""
+    enabled = str(get_config_value(config, 'Cache', 'output_cache_enabled', 'False') or 'False')
+    if enabled.strip().lower() not in ('true', '1', 'yes', 'on'):
+        return None
+
+    cache_directory = str(get_config_value(config, 'Cache', 'cache_directory', 'cache') or 'cache')
+    if not os.path.isabs(cache_directory):
+        project_root = os.path.dirname(os.path.dirname(__file__))
+        cache_directory = os.path.join(project_root, cache_directory)
+
+    try:
+        max_mb = float(str(get_config_value(config, 'Cache', 'output_cache_max_mb', 2048) or 2048))
+    except ValueError:
+        max_mb = 2048.0
+
+    return OutputCache(cache_directory, int(max_mb * 1024 * 1024))
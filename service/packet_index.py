@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import os
+import struct
+
+import numpy as np
+
+from service.cancellation import CancellationToken
+from service.ffmpeg_runner import _probe_packet_records
+
+# ヘッダ: マジック, バージョン, レコード長, パケット数, 入力のサイズ, 入力の更新時刻, 再生時間(秒), コーデック名
+_HEADER = struct.Struct("<8sIIqqqd16s")
+_MAGIC = b"AFSPKIDX"
+_VERSION = 1
+# パケットごとのレコード(時刻, ファイル内の位置, サイズ, フラグ)。8 バイト境界に揃えて np.memmap でそのまま読む
+_RECORD = np.dtype([("pts", "<f8"), ("pos", "<i8"), ("size", "<u4"), ("flags", "<u4")])
+_FLAG_KEYFRAME = 1
+
+
+class PacketIndex:
+    """
+    音声ストリームの全パケットの時刻・位置・サイズ・キーフレームフラグ
+
+    保存済みのファイルから開いた場合、レコードはメモリマップしたままで読み込まない。
+    """
+
+    def __init__(self, path: str, records: np.ndarray, duration_s: float, codec: str) -> None:
+        self.path = path
+        self.records = records
+        self.duration_s = duration_s
+        self.codec = codec
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def times(self) -> np.ndarray:
+        return self.records["pts"]
+
+    @property
+    def sizes(self) -> np.ndarray:
+        return self.records["size"]
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self.records["pos"]
+
+    @property
+    def keyframes(self) -> np.ndarray:
+        return self.records["flags"] & _FLAG_KEYFRAME
+
+
+def packet_index_path(file_path: str, index_dir: str) -> str:
+    """入力ファイルのインデックスの保存先(同名の別ファイルと衝突しないよう、パスのハッシュを付ける)"""
+    normalized = os.path.normcase(os.path.abspath(file_path))
+    digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(index_dir, f"{os.path.basename(file_path)}.{digest}.pktidx")
+
+
+def open_packet_index(file_path: str, index_dir: str) -> PacketIndex | None:
+    """保存済みのインデックスを開く。無い・入力が変更されている・壊れている場合は None"""
+    path = packet_index_path(file_path, index_dir)
+    try:
+        stat = os.stat(file_path)
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            f.seek(0, os.SEEK_END)
+            file_size = f.tell()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        logging.warning(f"パケットインデックスの読み込みに失敗しました: {e}")
+        return None
+
+    if len(header) < _HEADER.size:
+        return None
+    magic, version, record_size, count, source_size, source_mtime_ns, duration_s, codec = _HEADER.unpack(header)
+    if magic != _MAGIC or version != _VERSION or record_size != _RECORD.itemsize:
+        return None
+    if (source_size, source_mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+        return None
+    if count <= 0 or file_size != _HEADER.size + count * _RECORD.itemsize:
+        return None
+
+    try:
+        records = np.memmap(path, dtype=_RECORD, mode="r", offset=_HEADER.size, shape=(count,))
+    except (OSError, ValueError) as e:
+        logging.warning(f"パケットインデックスの読み込みに失敗しました: {e}")
+        return None
+    return PacketIndex(path, records, duration_s, codec.rstrip(b"\0").decode("ascii", "replace"))
+
+
+def build_packet_index(
+    file_path: str,
+    index_dir: str,
+    duration_s: float,
+    codec: str,
+    cancel_token: CancellationToken | None = None,
+) -> PacketIndex:
+    """
+    ffprobe でパケットを1回走査してインデックスを作り、index_dir に保存する
+
+    保存に失敗しても処理は止めず、メモリ上のインデックスを返す。
+
+    Raises:
+        RuntimeError: パケットの情報を取得できない
+    """
+    stat = os.stat(file_path)
+    times, sizes, positions, keyframes = _probe_packet_records(file_path, cancel_token)
+
+    records = np.empty(len(times), dtype=_RECORD)
+    records["pts"] = np.frombuffer(times, dtype=np.float64)
+    records["pos"] = np.frombuffer(positions, dtype=np.int64)
+    records["size"] = np.frombuffer(sizes, dtype=np.int64)
+    records["flags"] = np.frombuffer(keyframes, dtype=np.uint8) * _FLAG_KEYFRAME
+
+    path = packet_index_path(file_path, index_dir)
+    header = _HEADER.pack(
+        _MAGIC, _VERSION, _RECORD.itemsize, len(records), stat.st_size, stat.st_mtime_ns,
+        duration_s, codec.encode("ascii", "replace")[:16],
+    )
+    temp_path = f"{path}.tmp"
+    try:
+        os.makedirs(index_dir, exist_ok=True)
+        with open(temp_path, "wb") as f:
+            f.write(header)
+            f.write(records.tobytes())
+        os.replace(temp_path, path)
+    except OSError as e:
+        logging.warning(f"パケットインデックスの保存に失敗しました: {e}")
+    return PacketIndex(path, records, duration_s, codec)
@@ -0,0 +1,133 @@
+import configparser
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections.abc import Callable
+from typing import Any
+
+from utils.config_manager import get_config_value
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS probe (
+    path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    nbytes INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (path, kind)
+)
+"""
+
+
+def _file_identity(file_path: str) -> tuple[str, int, int, int]:
+    """キャッシュキーとなるファイルの識別情報(正規化パス, サイズ, 更新時刻, inode)"""
+    stat = os.stat(file_path)
+    path = os.path.normcase(os.path.abspath(file_path))
+    return path, stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+class ProbeCache:
+    """
+    ffprobe の結果をファイルの識別情報(パス・サイズ・更新時刻・inode)ごとに保存する SQLite キャッシュ
+
+    保存データの合計が max_bytes を超えたら、最後に使われた時刻が古いものから削除する。
+    キャッシュの読み書きに失敗しても処理は止めず、ffprobe を実行する。
+    """
+
+    def __init__(self, db_path: str, max_bytes: int = 16 * 1024 * 1024) -> None:
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.execute(_SCHEMA)
+        return conn
+
+    def get(self, file_path: str, kind: str) -> Any | None:
+        """キャッシュされた値を返す。無い・ファイルが変更されている場合は None"""
+        path, size, mtime_ns, inode = _file_identity(file_path)
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute(
+                    "SELECT value FROM probe WHERE path = ? AND kind = ?"
+                    " AND size = ? AND mtime_ns = ? AND inode = ?",
+                    (path, kind, size, mtime_ns, inode),
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute(
+                    "UPDATE probe SET last_used = ? WHERE path = ? AND kind = ?",
+                    (time.time(), path, kind),
+                )
+            return json.loads(row[0])
+        finally:
+            conn.close()
+
+    def put(self, file_path: str, kind: str, value: Any) -> None:
+        """値を保存し、上限を超えた分を古い順に削除する"""
+        path, size, mtime_ns, inode = _file_identity(file_path)
+        payload = json.dumps(value)
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO probe VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (path, kind, size, mtime_ns, inode, payload, len(payload), time.time()),
+                )
+                self._evict(conn)
+        finally:
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """合計サイズが上限以下になるまで LRU 順に削除"""
+        total = conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM probe").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT path, kind, nbytes FROM probe ORDER BY last_used").fetchall()
+        for path, kind, nbytes in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM probe WHERE path = ? AND kind = ?", (path, kind))
+            total -= nbytes
+
+    def get_or_probe(self, file_path: str, kind: str, probe: Callable[[], Any]) -> Any:
+        """キャッシュにあればその値を、無ければ probe() を実行して保存した値を返す"""
+        try:
+            cached = self.get(file_path, kind)
+            if cached is not None:
+                return cached
+        except (sqlite3.Error, OSError, ValueError) as e:
+            logging.warning(f"プローブキャッシュの読み込みに失敗しました: {e}")
+
+        value = probe()
+        try:
+            self.put(file_path, kind, value)
+        except (sqlite3.Error, OSError, TypeError) as e:
+            logging.warning(f"プローブキャッシュの保存に失敗しました: {e}")
+        return value
+
+
+def open_probe_cache(config: configparser.ConfigParser) -> ProbeCache | None:
+    """設定ファイルの [Cache] セクションからプローブキャッシュを作成(無効なら None)"""
+    enabled = str(get_config_value(config, 'Cache', 'probe_cache_enabled', 'True') or 'True')
+    if enabled.strip().lower() in ('false', '0', 'no', 'off'):
+        return None
+
+    cache_directory = str(get_config_value(config, 'Cache', 'cache_directory', 'cache') or 'cache')
+    if not os.path.isabs(cache_directory):
+        project_root = os.path.dirname(os.path.dirname(__file__))
+        cache_directory = os.path.join(project_root, cache_directory)
+
+    try:
+        max_mb = float(str(get_config_value(config, 'Cache', 'probe_cache_max_mb', 16) or 16))
+    except ValueError:
+        max_mb = 16.0
+
+    return ProbeCache(os.path.join(cache_directory, 'probe_cache.sqlite3'), int(max_mb * 1024 * 1024))
@@ -0,0 +1,117 @@
+import threading
+import time
+from collections.abc import Callable, Iterable
+
+from service.progress_events import ChunkProgress
+
+# 進捗メッセージを送る最短間隔(秒)。ffmpeg は 0.5 秒ごとに -progress を出力する
+_NOTIFY_INTERVAL_S = 0.5
+
+
+def _format_eta(seconds: float) -> str:
+    """残り時間を H:MM:SS / M:SS 形式にする"""
+    total = int(round(seconds))
+    hours, rest = divmod(total, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+def format_progress(percent: float, speed: float | None, eta_s: float | None) -> str:
+    """進捗率・処理速度・残り時間を表示用のテキストにする(不明な値は省く)"""
+    parts = [f"進捗: {percent:.1f}%"]
+    if speed is not None:
+        parts.append(f"速度: {speed:.2f}x")
+    if eta_s is not None:
+        parts.append(f"残り: {_format_eta(eta_s)}")
+    return " / ".join(parts)
+
+
+class ProgressTracker:
+    """
+    チャンクごとの ffmpeg の進捗(出力済み時間・速度)を集計し、全体の進捗を通知する
+
+    進捗率は全チャンクの合計再生時間に対する出力済み時間の割合。
+    処理速度は実行中の ffmpeg が報告する speed の合計(実時間比)で、
+    止まっている ffmpeg があればすぐに下がる。speed が得られないときは開始からの平均を使う。
+    残り時間は未出力の再生時間を処理速度で割って求める。
+    notify へのテキストは interval_s ごとに間引き、on_event へは更新のたびに ChunkProgress を渡す
+    (間引きは ProgressDispatcher が行う)。
+    """
+
+    def __init__(
+        self,
+        durations: list[float],
+        notify: Callable[[str], None] | None,
+        completed: Iterable[int] = (),
+        interval_s: float = _NOTIFY_INTERVAL_S,
+        clock: Callable[[], float] = time.monotonic,
+        on_event: Callable[[ChunkProgress], None] | None = None,
+    ) -> None:
+        self._durations = durations
+        self._total_s = sum(durations)
+        self._notify = notify
+        self._on_event = on_event
+        self._interval_s = interval_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._done_s = [0.0] * len(durations)
+        self._speeds: dict[int, float] = {}
+        for index in completed:
+            self._done_s[index] = durations[index]
+        self._initial_done_s = sum(self._done_s)
+        self._started_at = clock()
+        self._last_notified_at: float | None = None
+
+    def update(self, index: int, out_time_s: float, speed: float | None) -> None:
+        """index 番目のチャンクの ffmpeg から進捗を受け取る"""
+        with self._lock:
+            self._done_s[index] = min(out_time_s, self._durations[index])
+            if speed is not None:
+                self._speeds[index] = speed
+            now = self._clock()
+            event = None
+            if self._on_event is not None:
+                percent, speed, eta_s = self._snapshot(now)
+                event = ChunkProgress(index, out_time_s, percent, speed, eta_s)
+            message = None
+            if self._notify is not None and (
+                self._last_notified_at is None or now - self._last_notified_at >= self._interval_s
+            ):
+                self._last_notified_at = now
+                message = self._format(now)
+        if event is not None and self._on_event is not None:
+            self._on_event(event)
+        if message is not None and self._notify is not None:
+            self._notify(message)
+
+    def finish(self, index: int) -> None:
+        """index 番目のチャンクの出力完了を記録する(通知はしない)"""
+        with self._lock:
+            self._done_s[index] = self._durations[index]
+            self._speeds.pop(index, None)
+
+    def handler(self, index: int) -> Callable[[float, float | None], None]:
+        """index 番目のチャンク用の進捗通知関数を返す"""
+        return lambda out_time_s, speed: self.update(index, out_time_s, speed)
+
+    def snapshot(self) -> tuple[float, float | None, float | None]:
+        """(進捗率(%), 処理速度(実時間比), 残り時間(秒)) を返す。不明な値は None"""
+        with self._lock:
+            return self._snapshot(self._clock())
+
+    def _snapshot(self, now: float) -> tuple[float, float | None, float | None]:
+        done_s = sum(self._done_s)
+        percent = 100.0 * done_s / self._total_s if self._total_s > 0 else 100.0
+
+        speed: float | None = sum(self._speeds.values()) if self._speeds else None
+        elapsed_s = now - self._started_at
+        if speed is None and elapsed_s > 0 and done_s > self._initial_done_s:
+            speed = (done_s - self._initial_done_s) / elapsed_s
+
+        eta_s = max(self._total_s - done_s, 0.0) / speed if speed else None
+        return percent, speed, eta_s
+
+    def _format(self, now: float) -> str:
+        return format_progress(*self._snapshot(now))
@@ -0,0 +1,112 @@
+import logging
+import threading
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+
+
+@dataclass(slots=True, frozen=True)
+class JobStarted:
+    """分割計画ができ、チャンクの出力を始める"""
+
+    file_path: str
+    chunk_count: int
+    duration_s: float
+    stream_copy: bool
+
+
+@dataclass(slots=True, frozen=True)
+class ChunkStarted:
+    """index 番目のチャンクの ffmpeg を起動する"""
+
+    index: int
+    start_s: float
+    duration_s: float
+
+
+@dataclass(slots=True, frozen=True)
+class ChunkProgress:
+    """
+    実行中の ffmpeg の進捗と、ジョブ全体の進捗
+
+    index は進捗を報告したチャンク(segment モードでは 0、ranges モードでは範囲の番号)。percent・speed・eta_s はジョブ全体の値で、
+    speed(実時間比)と eta_s(秒)はまだ求められない場合 None。
+    """
+
+    index: int
+    out_time_s: float
+    percent: float
+    speed: float | None
+    eta_s: float | None
+
+
+@dataclass(slots=True, frozen=True)
+class ChunkDone:
+    """index 番目のチャンクを出力した(completed は再開時に完了済みだった分を含む)"""
+
+    index: int
+    output_path: str
+    completed: int
+    total: int
+
+
+@dataclass(slots=True, frozen=True)
+class JobDone:
+    """全チャンクを出力した"""
+
+    output_count: int
+    elapsed_s: float
+    x_realtime: float
+
+
+ProgressEvent = JobStarted | ChunkStarted | ChunkProgress | ChunkDone | JobDone
+ProgressEventCallback = Callable[[ProgressEvent], None]
+
+
+class ProgressDispatcher:
+    """
+    進捗イベントを専用スレッドから callback へ順に届ける
+
+    emit() はキューに積むだけで callback を待たないため、callback が遅くても ffmpeg の実行は止まらない。
+    ChunkProgress が続けて積まれた場合は最新のものだけを残す(間引く)。
+    それ以外のイベントは間引かず、積まれた順に届ける。
+    """
+
+    def __init__(self, callback: ProgressEventCallback) -> None:
+        self._callback = callback
+        self._condition = threading.Condition()
+        self._events: deque[ProgressEvent] = deque()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="progress-dispatcher", daemon=True)
+        self._thread.start()
+
+    def emit(self, event: ProgressEvent) -> None:
+        """イベントを積む(呼び出し元はブロックしない)"""
+        with self._condition:
+            if self._closed:
+                return
+            if isinstance(event, ChunkProgress) and self._events and isinstance(self._events[-1], ChunkProgress):
+                self._events[-1] = event
+            else:
+                self._events.append(event)
+            self._condition.notify()
+
+    def close(self) -> None:
+        """積まれているイベントをすべて届けてからスレッドを終了する"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._events and not self._closed:
+                    self._condition.wait()
+                if not self._events:
+                    return
+                event = self._events.popleft()
+            try:
+                self._callback(event)
+            except Exception as e:
+                logging.warning(f"進捗イベントの処理中にエラーが発生しました: {e}")
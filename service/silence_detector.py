@@ -0,0 +1,97 @@
+import numpy as np
+
+from service.cancellation import CancellationToken
+from service.ffmpeg_runner import _iter_pcm
+
+# 解析用のデコード設定(無音判定には低いサンプルレートのモノラルで十分)
+_SAMPLE_RATE = 8000
+_BLOCK_S = 0.05
+# 1回のパイプ読み込みで処理するブロック数(メモリ使用量の上限を決める)
+_BLOCKS_PER_READ = 4096
+
+
+def _block_levels_db(pcm: bytes, block_samples: int) -> np.ndarray:
+    """16bit PCM を固定長ブロックに分け、各ブロックの RMS レベル(dBFS)を返す"""
+    samples = np.frombuffer(pcm, dtype="<i2")
+    num_blocks = len(samples) // block_samples
+    blocks = samples[: num_blocks * block_samples].reshape(num_blocks, block_samples).astype(np.float32)
+    rms = np.sqrt(np.mean(blocks * blocks, axis=1))
+    return 20 * np.log10(rms / 32768.0 + 1e-10)
+
+
+def _choose_quiet_point(
+    levels_db: np.ndarray,
+    window_start_s: float,
+    boundary_s: float,
+    block_s: float,
+    silence_db: float,
+) -> float:
+    """
+    探索範囲内で分割位置を選ぶ
+
+    silence_db 以下のブロックがあれば元の位置に最も近いものを、
+    無ければ最もレベルの低いブロックの中心を返す。
+    """
+    centers = window_start_s + (np.arange(len(levels_db)) + 0.5) * block_s
+    quiet = np.flatnonzero(levels_db <= silence_db)
+    if len(quiet) > 0:
+        best = quiet[np.argmin(np.abs(centers[quiet] - boundary_s))]
+    else:
+        best = np.argmin(levels_db)
+    return float(centers[best])
+
+
+def _find_quiet_points(
+    file_path: str,
+    boundaries: list[float],
+    tolerance_s: float,
+    silence_db: float = -40.0,
+    block_s: float = _BLOCK_S,
+    cancel_token: CancellationToken | None = None,
+) -> list[float]:
+    """
+    各分割位置(昇順)を、前後 tolerance_s 秒以内で最も近い低レベル区間へ移した位置を返す
+
+    ffmpeg でデコードした PCM をパイプから少しずつ読み、探索範囲のレベルだけを保持するため、
+    ファイルの長さに関係なくメモリ使用量は一定。最後の探索範囲を過ぎたらデコードを打ち切る。
+    """
+    if not boundaries:
+        return []
+
+    block_samples = int(_SAMPLE_RATE * block_s)
+    windows = [
+        (max(0, int((boundary - tolerance_s) / block_s)), int((boundary + tolerance_s) / block_s) + 1)
+        for boundary in boundaries
+    ]
+    collected: list[list[np.ndarray]] = [[] for _ in boundaries]
+    first_open = 0
+    block_offset = 0
+
+    stream = _iter_pcm(file_path, _SAMPLE_RATE, block_samples * 2 * _BLOCKS_PER_READ, cancel_token)
+    try:
+        for pcm in stream:
+            levels = _block_levels_db(pcm, block_samples)
+            block_end = block_offset + len(levels)
+            for index in range(first_open, len(windows)):
+                low, high = windows[index]
+                if low >= block_end:
+                    break
+                if high > block_offset:
+                    collected[index].append(levels[max(low - block_offset, 0): high - block_offset])
+            while first_open < len(windows) and windows[first_open][1] <= block_end:
+                first_open += 1
+            block_offset = block_end
+            if first_open == len(windows):
+                break
+    finally:
+        stream.close()
+
+    quiet_points: list[float] = []
+    for boundary, (low, _), parts in zip(boundaries, windows, collected):
+        if not parts:
+            # 探索範囲が音声の終端より後ろにある場合は元の位置のまま
+            quiet_points.append(boundary)
+            continue
+        levels_db = np.concatenate(parts)
+        quiet_points.append(_choose_quiet_point(levels_db, low * block_s, boundary, block_s, silence_db))
+    return quiet_points
@@ -0,0 +1,239 @@
+import mmap
+import os
+import struct
+import sys
+from dataclasses import dataclass
+from math import ceil
+
+from service.cancellation import CancellationToken
+from service.cut_planner import ChunkSpan
+
+# PCM・IEEE float(WAVE_FORMAT_EXTENSIBLE の場合はサブフォーマットで判定)
+_PCM_FORMAT_TAGS = frozenset({0x0001, 0x0003})
+_EXTENSIBLE_FORMAT_TAG = 0xFFFE
+_RIFF_MAX_SIZE = 0xFFFFFFFF
+# 1回のシステムコールでコピーする最大バイト数(この間隔でキャンセルを確認する)
+_COPY_SLICE_BYTES = 64 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class WavInfo:
+    """PCM WAV(RF64 を含む)の fmt チャンクと、音声データの位置"""
+
+    fmt_chunk: bytes
+    data_offset: int
+    data_size: int
+    sample_rate: int
+    block_align: int
+
+    @property
+    def total_frames(self) -> int:
+        return self.data_size // self.block_align
+
+    @property
+    def duration_s(self) -> float:
+        return self.total_frames / self.sample_rate
+
+
+def _parse_fmt(payload: bytes) -> tuple[int, int] | None:
+    """fmt チャンクから (サンプルレート, ブロックサイズ) を取り出す。PCM/float 以外は None"""
+    if len(payload) < 16:
+        return None
+    format_tag, _channels, sample_rate, _byte_rate, block_align = struct.unpack_from("<HHIIH", payload)
+    if format_tag == _EXTENSIBLE_FORMAT_TAG:
+        if len(payload) < 26:
+            return None
+        # サブフォーマット GUID の先頭2バイトが従来のフォーマットタグ
+        format_tag = struct.unpack_from("<H", payload, 24)[0]
+    if format_tag not in _PCM_FORMAT_TAGS or sample_rate <= 0 or block_align <= 0:
+        return None
+    return sample_rate, block_align
+
+
+def read_wav_info(file_path: str) -> WavInfo | None:
+    """
+    入力が ffmpeg を使わずに分割できる PCM WAV(RIFF/RF64)なら、その構造を返す
+
+    圧縮された WAV・壊れたヘッダなど、扱えない場合は None(ffmpeg で分割する)。
+    """
+    try:
+        file_size = os.path.getsize(file_path)
+        with open(file_path, "rb") as f:
+            header = f.read(12)
+            if len(header) < 12 or header[8:12] != b"WAVE" or header[:4] not in (b"RIFF", b"RF64"):
+                return None
+            rf64_data_size: int | None = None
+            fmt_chunk: bytes | None = None
+            parsed: tuple[int, int] | None = None
+            position = 12
+            while position + 8 <= file_size:
+                f.seek(position)
+                chunk_id, chunk_size = struct.unpack("<4sI", f.read(8))
+                if chunk_id == b"ds64":
+                    rf64_data_size = struct.unpack_from("<QQ", f.read(16))[1]
+                elif chunk_id == b"fmt ":
+                    payload = f.read(chunk_size)
+                    parsed = _parse_fmt(payload)
+                    fmt_chunk = payload
+                elif chunk_id == b"data":
+                    if fmt_chunk is None or parsed is None:
+                        return None
+                    data_offset = position + 8
+                    if chunk_size == _RIFF_MAX_SIZE and rf64_data_size is not None:
+                        chunk_size = rf64_data_size
+                    # 書き込み途中で終わったファイルはファイル末尾までをデータとみなす
+                    data_size = min(chunk_size, file_size - data_offset)
+                    sample_rate, block_align = parsed
+                    data_size -= data_size % block_align
+                    if data_size <= 0:
+                        return None
+                    return WavInfo(fmt_chunk, data_offset, data_size, sample_rate, block_align)
+                position += 8 + chunk_size + (chunk_size & 1)
+    except (OSError, struct.error):
+        return None
+    return None
+
+
+def _wav_header(fmt_chunk: bytes, data_size: int) -> bytes:
+    """data_size バイトの音声データを持つ WAV のヘッダ(4GB を超える場合は RF64)"""
+    fmt = b"fmt " + struct.pack("<I", len(fmt_chunk)) + fmt_chunk + b"\0" * (len(fmt_chunk) & 1)
+    padded_size = data_size + (data_size & 1)
+    riff_size = 4 + len(fmt) + 8 + padded_size
+    if riff_size <= _RIFF_MAX_SIZE:
+        return b"RIFF" + struct.pack("<I", riff_size) + b"WAVE" + fmt + b"data" + struct.pack("<I", data_size)
+
+    ds64 = b"ds64" + struct.pack("<IQQQI", 28, riff_size + 36, data_size, 0, 0)
+    return (
+        b"RF64" + struct.pack("<I", _RIFF_MAX_SIZE) + b"WAVE" + ds64 + fmt
+        + b"data" + struct.pack("<I", _RIFF_MAX_SIZE)
+    )
+
+
+def plan_wav_chunks(info: WavInfo, target_chunk_bytes: int) -> list[ChunkSpan]:
+    """
+    ヘッダを含めて各チャンクが目標バイト数を超えないよう、サンプル単位で均等に分ける
+
+    Raises:
+        RuntimeError: 目標サイズが小さすぎて1サンプルも入らない
+    """
+    header_bytes = len(_wav_header(info.fmt_chunk, min(info.data_size, target_chunk_bytes)))
+    max_frames = (target_chunk_bytes - header_bytes - 1) // info.block_align
+    if max_frames <= 0:
+        raise RuntimeError("目標チャンクサイズが小さすぎます")
+    num_chunks = ceil(info.total_frames / max_frames)
+    base_frames, extra = divmod(info.total_frames, num_chunks)
+
+    chunks: list[ChunkSpan] = []
+    start_frame = 0
+    for index in range(num_chunks):
+        frames = base_frames + (1 if index < extra else 0)
+        chunks.append((start_frame / info.sample_rate, frames / info.sample_rate))
+        start_frame += frames
+    return chunks
+
+
+def _frame_range(info: WavInfo, start_s: float, duration_s: float) -> tuple[int, int]:
+    """分割計画の (開始秒, 長さ秒) を、音声データ内のバイト範囲 (オフセット, サイズ) に戻す"""
+    start_frame = min(round(start_s * info.sample_rate), info.total_frames)
+    end_frame = min(round((start_s + duration_s) * info.sample_rate), info.total_frames)
+    return start_frame * info.block_align, (end_frame - start_frame) * info.block_align
+
+
+def _copy_range(
+    src_fd: int,
+    dst_fd: int,
+    offset: int,
+    count: int,
+    cancel_token: CancellationToken | None = None,
+) -> None:
+    """
+    入力の offset から count バイトを出力の現在位置へコピーする
+
+    copy_file_range(同じファイルシステムならカーネル内、reflink に対応していればブロックの共有)、
+    sendfile の順に試し、どちらも使えなければ入力をメモリマップして書き出す。
+    """
+    use_copy_file_range = hasattr(os, "copy_file_range")
+    use_sendfile = hasattr(os, "sendfile") and sys.platform.startswith("linux")
+    mapped: mmap.mmap | None = None
+    end = offset + count
+    try:
+        while offset < end:
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            size = min(_COPY_SLICE_BYTES, end - offset)
+            if use_copy_file_range:
+                try:
+                    copied = os.copy_file_range(src_fd, dst_fd, size, offset)
+                except OSError:
+                    use_copy_file_range = False
+                    continue
+            elif use_sendfile:
+                try:
+                    copied = os.sendfile(dst_fd, src_fd, offset, size)
+                except OSError:
+                    use_sendfile = False
+                    continue
+            else:
+                if mapped is None:
+                    mapped = mmap.mmap(src_fd, 0, access=mmap.ACCESS_READ)
+                with memoryview(mapped) as view:
+                    copied = os.write(dst_fd, view[offset:offset + size])
+            if copied == 0:
+                raise RuntimeError("入力ファイルが途中で終わっています")
+            offset += copied
+    finally:
+        if mapped is not None:
+            mapped.close()
+
+
+def write_wav_chunk(
+    file_path: str,
+    output_path: str,
+    info: WavInfo,
+    start_s: float,
+    duration_s: float,
+    cancel_token: CancellationToken | None = None,
+) -> int:
+    """
+    チャンクのヘッダを書き、入力の音声データの該当範囲をデコードせずにコピーする
+
+    Returns:
+        書き込んだ音声データのバイト数
+    """
+    offset, size = _frame_range(info, start_s, duration_s)
+    with open(file_path, "rb") as src, open(output_path, "wb", buffering=0) as dst:
+        dst.write(_wav_header(info.fmt_chunk, size))
+        _copy_range(src.fileno(), dst.fileno(), info.data_offset + offset, size, cancel_token)
+        if size & 1:
+            dst.write(b"\0")
+    return size
+
+
+def read_wav_chunk(file_path: str, info: WavInfo, start_s: float, duration_s: float) -> bytes:
+    """write_wav_chunk と同じ内容のチャンクを、ファイルに書かずにバイト列として返す"""
+    offset, size = _frame_range(info, start_s, duration_s)
+    with open(file_path, "rb") as src:
+        src.seek(info.data_offset + offset)
+        data = src.read(size)
+    if len(data) < size:
+        raise RuntimeError("入力ファイルが途中で終わっています")
+    return _wav_header(info.fmt_chunk, size) + data + b"\0" * (size & 1)
+
+
+def fix_streamed_wav(data: bytearray) -> None:
+    """
+    パイプへ書き出された WAV の RIFF・data チャンクのサイズを実際の長さに書き換える
+
+    ffmpeg はシークできない出力にはサイズを書き戻せず、仮の値(0xFFFFFFFF)のままにする。
+    4GB を超える場合と WAV でない場合は何もしない。
+    """
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE" or len(data) - 8 > _RIFF_MAX_SIZE:
+        return
+    struct.pack_into("<I", data, 4, len(data) - 8)
+    position = 12
+    while position + 8 <= len(data):
+        chunk_id, chunk_size = struct.unpack_from("<4sI", data, position)
+        if chunk_id == b"data":
+            struct.pack_into("<I", data, position + 4, len(data) - position - 8)
+            return
+        position += 8 + chunk_size + (chunk_size & 1)
@@ -1,20 +1,44 @@
+import asyncio
+import os
+from array import array
 import subprocess
+import sys
+import threading
+import time
 from math import ceil
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 
 import pytest
 
 from service.audio_splitter import (
     _calculate_chunks,
+    _estimate_output_size_mb,
+    _group_ranges,
     _get_output_filename,
+    _get_output_pattern,
     split_audio_file,
+    split_audio_file_async,
 )
+from service.cancellation import CancellationToken, SplitCancelledError
+from service.ffmpeg_capabilities import FfmpegCapabilities
 from service.ffmpeg_runner import (
     _can_stream_copy,
     _probe_audio,
+    _probe_packet_records,
+    _probe_packets,
+    _probe_stream_bitrate,
+    _read_chunk_async,
     _run_command,
+    _run_command_async,
+    _iter_command_output,
+    _progress_line_handler,
+    _run_command_streaming,
+    _segment_command,
     _split_one_chunk,
+    _split_segments_async,
 )
+from service.output_cache import OutputCache
+from service.progress_events import ChunkDone, ChunkProgress, ChunkStarted, JobDone, JobStarted
 
 
 class TestCalculateChunks:
@@ -80,6 +104,20 @@ class TestGetOutputFilename:
         assert result == "C:\\output\\audiofile_part1.m4a"
 
 
+class TestGetOutputPattern:
+    """_get_output_pattern関数のテスト"""
+
+    def test_pattern_has_sequence_placeholder(self):
+        """連番部分が %d になる"""
+        result = _get_output_pattern("/in/audio.mp3", "/out", "m4a")
+        assert result == os.path.join("/out", "audio_part%d.m4a")
+
+    def test_percent_in_name_is_escaped(self):
+        """ファイル名中の % はエスケープする"""
+        result = _get_output_pattern("/in/100%.mp3", "/out", "mp3")
+        assert os.path.basename(result) == "100%%_part%d.mp3"
+
+
 class TestCanStreamCopy:
     """_can_stream_copy関数のテスト"""
 
@@ -131,6 +169,13 @@ class TestSplitOneChunk:
         assert "-c:a" in cmd
         assert cmd[cmd.index("-c:a") + 1] == "aac"
 
+    @patch("service.ffmpeg_runner._run_command")
+    def test_reencode_sets_bitrate(self, mock_run):
+        """再エンコード時は分割計画と同じビットレートを指定する"""
+        _split_one_chunk("in.wav", "out.m4a", 0.0, 10.0, "m4a", False)
+        cmd = mock_run.call_args[0][0]
+        assert cmd[cmd.index("-b:a") + 1] == "128k"
+
     @patch("service.ffmpeg_runner._run_command")
     def test_reencode_mp3_uses_libmp3lame(self, mock_run):
         """mp3再エンコード時は libmp3lame エンコーダを使う"""
@@ -138,6 +183,13 @@ class TestSplitOneChunk:
         cmd = mock_run.call_args[0][0]
         assert cmd[cmd.index("-c:a") + 1] == "libmp3lame"
 
+    @patch("service.ffmpeg_runner._run_command")
+    def test_encoder_override(self, mock_run):
+        """encoder 指定時はそのエンコーダを使う"""
+        _split_one_chunk("in.wav", "out.m4a", 0.0, 10.0, "m4a", False, encoder="aac_at")
+        cmd = mock_run.call_args[0][0]
+        assert cmd[cmd.index("-c:a") + 1] == "aac_at"
+
     @patch("service.ffmpeg_runner._run_command")
     def test_seek_before_input(self, mock_run):
         """高速シークのため -ss は -i より前に置く"""
@@ -145,6 +197,94 @@ class TestSplitOneChunk:
         cmd = mock_run.call_args[0][0]
         assert cmd.index("-ss") < cmd.index("-i")
 
+    @patch("service.ffmpeg_runner._run_command_streaming")
+    def test_progress_reported_while_running(self, mock_run):
+        """on_progress 指定時は -progress pipe:1 の出力を解釈して逐次通知する"""
+        lines = [
+            "out_time_us=N/A", "speed=N/A", "progress=continue",
+            "out_time_us=2500000", "speed=12.5x", "progress=continue",
+            "out_time_us=10000000", "speed=13x", "progress=end",
+        ]
+        mock_run.side_effect = lambda cmd, on_line, *args: [on_line(line) for line in lines]
+        updates: list[tuple[float, float | None]] = []
+
+        _split_one_chunk("in.wav", "out.m4a", 0.0, 10.0, "m4a", False, None, lambda t, x: updates.append((t, x)))
+
+        cmd = mock_run.call_args[0][0]
+        assert cmd[cmd.index("-progress") + 1] == "pipe:1"
+        assert cmd[-1] == "out.m4a"
+        assert updates == [(2.5, 12.5), (10.0, 13.0)]
+
+
+class TestProgressLineHandler:
+    """_progress_line_handler関数のテスト"""
+
+    def test_speed_not_available(self):
+        """speed が N/A の場合は None を渡す"""
+        updates: list[tuple[float, float | None]] = []
+        on_line = _progress_line_handler(lambda t, x: updates.append((t, x)))
+        for line in ["out_time_us=1000000", "speed=N/A", "progress=continue"]:
+            assert on_line(line)
+        assert updates == [(1.0, None)]
+
+    def test_legacy_out_time_ms(self):
+        """古い ffmpeg の out_time_ms(実際はマイクロ秒)を使う"""
+        updates: list[tuple[float, float | None]] = []
+        on_line = _progress_line_handler(lambda t, x: updates.append((t, x)))
+        for line in ["out_time_ms=3000000", "speed=2x", "progress=continue"]:
+            on_line(line)
+        assert updates == [(3.0, 2.0)]
+
+    def test_other_lines_not_consumed(self):
+        """進捗以外の行は False を返す"""
+        on_line = _progress_line_handler(lambda t, x: None)
+        assert not on_line("a_part1.m4a")
+        assert not on_line("")
+
+
+class TestSplitSegments:
+    """_split_segments_async関数のテスト"""
+
+    @patch("service.ffmpeg_runner._run_command_async")
+    def test_segment_times_and_list(self, mock_run):
+        """分割位置と segment_list の出力先を指定する"""
+        asyncio.run(_split_segments_async("in.m4a", "out_part%d.m4a", [10.0, 20.0], "m4a", True, lambda name: None))
+        cmd = mock_run.call_args[0][0]
+        assert cmd[cmd.index("-f") + 1] == "segment"
+        assert cmd[cmd.index("-segment_times") + 1] == "10.000000,20.000000"
+        assert cmd[cmd.index("-segment_list") + 1] == "pipe:1"
+        assert cmd[-1] == "out_part%d.m4a"
+        assert "copy" in cmd
+
+    @patch("service.ffmpeg_runner._run_command_async")
+    def test_reencode_uses_encoder(self, mock_run):
+        """再エンコード時はエンコーダを指定する"""
+        asyncio.run(_split_segments_async("in.wav", "out_part%d.mp3", [10.0], "mp3", False, lambda name: None))
+        cmd = mock_run.call_args[0][0]
+        assert cmd[cmd.index("-c:a") + 1] == "libmp3lame"
+
+    @patch("service.ffmpeg_runner._run_command_async")
+    def test_reports_each_segment(self, mock_run):
+        """segment_list の各行をコールバックへ渡す"""
+        mock_run.side_effect = lambda cmd, on_line, *args: [on_line(x) for x in ["a_part1.m4a", "", "a_part2.m4a"]]
+        segments: list[str] = []
+        asyncio.run(_split_segments_async("in.m4a", "a_part%d.m4a", [10.0], "m4a", True, segments.append))
+        assert segments == ["a_part1.m4a", "a_part2.m4a"]
+
+    @patch("service.ffmpeg_runner._run_command_async")
+    def test_progress_mixed_with_segment_list(self, mock_run):
+        """-progress の行とセグメント一覧が同じ標準出力に流れても振り分ける"""
+        lines = ["out_time_us=5000000", "speed=20x", "progress=continue", "a_part1.m4a", "a_part2.m4a"]
+        mock_run.side_effect = lambda cmd, on_line, *args: [on_line(x) for x in lines]
+        segments: list[str] = []
+        updates: list[tuple[float, float | None]] = []
+
+        asyncio.run(_split_segments_async("in.m4a", "a_part%d.m4a", [10.0], "m4a", True, segments.append,
+                                          None, lambda t, x: updates.append((t, x))))
+
+        assert segments == ["a_part1.m4a", "a_part2.m4a"]
+        assert updates == [(5.0, 20.0)]
+
 
 class TestRunCommand:
     """_run_command関数のテスト"""
@@ -165,6 +305,125 @@ class TestRunCommand:
         assert "失敗しました" in str(exc_info.value)
 
 
+class TestRunCommandStreaming:
+    """_run_command_streaming関数のテスト"""
+
+    def test_lines_are_streamed(self):
+        """標準出力を1行ずつ受け取る"""
+        lines: list[str] = []
+        _run_command_streaming([sys.executable, "-c", "print('a'); print('b')"], lines.append)
+        assert lines == ["a", "b"]
+
+    def test_failure_includes_stderr(self):
+        """異常終了時は stderr の内容を含むエラーになる"""
+        cmd = [sys.executable, "-c", "import sys; sys.stderr.write('boom'); sys.exit(1)"]
+        with pytest.raises(RuntimeError) as exc_info:
+            _run_command_streaming(cmd, lambda line: None)
+        assert "boom" in str(exc_info.value)
+
+    @patch("service.ffmpeg_runner.subprocess.Popen", side_effect=FileNotFoundError)
+    def test_binary_not_found(self, mock_popen):
+        """実行ファイルが見つからない場合"""
+        with pytest.raises(RuntimeError) as exc_info:
+            _run_command_streaming(["ffmpeg"], lambda line: None)
+        assert "見つかりません" in str(exc_info.value)
+
+
+class TestIterCommandOutput:
+    """_iter_command_output関数のテスト"""
+
+    def test_reads_in_fixed_sizes(self):
+        """標準出力を指定サイズずつ返す"""
+        cmd = [sys.executable, "-c", "import sys; sys.stdout.buffer.write(b'x' * 10)"]
+        assert list(_iter_command_output(cmd, 4)) == [b"xxxx", b"xxxx", b"xx"]
+
+    def test_failure_raises(self):
+        """異常終了時はエラー"""
+        cmd = [sys.executable, "-c", "import sys; sys.stderr.write('bad'); sys.exit(2)"]
+        with pytest.raises(RuntimeError) as exc_info:
+            list(_iter_command_output(cmd, 4))
+        assert "bad" in str(exc_info.value)
+
+    def test_close_kills_process(self):
+        """途中で読むのをやめるとプロセスを終了させる"""
+        cmd = [sys.executable, "-c", "import sys\nwhile True: sys.stdout.buffer.write(b'x' * 4096)"]
+        stream = _iter_command_output(cmd, 16)
+        assert next(stream) == b"x" * 16
+        stream.close()
+
+
+class TestRunCommandAsync:
+    """_run_command_async関数のテスト"""
+
+    def test_lines_passed_to_callback(self):
+        """標準出力を1行ずつコールバックへ渡す"""
+        cmd = [sys.executable, "-c", "print('a'); print('b')"]
+        lines: list[str] = []
+        asyncio.run(_run_command_async(cmd, lines.append))
+        assert lines == ["a", "b"]
+
+    def test_binary_output(self):
+        """on_data 指定時は標準出力をバイナリのまま渡す"""
+        cmd = [sys.executable, "-c", "import sys; sys.stdout.buffer.write(bytes(range(256)) * 3)"]
+        blocks: list[bytes] = []
+        asyncio.run(_run_command_async(cmd, on_data=blocks.append))
+        assert b"".join(blocks) == bytes(range(256)) * 3
+
+    def test_failure_raises(self):
+        """異常終了時は stderr の末尾を含むエラー"""
+        cmd = [sys.executable, "-c", "import sys; sys.stderr.write('boom'); sys.exit(1)"]
+        with pytest.raises(RuntimeError) as exc_info:
+            asyncio.run(_run_command_async(cmd))
+        assert "boom" in str(exc_info.value)
+
+    def test_not_found(self):
+        """コマンドが存在しない場合"""
+        with pytest.raises(RuntimeError) as exc_info:
+            asyncio.run(_run_command_async(["command-that-does-not-exist"]))
+        assert "見つかりません" in str(exc_info.value)
+
+    def test_task_cancel_kills_process(self):
+        """タスクのキャンセルでプロセスを終了させる"""
+        cmd = [sys.executable, "-c", "import time; print('started', flush=True); time.sleep(30)"]
+
+        async def run() -> None:
+            started = asyncio.Event()
+            task = asyncio.ensure_future(_run_command_async(cmd, lambda line: started.set()))
+            await asyncio.wait_for(started.wait(), 10)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await asyncio.wait_for(task, 10)
+
+        asyncio.run(run())
+
+    def test_token_cancel_kills_process(self):
+        """cancel_token のキャンセルでプロセスを終了させ SplitCancelledError を送出する"""
+        cmd = [sys.executable, "-c", "import time; print('started', flush=True); time.sleep(30)"]
+        token = CancellationToken()
+        with pytest.raises(SplitCancelledError):
+            asyncio.run(asyncio.wait_for(_run_command_async(cmd, lambda line: token.cancel(), token), 10))
+
+
+class TestReadChunkAsync:
+    """_read_chunk_async関数のテスト"""
+
+    @patch("service.ffmpeg_runner._run_command_async")
+    def test_pipe_output(self, mock_run):
+        """標準出力へ書き出させ、mp4 系はフラグメント形式にする"""
+        async def fake_run(cmd, on_line, cancel_token, timing, on_data):
+            on_data(b"ab")
+            on_data(b"c")
+
+        mock_run.side_effect = fake_run
+        data = asyncio.run(_read_chunk_async("in.m4a", 5.0, 10.0, "m4a", True))
+
+        assert data == b"abc"
+        cmd = mock_run.call_args[0][0]
+        assert cmd[-1] == "pipe:1"
+        assert cmd[cmd.index("-f") + 1] == "ipod"
+        assert "empty_moov" in cmd[cmd.index("-movflags") + 1]
+
+
 class TestProbeAudio:
     """_probe_audio関数のテスト"""
 
@@ -185,6 +444,91 @@ class TestProbeAudio:
         assert "再生時間" in str(exc_info.value)
 
 
+class TestProbeStreamBitrate:
+    """_probe_stream_bitrate関数のテスト"""
+
+    @patch("service.ffmpeg_runner._run_command")
+    def test_bitrate(self, mock_run):
+        """音声ストリームのビットレートを取得できる"""
+        mock_run.return_value.stdout = "128000\n"
+        assert _probe_stream_bitrate("test.mp4") == 128000
+        assert "stream=bit_rate" in mock_run.call_args[0][0]
+
+    @patch("service.ffmpeg_runner._run_command")
+    def test_unknown_bitrate(self, mock_run):
+        """コンテナに記録されていなければ 0"""
+        mock_run.return_value.stdout = "N/A\n"
+        assert _probe_stream_bitrate("test.mkv") == 0
+
+
+class TestEstimateOutputSize:
+    """_estimate_output_size_mb関数のテスト"""
+
+    @patch("service.audio_splitter._probe_stream_bitrate")
+    def test_stream_copy_uses_stream_bitrate(self, mock_bitrate):
+        """ストリームコピーは映像などを除いた音声ストリームのビットレートから見積もる"""
+        mock_bitrate.return_value = 128_000
+        size_mb = _estimate_output_size_mb("video.mp4", 500.0, 600.0, "m4a", True)
+        assert size_mb == pytest.approx(128_000 / 8 * 600 * 1.02 / (1024 * 1024))
+
+    @patch("service.audio_splitter._probe_stream_bitrate")
+    def test_stream_copy_fallback(self, mock_bitrate):
+        """ビットレートが分からない・入力より大きい見積もりになる場合は入力のサイズ"""
+        mock_bitrate.return_value = 0
+        assert _estimate_output_size_mb("a.m4a", 50.0, 600.0, "m4a", True) == 50.0
+        mock_bitrate.return_value = 10_000_000
+        assert _estimate_output_size_mb("a.m4a", 50.0, 600.0, "m4a", True) == 50.0
+        mock_bitrate.side_effect = RuntimeError("ffprobe")
+        assert _estimate_output_size_mb("a.m4a", 50.0, 600.0, "m4a", True) == 50.0
+
+    def test_encode_uses_encoder_bitrate(self):
+        """再エンコードは出力形式のビットレートから見積もる(入力のサイズは使わない)"""
+        size_mb = _estimate_output_size_mb("rec.wav", 600.0, 3600.0, "m4a", False)
+        assert size_mb == pytest.approx(128_000 / 8 * 3600 * 1.02 / (1024 * 1024))
+
+    @patch("service.audio_splitter._split_one_chunk")
+    def test_calibration_encode(self, mock_split):
+        """ビットレートが決まっていない出力形式は、中央付近の 20 秒を試しにエンコードして求める"""
+        mock_split.side_effect = lambda src, dst, start, dur, *args: open(dst, "wb").write(b"x" * 400_000)
+        size_mb = _estimate_output_size_mb("rec.mp3", 10.0, 100.0, "wav", False)
+        assert mock_split.call_args[0][2:4] == (40.0, 20.0)
+        assert size_mb == pytest.approx(400_000 / 20 * 100 * 1.02 / (1024 * 1024))
+
+
+class TestProbePackets:
+    """_probe_packets関数のテスト"""
+
+    @patch("service.ffmpeg_runner._run_command_streaming")
+    def test_parse_packets(self, mock_run):
+        """パケットの時刻とサイズを取得し、pts が無ければ dts を使う"""
+        lines = ["0.000000,0.000000,418", "N/A,0.026122,417", "0.052245,0.052245,N/A", "bad"]
+        mock_run.side_effect = lambda cmd, on_line, *args: [on_line(x) for x in lines]
+        times, sizes = _probe_packets("test.mp3")
+        assert list(times) == [0.0, 0.026122]
+        assert list(sizes) == [418, 417]
+
+    @patch("service.ffmpeg_runner._run_command_streaming")
+    def test_no_packets(self, mock_run):
+        """パケットが取得できない場合はエラー"""
+        with pytest.raises(RuntimeError):
+            _probe_packets("test.mp3")
+
+
+class TestProbePacketRecords:
+    """_probe_packet_records関数のテスト"""
+
+    @patch("service.ffmpeg_runner._run_command_streaming")
+    def test_parse_records(self, mock_run):
+        """時刻・サイズ・位置・キーフレームフラグを取得し、位置が不明なら -1 にする"""
+        lines = ["0.000000,0.000000,418,1024,K__", "N/A,0.026122,417,N/A,__", "bad,bad,1,2,K_"]
+        mock_run.side_effect = lambda cmd, on_line, *args: [on_line(x) for x in lines]
+        times, sizes, positions, keyframes = _probe_packet_records("test.mp3")
+        assert list(times) == [0.0, 0.026122]
+        assert list(sizes) == [418, 417]
+        assert list(positions) == [1024, -1]
+        assert list(keyframes) == [1, 0]
+
+
 class TestSplitAudioFile:
     """split_audio_file関数のテスト"""
 
@@ -196,7 +540,7 @@ class TestSplitAudioFile:
         assert result == []
 
     @patch("service.audio_splitter.os.makedirs")
-    @patch("service.audio_splitter._split_one_chunk")
+    @patch("service.audio_splitter._split_one_chunk_async")
     @patch("service.audio_splitter._probe_audio")
     @patch("service.audio_splitter.os.path.getsize")
     def test_basic_split(self, mock_getsize, mock_probe, mock_split_one, mock_makedirs):
@@ -212,7 +556,7 @@ class TestSplitAudioFile:
         mock_makedirs.assert_called_once()
 
     @patch("service.audio_splitter.os.makedirs")
-    @patch("service.audio_splitter._split_one_chunk")
+    @patch("service.audio_splitter._split_one_chunk_async")
     @patch("service.audio_splitter._probe_audio")
     @patch("service.audio_splitter.os.path.getsize")
     def test_stream_copy_selected(self, mock_getsize, mock_probe, mock_split_one, mock_makedirs):
@@ -225,7 +569,7 @@ class TestSplitAudioFile:
         assert all(call.args[5] is True for call in mock_split_one.call_args_list)
 
     @patch("service.audio_splitter.os.makedirs")
-    @patch("service.audio_splitter._split_one_chunk")
+    @patch("service.audio_splitter._split_one_chunk_async")
     @patch("service.audio_splitter._probe_audio")
     @patch("service.audio_splitter.os.path.getsize")
     def test_reencode_selected(self, mock_getsize, mock_probe, mock_split_one, mock_makedirs):
@@ -237,6 +581,237 @@ class TestSplitAudioFile:
 
         assert all(call.args[5] is False for call in mock_split_one.call_args_list)
 
+    @patch("service.audio_splitter.os.makedirs")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._split_segments_async")
+    @patch("service.audio_splitter._probe_audio")
+    @patch("service.audio_splitter.os.path.getsize")
+    def test_segment_mode(self, mock_getsize, mock_probe, mock_segments, mock_split_one, mock_makedirs):
+        """segment モードでは ffmpeg を1回だけ起動し、出力済みセグメントを返す"""
+        mock_getsize.return_value = 50 * 1024 * 1024  # 3チャンク
+        mock_probe.return_value = (90.0, "aac")
+
+        def fake_segments(file_path, pattern, times, fmt, copy, on_segment, *args):
+            for i in range(len(times) + 1):
+                on_segment(f"test_part{i + 1}.m4a")
+        mock_segments.side_effect = fake_segments
+
+        messages: list[str] = []
+        result = split_audio_file(
+            "test.m4a", "output", target_chunk_size_mb=24.5, output_format="m4a",
+            progress_callback=messages.append, split_mode="segment",
+        )
+
+        mock_segments.assert_called_once()
+        mock_split_one.assert_not_called()
+        assert mock_segments.call_args[0][2] == [30.0, 60.0]
+        assert result == [os.path.join("output", f"test_part{i}.m4a") for i in (1, 2, 3)]
+        assert any("チャンク 3/3" in msg for msg in messages)
+
+    @patch("service.audio_splitter.os.makedirs")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_packets")
+    @patch("service.audio_splitter._probe_audio")
+    @patch("service.audio_splitter.os.path.getsize")
+    def test_byte_accurate_uses_packets(
+        self, mock_getsize, mock_probe, mock_packets, mock_split_one, mock_makedirs
+    ):
+        """byte_accurate 指定時はパケット情報から分割位置を決める"""
+        mock_getsize.return_value = 3 * 1024 * 1024
+        mock_probe.return_value = (30.0, "mp3")
+        mock_packets.return_value = (array("d", [0.0, 10.0, 20.0]), array("q", [1024 * 1024] * 3))
+
+        result = split_audio_file("test.mp3", "output", target_chunk_size_mb=2.5,
+                                  output_format="mp3", byte_accurate=True)
+
+        assert len(result) == 2
+        starts = sorted(call.args[2] for call in mock_split_one.call_args_list)
+        assert starts == [0.0, 20.0]
+
+    @patch("service.audio_splitter.os.makedirs")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_packets")
+    @patch("service.audio_splitter._probe_audio")
+    @patch("service.audio_splitter.os.path.getsize")
+    def test_byte_accurate_ignored_when_reencoding(
+        self, mock_getsize, mock_probe, mock_packets, mock_split_one, mock_makedirs
+    ):
+        """再エンコード時はパケット情報を使わない"""
+        mock_getsize.return_value = 50 * 1024 * 1024
+        mock_probe.return_value = (100.0, "pcm_s16le")
+
+        split_audio_file("test.wav", "output", target_chunk_size_mb=24.5, byte_accurate=True)
+
+        mock_packets.assert_not_called()
+
+    @patch("service.audio_splitter.os.makedirs")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    @patch("service.audio_splitter.os.path.getsize")
+    def test_probe_cache_consulted(self, mock_getsize, mock_probe, mock_split_one, mock_makedirs):
+        """プローブキャッシュがあれば ffprobe を実行しない"""
+        mock_getsize.return_value = 50 * 1024 * 1024
+        cache = Mock()
+        cache.get_or_probe.side_effect = lambda path, kind, probe: {"audio": [100.0, "aac"], "audio_bitrate": 0}[kind]
+
+        result = split_audio_file("test.m4a", "output", target_chunk_size_mb=24.5, probe_cache=cache)
+
+        assert len(result) == 3
+        mock_probe.assert_not_called()
+        assert [c[0][:2] for c in cache.get_or_probe.call_args_list] == [
+            ("test.m4a", "audio"), ("test.m4a", "audio_bitrate"),
+        ]
+
+    @patch("service.audio_splitter.os.makedirs")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._find_quiet_points")
+    @patch("service.audio_splitter._probe_audio")
+    @patch("service.audio_splitter.os.path.getsize")
+    def test_snap_to_silence(self, mock_getsize, mock_probe, mock_quiet, mock_split_one, mock_makedirs):
+        """snap_to_silence 指定時は無音区間へ移した位置で分割する"""
+        mock_getsize.return_value = 100 * 1024 * 1024
+        mock_probe.return_value = (1000.0, "aac")
+        mock_quiet.side_effect = lambda path, boundaries, tolerance, **kwargs: [b + 1.5 for b in boundaries]
+
+        result = split_audio_file("test.m4a", "output", target_chunk_size_mb=25.0,
+                                  snap_to_silence=True, silence_tolerance_s=5.0)
+
+        assert len(result) == 5
+        starts = sorted(call.args[2] for call in mock_split_one.call_args_list)
+        assert starts == [0.0, 201.5, 401.5, 601.5, 801.5]
+
+    @patch("service.audio_splitter.os.makedirs")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    @patch("service.audio_splitter.os.path.getsize")
+    def test_adaptive_workers(self, mock_getsize, mock_probe, mock_split_one, mock_makedirs):
+        """adaptive_workers 指定時もすべてのチャンクを出力する"""
+        mock_getsize.return_value = 100 * 1024 * 1024
+        mock_probe.return_value = (100.0, "aac")
+
+        messages: list[str] = []
+        result = split_audio_file("test.m4a", "output", target_chunk_size_mb=10.0,
+                                  progress_callback=messages.append,
+                                  adaptive_workers=True, min_workers=1, max_workers=4)
+
+        assert len(result) == 10
+        assert all(result)
+        assert mock_split_one.call_count == 10
+        assert any("自動 1〜4" in msg for msg in messages)
+
+    @patch("service.audio_splitter.os.makedirs")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    @patch("service.audio_splitter.os.path.getsize")
+    def test_adaptive_workers_stops_after_failure(self, mock_getsize, mock_probe, mock_split_one, mock_makedirs):
+        """自動調整時にチャンクが失敗したら残りは投入しない"""
+        mock_getsize.return_value = 100 * 1024 * 1024
+        mock_probe.return_value = (100.0, "aac")
+        mock_split_one.side_effect = RuntimeError("ffmpeg の実行に失敗しました")
+
+        with pytest.raises(RuntimeError):
+            split_audio_file("test.m4a", "output", target_chunk_size_mb=10.0,
+                             adaptive_workers=True, min_workers=1, max_workers=1)
+
+        assert mock_split_one.call_count < 10
+
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    def test_resume_regenerates_missing_chunks(self, mock_probe, mock_split_one, tmp_path):
+        """resume 指定時は再実行で欠けたチャンクだけを作り直す"""
+        audio = tmp_path / "rec.m4a"
+        audio.write_bytes(b"a" * (3 * 1024 * 1024))
+        out = tmp_path / "out"
+        mock_probe.return_value = (90.0, "aac")
+        mock_split_one.side_effect = lambda src, dst, *args: open(dst, "wb").write(b"chunk")
+
+        first = split_audio_file(str(audio), str(out), target_chunk_size_mb=1.0, resume=True)
+        assert mock_split_one.call_count == 3
+        assert (out / "rec_manifest.json").exists()
+
+        os.remove(first[1])
+        mock_split_one.reset_mock()
+        mock_probe.reset_mock()
+        messages: list[str] = []
+        second = split_audio_file(str(audio), str(out), target_chunk_size_mb=1.0, resume=True,
+                                  progress_callback=messages.append)
+
+        assert second == first
+        mock_probe.assert_not_called()
+        assert [call.args[1] for call in mock_split_one.call_args_list] == [first[1]]
+        assert any("完了済み: 2/3" in msg for msg in messages)
+
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    def test_resume_replans_when_params_change(self, mock_probe, mock_split_one, tmp_path):
+        """分割条件が変わった場合は最初からやり直す"""
+        audio = tmp_path / "rec.m4a"
+        audio.write_bytes(b"a" * (3 * 1024 * 1024))
+        mock_probe.return_value = (90.0, "aac")
+        mock_split_one.side_effect = lambda src, dst, *args: open(dst, "wb").write(b"chunk")
+
+        split_audio_file(str(audio), str(tmp_path / "out"), target_chunk_size_mb=1.0, resume=True)
+        mock_split_one.reset_mock()
+        result = split_audio_file(str(audio), str(tmp_path / "out"), target_chunk_size_mb=2.0, resume=True)
+
+        assert len(result) == 2
+        assert mock_split_one.call_count == 2
+
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    def test_cancel_removes_partial_outputs(self, mock_probe, mock_split_one, tmp_path):
+        """キャンセル時は残りのチャンクを実行せず、書きかけを含む出力を削除する"""
+        audio = tmp_path / "rec.m4a"
+        audio.write_bytes(b"a" * (3 * 1024 * 1024))
+        out = tmp_path / "out"
+        mock_probe.return_value = (90.0, "aac")
+        token = CancellationToken()
+
+        def fake_split(src, dst, start_s, duration_s, fmt, copy, cancel_token, *args):
+            open(dst, "wb").write(b"partial")
+            if start_s > 0:
+                cancel_token.cancel()
+                cancel_token.raise_if_cancelled()
+
+        mock_split_one.side_effect = fake_split
+
+        with pytest.raises(SplitCancelledError):
+            split_audio_file(str(audio), str(out), target_chunk_size_mb=1.0,
+                             max_workers=1, cancel_token=token)
+
+        assert mock_split_one.call_count == 2
+        assert list(out.iterdir()) == []
+
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    def test_cancel_keeps_completed_chunks_when_resumable(self, mock_probe, mock_split_one, tmp_path):
+        """resume 指定時は完了済みのチャンクを残し、再実行で続きから分割できる"""
+        audio = tmp_path / "rec.m4a"
+        audio.write_bytes(b"a" * (3 * 1024 * 1024))
+        out = tmp_path / "out"
+        mock_probe.return_value = (90.0, "aac")
+        token = CancellationToken()
+
+        def fake_split(src, dst, start_s, duration_s, fmt, copy, cancel_token, *args):
+            open(dst, "wb").write(b"chunk")
+            if start_s > 0:
+                cancel_token.cancel()
+                cancel_token.raise_if_cancelled()
+
+        mock_split_one.side_effect = fake_split
+        with pytest.raises(SplitCancelledError):
+            split_audio_file(str(audio), str(out), target_chunk_size_mb=1.0,
+                             max_workers=1, resume=True, cancel_token=token)
+
+        assert sorted(p.name for p in out.iterdir()) == ["rec_manifest.json", "rec_part1.m4a"]
+
+        mock_split_one.reset_mock()
+        mock_split_one.side_effect = lambda src, dst, *args: open(dst, "wb").write(b"chunk")
+        result = split_audio_file(str(audio), str(out), target_chunk_size_mb=1.0, resume=True)
+
+        assert len(result) == 3
+        assert mock_split_one.call_count == 2
+
     @patch("service.audio_splitter.os.path.getsize", side_effect=FileNotFoundError)
     def test_input_file_not_found(self, mock_getsize):
         """入力ファイルが存在しない場合"""
@@ -254,7 +829,7 @@ class TestSplitAudioFile:
         assert "ffprobe失敗" in str(exc_info.value)
 
     @patch("service.audio_splitter.os.makedirs")
-    @patch("service.audio_splitter._split_one_chunk")
+    @patch("service.audio_splitter._split_one_chunk_async")
     @patch("service.audio_splitter._probe_audio")
     @patch("service.audio_splitter.os.path.getsize")
     def test_progress_callback(self, mock_getsize, mock_probe, mock_split_one, mock_makedirs):
@@ -274,6 +849,26 @@ class TestSplitAudioFile:
         assert any("ファイル:" in msg for msg in messages)
         assert any("完了" in msg for msg in messages)
 
+    @patch("service.audio_splitter.os.makedirs")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    @patch("service.audio_splitter.os.path.getsize")
+    def test_realtime_progress(self, mock_getsize, mock_probe, mock_split_one, mock_makedirs):
+        """分割中の ffmpeg の進捗から全体の進捗率を通知する"""
+        mock_getsize.return_value = 40 * 1024 * 1024
+        mock_probe.return_value = (100.0, "aac")
+
+        def fake_split(src, dst, start_s, duration_s, fmt, copy, cancel_token, on_progress, *args):
+            on_progress(duration_s / 2, 4.0)
+
+        mock_split_one.side_effect = fake_split
+
+        messages: list[str] = []
+        split_audio_file("test.m4a", "output", target_chunk_size_mb=24.5,
+                         progress_callback=messages.append, max_workers=1)
+
+        assert any(msg.startswith("進捗: 25.0%") and "速度: 4.00x" in msg for msg in messages)
+
     @patch("service.audio_splitter.os.path.getsize")
     def test_no_split_with_callback(self, mock_getsize):
         """分割不要な場合のコールバック"""
@@ -288,3 +883,514 @@ class TestSplitAudioFile:
 
         assert result == []
         assert any("分割は不要" in msg for msg in messages)
+
+
+class TestSplitAudioFileReport:
+    """split_audio_file のパフォーマンスレポートのテスト"""
+
+    @patch("service.audio_splitter.log_job_report")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    def test_report_returned_and_logged(self, mock_probe, mock_split_one, mock_log, tmp_path):
+        """出力パスと一緒にレポートを返し、ログにも出力する"""
+        audio = tmp_path / "rec.m4a"
+        audio.write_bytes(b"a" * (3 * 1024 * 1024))
+        mock_probe.return_value = (90.0, "aac")
+        mock_split_one.side_effect = lambda src, dst, *args: open(dst, "wb").write(b"x" * 1000)
+
+        result = split_audio_file(str(audio), str(tmp_path / "out"), target_chunk_size_mb=1.0, max_workers=2)
+
+        report = result.report
+        assert report is not None
+        assert report.strategy == "copy"
+        assert report.chunk_count == 3
+        assert report.max_parallelism == 2
+        assert report.duration_s == 90.0
+        assert report.bytes_read == 3 * 1024 * 1024
+        assert report.bytes_written == 3000
+        assert sorted(p.index for p in report.processes if p.index is not None) == [0, 1, 2]
+        assert len(report.processes) == 3
+        assert report.total_s >= report.split_s > 0
+        mock_log.assert_called_once()
+        assert mock_log.call_args[0][0]["chunk_count"] == 3
+
+    @patch("service.audio_splitter.os.path.getsize")
+    def test_no_report_without_split(self, mock_getsize):
+        """分割不要な場合はレポートを作らない"""
+        mock_getsize.return_value = 10 * 1024 * 1024
+        result = split_audio_file("test.mp3", "output", target_chunk_size_mb=24.5)
+        assert result == []
+        assert result.report is None
+
+
+def _write_fake_chunk(dst: str, duration_s: float, bytes_per_s: int) -> None:
+    """先頭行に長さを書いたダミーのチャンク(サイズは長さ × bytes_per_s)"""
+    with open(dst, "wb") as f:
+        f.write(f"{duration_s:.6f}\n".encode().ljust(int(duration_s * bytes_per_s), b"x"))
+
+
+def _probe_fake_chunk(path: str) -> tuple[float, str]:
+    with open(path, "rb") as f:
+        return float(f.readline()), "aac"
+
+
+class TestSplitAudioFileVerify:
+    """split_audio_file の verify 引数のテスト"""
+
+    @patch("service.chunk_verifier._probe_audio", side_effect=_probe_fake_chunk)
+    @patch("service.audio_splitter.log_job_report")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    def test_resplit_oversized_chunk(self, mock_probe, mock_split_one, mock_log, mock_chunk_probe, tmp_path):
+        """目標サイズを超えたチャンクだけを分け直し、後ろのチャンクの番号を繰り下げる"""
+        audio = tmp_path / "rec.m4a"
+        audio.write_bytes(b"a" * (2 * 1024 * 1024))
+        mock_probe.return_value = (60.0, "aac")
+
+        # 前半は高ビットレート(30 秒で約 1.5MB)、後半は低ビットレート
+        def fake_split(src, dst, start, dur, *args):
+            _write_fake_chunk(dst, dur, 50_000 if start < 30.0 else 20_000)
+
+        mock_split_one.side_effect = fake_split
+        out = tmp_path / "out"
+
+        result = split_audio_file(
+            str(audio), str(out), target_chunk_size_mb=1.0, max_workers=2, verify=True,
+        )
+
+        assert [os.path.basename(path) for path in result] == ["rec_part1.m4a", "rec_part2.m4a", "rec_part3.m4a"]
+        assert sorted(os.listdir(out)) == ["rec_part1.m4a", "rec_part2.m4a", "rec_part3.m4a"]
+        assert [_probe_fake_chunk(path)[0] for path in result] == [15.0, 15.0, 30.0]
+        assert all(os.path.getsize(path) <= 1024 * 1024 for path in result)
+        # 後半のチャンクは作り直さず、名前の変更だけで part3 になる
+        starts = [call.args[2] for call in mock_split_one.call_args_list]
+        assert sorted(starts) == [0.0, 0.0, 15.0, 30.0]
+        report = result.report
+        assert report is not None
+        assert (report.resplit_chunks, report.redone_chunks, report.chunk_count) == (1, 0, 3)
+        assert report.verify_s > 0
+
+    @patch("service.chunk_verifier._probe_audio", side_effect=_probe_fake_chunk)
+    @patch("service.audio_splitter.log_job_report")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    def test_redo_truncated_chunk(self, mock_probe, mock_split_one, mock_log, mock_chunk_probe, tmp_path):
+        """途中で切れたチャンクは同じ区間で作り直す"""
+        audio = tmp_path / "rec.m4a"
+        audio.write_bytes(b"a" * (2 * 1024 * 1024))
+        mock_probe.return_value = (60.0, "aac")
+        calls = []
+
+        def fake_split(src, dst, start, dur, *args):
+            calls.append(start)
+            truncated = start == 30.0 and calls.count(start) == 1
+            _write_fake_chunk(dst, dur / 3 if truncated else dur, 10_000)
+
+        mock_split_one.side_effect = fake_split
+
+        result = split_audio_file(str(audio), str(tmp_path / "out"), target_chunk_size_mb=1.0, verify=True)
+
+        assert sorted(calls) == [0.0, 30.0, 30.0]
+        assert _probe_fake_chunk(result[1])[0] == 30.0
+        assert result.report is not None
+        assert result.report.redone_chunks == 1
+
+    @patch("service.chunk_verifier._probe_audio", side_effect=_probe_fake_chunk)
+    @patch("service.audio_splitter.log_job_report")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    def test_persistently_truncated_chunk(self, mock_probe, mock_split_one, mock_log, mock_chunk_probe, tmp_path):
+        """作り直しても長さが一致しなければエラー"""
+        audio = tmp_path / "rec.m4a"
+        audio.write_bytes(b"a" * (2 * 1024 * 1024))
+        mock_probe.return_value = (60.0, "aac")
+        mock_split_one.side_effect = lambda src, dst, start, dur, *args: _write_fake_chunk(dst, dur / 2, 10_000)
+
+        with pytest.raises(RuntimeError, match="長さが計画と一致しません"):
+            split_audio_file(str(audio), str(tmp_path / "out"), target_chunk_size_mb=1.0, verify=True)
+
+
+class TestSplitAudioFileConsumer:
+    """split_audio_file の consumer 引数のテスト"""
+
+    @patch("service.audio_splitter._probe_stream_bitrate", return_value=0)
+    @patch("service.audio_splitter.log_job_report")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    def test_consumer_overlaps_with_backpressure(self, mock_probe, mock_split_one, mock_log, mock_bitrate, tmp_path):
+        """後段の処理は分割と並行して始まり、追いつかない間は次のチャンクを開始しない"""
+        audio = tmp_path / "rec.m4a"
+        audio.write_bytes(b"a" * (4 * 1024 * 1024))
+        mock_probe.return_value = (80.0, "aac")
+        timeline = []
+        lock = threading.Lock()
+
+        async def fake_split(src, dst, start, dur, *args):
+            with lock:
+                timeline.append(("split", int(start // 20)))
+            open(dst, "wb").write(b"x")
+
+        def slow_consumer(index, path):
+            time.sleep(0.02)
+            with lock:
+                timeline.append(("consumed", index))
+            return os.path.basename(path)
+
+        mock_split_one.side_effect = fake_split
+
+        result = split_audio_file(
+            str(audio), str(tmp_path / "out"), target_chunk_size_mb=1.0, max_workers=1,
+            consumer=slow_consumer, consumer_order="index", max_pending_chunks=1,
+        )
+
+        assert result.consumer_results == [f"rec_part{i}.m4a" for i in range(1, 5)]
+        # 上限1のため、前のチャンクの後段の処理が終わるまで次のチャンクは開始しない
+        assert timeline == [entry for i in range(4) for entry in (("split", i), ("consumed", i))]
+        assert result.report is not None
+        assert 0 < result.report.first_result_s < result.report.total_s
+
+    @patch("service.audio_splitter._probe_stream_bitrate", return_value=0)
+    @patch("service.audio_splitter.log_job_report")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    def test_consumer_failure(self, mock_probe, mock_split_one, mock_log, mock_bitrate, tmp_path):
+        """後段の処理の失敗は RuntimeError として呼び出し側へ送出する"""
+        audio = tmp_path / "rec.m4a"
+        audio.write_bytes(b"a" * (2 * 1024 * 1024))
+        mock_probe.return_value = (60.0, "aac")
+        mock_split_one.side_effect = lambda src, dst, *args: open(dst, "wb").write(b"x")
+
+        def failing_consumer(index, path):
+            raise ConnectionError("upload failed")
+
+        with pytest.raises(RuntimeError, match="後処理に失敗しました"):
+            split_audio_file(
+                str(audio), str(tmp_path / "out"), target_chunk_size_mb=1.0, consumer=failing_consumer,
+            )
+
+    @patch("service.chunk_verifier._probe_audio", side_effect=_probe_fake_chunk)
+    @patch("service.audio_splitter._probe_stream_bitrate", return_value=0)
+    @patch("service.audio_splitter.log_job_report")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    def test_index_order_with_resplit_chunks(
+        self, mock_probe, mock_split_one, mock_log, mock_bitrate, mock_chunk_probe, tmp_path,
+    ):
+        """検証で分け直して増えたチャンクも、チャンク番号の順に全て後段へ渡す"""
+        audio = tmp_path / "rec.m4a"
+        audio.write_bytes(b"a" * (3 * 1024 * 1024))
+        mock_probe.return_value = (90.0, "aac")
+        # 30 秒で約 1.5MB のため、計画した3チャンクがいずれも目標サイズを超える
+        mock_split_one.side_effect = lambda src, dst, start, dur, *args: _write_fake_chunk(dst, dur, 50_000)
+        consumed = []
+
+        result = split_audio_file(
+            str(audio), str(tmp_path / "out"), target_chunk_size_mb=1.0, verify=True,
+            consumer=lambda index, path: consumed.append(index) or index, consumer_order="index",
+        )
+
+        assert len(result) == 6
+        assert consumed == list(range(6))
+        assert result.consumer_results == list(range(6))
+
+
+class TestSplitAudioFileOutputCache:
+    """split_audio_file の output_cache 引数のテスト"""
+
+    @patch("service.audio_splitter._probe_stream_bitrate", return_value=0)
+    @patch("service.audio_splitter.log_job_report")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    def test_same_content_from_other_path(self, mock_probe, mock_split_one, mock_log, mock_bitrate, tmp_path):
+        """別のパスから同じ内容・条件で分割すると ffmpeg を実行せずキャッシュから出力する"""
+        data = os.urandom(3 * 1024 * 1024)
+        first = tmp_path / "in1" / "rec.m4a"
+        second = tmp_path / "in2" / "again.m4a"
+        for path in (first, second):
+            path.parent.mkdir()
+            path.write_bytes(data)
+        mock_probe.return_value = (60.0, "aac")
+        mock_split_one.side_effect = lambda src, dst, start, *args: open(dst, "wb").write(f"{start}".encode())
+        cache = OutputCache(str(tmp_path / "cache"))
+
+        original = split_audio_file(str(first), str(tmp_path / "out1"), target_chunk_size_mb=1.0, output_cache=cache)
+        calls = mock_split_one.call_count
+        consumed = []
+        cached = split_audio_file(
+            str(second), str(tmp_path / "out2"), target_chunk_size_mb=1.0, output_cache=cache,
+            consumer=lambda index, path: consumed.append(index) or index,
+        )
+
+        assert mock_split_one.call_count == calls
+        assert cached == [str(tmp_path / "out2" / f"again_part{i}.m4a") for i in range(1, len(original) + 1)]
+        assert [open(path, "rb").read() for path in cached] == [open(path, "rb").read() for path in original]
+        assert cached.report is not None
+        assert cached.report.strategy == "cache"
+        assert cached.consumer_results == list(range(len(original)))
+
+        split_audio_file(str(second), str(tmp_path / "out3"), target_chunk_size_mb=0.5, output_cache=cache)
+        assert mock_split_one.call_count > calls
+
+
+class TestSplitAudioFileEvents:
+    """split_audio_file の event_callback 引数のテスト"""
+
+    @patch("service.audio_splitter.log_job_report")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    def test_event_sequence(self, mock_probe, mock_split_one, mock_log, tmp_path):
+        """JobStarted → 各チャンクの ChunkStarted/ChunkProgress/ChunkDone → JobDone の順に届く"""
+        audio = tmp_path / "rec.m4a"
+        audio.write_bytes(b"a" * (2 * 1024 * 1024))
+        mock_probe.return_value = (60.0, "aac")
+
+        def fake_split(src, dst, start, dur, fmt, copy, cancel_token, on_progress, *args):
+            on_progress(dur / 2, 2.0)
+            open(dst, "wb").write(b"x")
+
+        mock_split_one.side_effect = fake_split
+        events = []
+        messages = []
+
+        result = split_audio_file(
+            str(audio), str(tmp_path / "out"), target_chunk_size_mb=1.0, max_workers=1,
+            progress_callback=messages.append, event_callback=events.append,
+        )
+
+        assert events[0] == JobStarted(str(audio), 2, 60.0, True)
+        assert isinstance(events[-1], JobDone)
+        assert events[-1].output_count == 2
+        chunk_events = [type(event) for event in events[1:-1]]
+        assert chunk_events == [ChunkStarted, ChunkProgress, ChunkDone] * 2
+        done = [event for event in events if isinstance(event, ChunkDone)]
+        assert [(event.output_path, event.completed, event.total) for event in done] == [
+            (result[0], 1, 2), (result[1], 2, 2),
+        ]
+        # 進捗はイベントで受け取るため、テキストの進捗は送らない
+        assert not any(message.startswith("進捗:") for message in messages)
+
+    @patch("service.audio_splitter.log_job_report")
+    @patch("service.audio_splitter._split_segments_async")
+    @patch("service.audio_splitter._probe_audio")
+    def test_segment_mode_events(self, mock_probe, mock_segments, mock_log, tmp_path):
+        """segment モードでもチャンクごとに ChunkStarted/ChunkDone が届く"""
+        audio = tmp_path / "rec.m4a"
+        audio.write_bytes(b"a" * (2 * 1024 * 1024))
+        mock_probe.return_value = (60.0, "aac")
+
+        def fake_segments(src, pattern, starts, fmt, copy, on_segment, *args):
+            for i in range(len(starts) + 1):
+                on_segment(f"rec_part{i + 1}.m4a")
+
+        mock_segments.side_effect = fake_segments
+        events = []
+
+        split_audio_file(
+            str(audio), str(tmp_path / "out"), target_chunk_size_mb=1.0, split_mode="segment",
+            event_callback=events.append,
+        )
+
+        kinds = [type(event) for event in events]
+        assert kinds == [JobStarted, ChunkStarted, ChunkDone, ChunkStarted, ChunkDone, JobDone]
+        assert [event.index for event in events if isinstance(event, ChunkStarted)] == [0, 1]
+
+
+class TestGroupRanges:
+    """_group_ranges関数のテスト"""
+
+    def test_even_ranges(self):
+        assert _group_ranges(8, 4) == [(0, 2), (2, 4), (4, 6), (6, 8)]
+
+    def test_uneven_ranges(self):
+        """割り切れない分は先頭の範囲に1つずつ配る"""
+        assert _group_ranges(10, 4) == [(0, 3), (3, 6), (6, 8), (8, 10)]
+
+    def test_fewer_chunks_than_workers(self):
+        assert _group_ranges(2, 8) == [(0, 1), (1, 2)]
+
+
+class TestSegmentCommandRange:
+    """_segment_command の範囲指定のテスト"""
+
+    def test_range_arguments(self):
+        """範囲の先頭へシークし、範囲の長さだけ読み、連番を start_number から始める"""
+        cmd = _segment_command(
+            "in.mp3", "out_part%d.mp3", [10.0, 20.0], "mp3", True, False,
+            start_s=100.0, duration_s=30.0, start_number=5,
+        )
+
+        assert cmd[cmd.index("-ss") + 1] == "100.000000"
+        assert cmd.index("-ss") < cmd.index("-i")
+        assert cmd[cmd.index("-t") + 1] == "30.000000"
+        assert cmd[cmd.index("-segment_times") + 1] == "10.000000,20.000000"
+        assert cmd[cmd.index("-segment_start_number") + 1] == "5"
+
+    def test_whole_input_by_default(self):
+        cmd = _segment_command("in.mp3", "out_part%d.mp3", [10.0], "mp3", True, False)
+
+        assert "-ss" not in cmd
+        assert "-t" not in cmd
+
+
+class TestSplitAudioFileRanges:
+    """split_mode="ranges" のテスト"""
+
+    @patch("service.audio_splitter.log_job_report")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._split_segments_async")
+    @patch("service.audio_splitter._probe_audio")
+    def test_one_process_per_range(self, mock_probe, mock_segments, mock_split_one, mock_log, tmp_path):
+        """チャンク数に関係なく ffmpeg は範囲の数だけ起動し、各範囲の全チャンクを出力する"""
+        audio = tmp_path / "rec.m4a"
+        audio.write_bytes(b"a" * (10 * 1024 * 1024))
+        mock_probe.return_value = (100.0, "aac")
+
+        def fake_segments(src, pattern, times, fmt, copy, on_segment, *args, start_number=1, **kwargs):
+            for i in range(len(times) + 1):
+                on_segment(pattern.replace("%d", str(start_number + i)))
+
+        mock_segments.side_effect = fake_segments
+        messages: list[str] = []
+
+        result = split_audio_file(
+            str(audio), str(tmp_path / "out"), target_chunk_size_mb=1.0, split_mode="ranges", max_workers=4,
+            progress_callback=messages.append,
+        )
+
+        mock_split_one.assert_not_called()
+        assert mock_segments.call_count == 4
+        calls = sorted(mock_segments.call_args_list, key=lambda call: call.kwargs["start_s"])
+        assert [call.kwargs["start_number"] for call in calls] == [1, 4, 7, 9]
+        assert [call.kwargs["start_s"] for call in calls] == [0.0, 30.0, 60.0, 80.0]
+        assert [call.kwargs["duration_s"] for call in calls] == [30.0, 30.0, 20.0, 20.0]
+        # segment_times は範囲の先頭からの相対位置
+        assert calls[1].args[2] == [10.0, 20.0]
+        assert result == [os.path.join(str(tmp_path / "out"), f"rec_part{i}.m4a") for i in range(1, 11)]
+        assert result.report is not None
+        assert result.report.max_parallelism == 4
+        assert any("チャンク 10/10" in msg for msg in messages)
+
+    @patch("service.audio_splitter.log_job_report")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._split_segments_async")
+    @patch("service.audio_splitter._probe_audio")
+    def test_single_chunk_range_uses_chunk_command(
+        self, mock_probe, mock_segments, mock_split_one, mock_log, tmp_path,
+    ):
+        """1チャンクだけの範囲は segment マルチプレクサを使わずに切り出す"""
+        audio = tmp_path / "rec.m4a"
+        audio.write_bytes(b"a" * (3 * 1024 * 1024))
+        mock_probe.return_value = (90.0, "aac")
+
+        result = split_audio_file(
+            str(audio), str(tmp_path / "out"), target_chunk_size_mb=1.0, split_mode="ranges", max_workers=8,
+        )
+
+        mock_segments.assert_not_called()
+        assert mock_split_one.call_count == 3
+        assert len(result) == 3
+
+
+class TestSplitAudioFileCapabilities:
+    """split_audio_file の capabilities 引数のテスト"""
+
+    @patch("service.audio_splitter.os.makedirs")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    @patch("service.audio_splitter.os.path.getsize")
+    def test_uses_fastest_encoder(self, mock_getsize, mock_probe, mock_split_one, mock_makedirs):
+        """再エンコード時はビルドに含まれる最速のエンコーダを使う"""
+        mock_getsize.return_value = 50 * 1024 * 1024
+        mock_probe.return_value = (100.0, "pcm_s16le")
+        capabilities = FfmpegCapabilities("ffmpeg", "6.1", frozenset({"aac", "libfdk_aac"}), frozenset({"ipod"}))
+
+        split_audio_file("test.wav", "output", target_chunk_size_mb=24.5, capabilities=capabilities)
+
+        assert all(call.args[8] == "libfdk_aac" for call in mock_split_one.call_args_list)
+
+    @patch("service.audio_splitter.os.path.getsize")
+    def test_unsupported_format_fails_fast(self, mock_getsize):
+        """出力形式に対応していない場合は何もせずにエラー"""
+        capabilities = FfmpegCapabilities("ffmpeg", "6.1", frozenset({"aac"}), frozenset({"mp3"}))
+
+        with pytest.raises(RuntimeError):
+            split_audio_file("test.wav", "output", capabilities=capabilities)
+
+        mock_getsize.assert_not_called()
+
+
+class TestSplitAudioFileAsync:
+    """split_audio_file_async関数のテスト"""
+
+    @patch("service.audio_splitter.os.makedirs")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    @patch("service.audio_splitter.os.path.getsize")
+    def test_concurrency_limited_by_semaphore(self, mock_getsize, mock_probe, mock_split_one, mock_makedirs):
+        """同時に実行する ffmpeg の数を max_workers までに制限する"""
+        mock_getsize.return_value = 100 * 1024 * 1024
+        mock_probe.return_value = (100.0, "aac")
+        running = 0
+        peak = 0
+
+        async def fake_split(*args):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        mock_split_one.side_effect = fake_split
+
+        result = asyncio.run(split_audio_file_async("test.m4a", "output", target_chunk_size_mb=10.0, max_workers=3))
+
+        assert len(result) == 10
+        assert mock_split_one.call_count == 10
+        assert peak == 3
+
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    def test_task_cancel_removes_outputs(self, mock_probe, mock_split_one, tmp_path):
+        """タスクをキャンセルすると実行中のチャンクを止め、出力を削除する"""
+        audio = tmp_path / "rec.m4a"
+        audio.write_bytes(b"a" * (3 * 1024 * 1024))
+        out = tmp_path / "out"
+        mock_probe.return_value = (90.0, "aac")
+
+        async def run() -> None:
+            started = asyncio.Event()
+
+            async def fake_split(src, dst, *args):
+                open(dst, "wb").write(b"partial")
+                started.set()
+                await asyncio.sleep(30)
+
+            mock_split_one.side_effect = fake_split
+            task = asyncio.ensure_future(split_audio_file_async(str(audio), str(out), target_chunk_size_mb=1.0))
+            await asyncio.wait_for(started.wait(), 10)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+
+        assert list(out.iterdir()) == []
+
+    @patch("service.audio_splitter.os.makedirs")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    @patch("service.audio_splitter.os.path.getsize")
+    def test_progress_on_event_loop_thread(self, mock_getsize, mock_probe, mock_split_one, mock_makedirs):
+        """解析を別スレッドで行っても進捗コールバックはイベントループのスレッドで呼ばれる"""
+        mock_getsize.return_value = 50 * 1024 * 1024
+        mock_probe.return_value = (100.0, "aac")
+        threads: set[int] = set()
+
+        async def run() -> int:
+            await split_audio_file_async("test.m4a", "output", target_chunk_size_mb=24.5,
+                                         progress_callback=lambda msg: threads.add(threading.get_ident()))
+            return threading.get_ident()
+
+        loop_thread = asyncio.run(run())
+
+        assert threads == {loop_thread}
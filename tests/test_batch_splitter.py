@@ -0,0 +1,126 @@
+import os
+from unittest.mock import patch
+
+from service.batch_splitter import _collect_input_files, split_audio_batch
+
+MB = 1024 * 1024
+
+
+def _touch(path, size: int = 0) -> str:
+    with open(path, "wb") as f:
+        f.truncate(size)
+    return str(path)
+
+
+class TestCollectInputFiles:
+    """_collect_input_files関数のテスト"""
+
+    def test_directory_filters_extensions(self, tmp_path):
+        """ディレクトリ指定時は音声ファイルだけを名前順に返す"""
+        _touch(tmp_path / "b.MP3")
+        _touch(tmp_path / "a.m4a")
+        _touch(tmp_path / "notes.txt")
+        os.mkdir(tmp_path / "sub.wav")
+
+        result = _collect_input_files(str(tmp_path))
+
+        assert [os.path.basename(p) for p in result] == ["a.m4a", "b.MP3"]
+
+    def test_glob_pattern(self, tmp_path):
+        """グロブパターンに一致するファイルを返す"""
+        _touch(tmp_path / "x.wav")
+        _touch(tmp_path / "y.mp3")
+
+        result = _collect_input_files(str(tmp_path / "*.wav"))
+
+        assert [os.path.basename(p) for p in result] == ["x.wav"]
+
+
+class TestSplitAudioBatch:
+    """split_audio_batch関数のテスト"""
+
+    @patch("service.audio_splitter._split_one_chunk")
+    @patch("service.audio_splitter._probe_audio")
+    def test_all_files_on_shared_pool(self, mock_probe, mock_split_one, tmp_path):
+        """全ファイルのチャンクを分割し、ファイルごとに出力パスをまとめる"""
+        src = tmp_path / "src"
+        src.mkdir()
+        big1 = _touch(src / "a.m4a", 3 * MB)
+        big2 = _touch(src / "b.m4a", 2 * MB)
+        small = _touch(src / "c.m4a", MB // 2)
+        mock_probe.return_value = (60.0, "aac")
+        out = str(tmp_path / "out")
+
+        result = split_audio_batch(str(src), out, target_chunk_size_mb=1.0, max_workers=4)
+
+        assert result.output_files[big1] == [os.path.join(out, f"a_part{i}.m4a") for i in (1, 2, 3)]
+        assert len(result.output_files[big2]) == 2
+        assert result.skipped == [small]
+        assert result.errors == {}
+        assert result.total_chunks == 5
+        assert mock_split_one.call_count == 5
+
+    @patch("service.audio_splitter._split_one_chunk")
+    @patch("service.audio_splitter._probe_audio")
+    def test_error_isolated_per_file(self, mock_probe, mock_split_one, tmp_path):
+        """1ファイルの失敗は他のファイルに影響しない"""
+        good = _touch(tmp_path / "good.mp3", 2 * MB)
+        bad = _touch(tmp_path / "bad.mp3", 2 * MB)
+
+        def fake_probe(path):
+            if path == bad:
+                raise RuntimeError("壊れています")
+            return 10.0, "mp3"
+        mock_probe.side_effect = fake_probe
+
+        messages: list[str] = []
+        result = split_audio_batch(str(tmp_path), str(tmp_path / "out"), target_chunk_size_mb=1.0,
+                                   output_format="mp3", progress_callback=messages.append)
+
+        assert list(result.output_files) == [good]
+        assert "壊れています" in result.errors[bad]
+        assert any("エラー: 1" in msg for msg in messages)
+
+    def test_no_files(self, tmp_path):
+        """対象ファイルが無い場合は空の結果"""
+        result = split_audio_batch(str(tmp_path), str(tmp_path / "out"))
+        assert result.total_chunks == 0
+        assert result.output_files == {}
+
+    @patch("service.audio_splitter._split_one_chunk")
+    @patch("service.audio_splitter._probe_audio")
+    def test_same_stem_not_split(self, mock_probe, mock_split_one, tmp_path):
+        """拡張子を除いた名前が同じファイルは、出力を上書きし合わないよう分割せずエラーにする"""
+        src = tmp_path / "src"
+        src.mkdir()
+        mp3 = _touch(src / "rec.mp3", 2 * MB)
+        wav = _touch(src / "rec.wav", 2 * MB)
+        other = _touch(src / "other.m4a", 2 * MB)
+        mock_probe.return_value = (60.0, "aac")
+
+        result = split_audio_batch(str(src), str(tmp_path / "out"), target_chunk_size_mb=1.0)
+
+        assert list(result.output_files) == [other]
+        assert set(result.errors) == {mp3, wav}
+        assert "重複" in result.errors[mp3]
+        assert all("rec" not in call.args[0] for call in mock_split_one.call_args_list)
+
+    @patch("service.audio_splitter._split_one_chunk")
+    @patch("service.audio_splitter._probe_audio")
+    def test_failed_file_outputs_removed(self, mock_probe, mock_split_one, tmp_path):
+        """チャンクの分割に失敗したファイルは、出力済みのチャンクも削除する"""
+        audio = _touch(tmp_path / "rec.m4a", 3 * MB)
+        mock_probe.return_value = (60.0, "aac")
+        out = tmp_path / "out"
+
+        def fake_split(src, dst, start, *args):
+            if start > 0:
+                raise RuntimeError("ffmpeg の実行に失敗しました")
+            _touch(dst, 10)
+        mock_split_one.side_effect = fake_split
+
+        result = split_audio_batch(str(tmp_path), str(out), target_chunk_size_mb=1.0, max_workers=1)
+
+        assert audio in result.errors
+        assert result.output_files == {}
+        assert not out.exists() or os.listdir(out) == []
@@ -0,0 +1,74 @@
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from service.cancellation import CancellationToken, SplitCancelledError
+from service.ffmpeg_runner import _run_command
+
+
+def _sleeper() -> list[str]:
+    return [sys.executable, "-c", "import time; time.sleep(30)"]
+
+
+class TestCancellationToken:
+    """CancellationTokenクラスのテスト"""
+
+    def test_raise_if_cancelled(self):
+        """cancel() 後は SplitCancelledError を送出する"""
+        token = CancellationToken()
+        token.raise_if_cancelled()
+
+        token.cancel()
+
+        assert token.cancelled
+        with pytest.raises(SplitCancelledError):
+            token.raise_if_cancelled()
+
+    def test_cancelled_error_is_runtime_error(self):
+        """既存の RuntimeError の処理で扱えるよう RuntimeError のサブクラスにする"""
+        assert issubclass(SplitCancelledError, RuntimeError)
+
+    def test_cancel_kills_registered_process(self):
+        """登録済みのプロセスは cancel() で終了する"""
+        token = CancellationToken()
+        process = subprocess.Popen(_sleeper())
+        token.register(process)
+
+        token.cancel()
+
+        assert process.wait(timeout=10) is not None
+
+    def test_register_after_cancel_kills_immediately(self):
+        """キャンセル後に登録したプロセスはすぐに終了させる"""
+        token = CancellationToken()
+        token.cancel()
+        process = subprocess.Popen(_sleeper())
+
+        token.register(process)
+
+        assert process.wait(timeout=10) is not None
+
+
+class TestRunCommandCancellation:
+    """_run_command のキャンセルのテスト"""
+
+    def test_cancel_running_command(self):
+        """実行中のコマンドを終了させ SplitCancelledError を送出する"""
+        token = CancellationToken()
+        timer = threading.Timer(0.2, token.cancel)
+        timer.start()
+        try:
+            with pytest.raises(SplitCancelledError):
+                _run_command(_sleeper(), token)
+        finally:
+            timer.cancel()
+
+    def test_cancelled_before_start(self):
+        """キャンセル済みならコマンドを起動しない"""
+        token = CancellationToken()
+        token.cancel()
+
+        with pytest.raises(SplitCancelledError):
+            _run_command(["command-that-does-not-exist"], token)
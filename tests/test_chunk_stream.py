@@ -0,0 +1,117 @@
+import asyncio
+import io
+import wave
+from unittest.mock import patch
+
+import pytest
+
+from service.chunk_stream import AudioChunk, FileSink, iter_audio_chunks, iter_audio_chunks_async
+
+
+def _write_wav(path, frames: int, sample_rate: int = 8000) -> bytes:
+    data = bytes((i * 7) % 256 for i in range(frames * 4))
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(data)
+    return data
+
+
+def _frames(data: bytes) -> bytes:
+    with wave.open(io.BytesIO(data), "rb") as w:
+        return w.readframes(w.getnframes())
+
+
+class TestIterAudioChunks:
+    """iter_audio_chunks関数のテスト"""
+
+    def test_native_wav_in_memory(self, tmp_path):
+        """PCM WAV はファイルを作らずに、そのまま再生できる WAV のバイト列として順に返す"""
+        path = tmp_path / "rec.wav"
+        data = _write_wav(path, 200_000)
+
+        chunks = list(iter_audio_chunks(str(path), target_chunk_size_mb=0.25, output_format="wav"))
+
+        assert [chunk.index for chunk in chunks] == [0, 1, 2, 3]
+        assert b"".join(_frames(chunk.data) for chunk in chunks) == data
+        assert chunks[1].start_s == pytest.approx(chunks[0].duration_s)
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["rec.wav"]
+
+    @patch("service.audio_splitter._probe_stream_bitrate", return_value=0)
+    @patch("service.audio_splitter._probe_audio", return_value=(80.0, "aac"))
+    @patch("service.audio_splitter._read_chunk_async")
+    def test_bounded_lookahead_in_order(self, mock_read, mock_probe, mock_bitrate, tmp_path):
+        """先読みは max_workers 個までで、後のチャンクが先に終わってもチャンク番号の順に返す"""
+        audio = tmp_path / "rec.m4a"
+        audio.write_bytes(b"a" * (4 * 1024 * 1024))
+        active = 0
+        peak = 0
+
+        async def fake_read(src, start, dur, *args):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.02 if start == 0.0 else 0.0)
+            return f"{start}".encode()
+
+        mock_read.side_effect = fake_read
+        received = []
+        for chunk in iter_audio_chunks(str(audio), target_chunk_size_mb=1.0, max_workers=2):
+            received.append(chunk)
+            active -= 1
+
+        assert [chunk.data for chunk in received] == [b"0.0", b"20.0", b"40.0", b"60.0"]
+        assert peak <= 2
+
+    @patch("service.audio_splitter._probe_stream_bitrate", return_value=0)
+    @patch("service.audio_splitter._probe_audio", return_value=(80.0, "aac"))
+    @patch("service.audio_splitter._read_chunk_async")
+    def test_close_cancels_lookahead(self, mock_read, mock_probe, mock_bitrate, tmp_path):
+        """途中で閉じると先読み中のチャンクを取りやめる"""
+        audio = tmp_path / "rec.m4a"
+        audio.write_bytes(b"a" * (4 * 1024 * 1024))
+        cancelled = []
+
+        async def fake_read(src, start, dur, *args):
+            if start > 0.0:
+                try:
+                    await asyncio.sleep(60)
+                except asyncio.CancelledError:
+                    cancelled.append(start)
+                    raise
+            return b"x"
+
+        mock_read.side_effect = fake_read
+
+        async def consume_first():
+            chunks = iter_audio_chunks_async(str(audio), target_chunk_size_mb=1.0, max_workers=3)
+            first = await anext(chunks)
+            await chunks.aclose()
+            return first
+
+        assert asyncio.run(consume_first()) == AudioChunk(0, 0.0, 20.0, b"x")
+        assert sorted(cancelled) == [20.0, 40.0]
+
+    @patch("service.audio_splitter._probe_stream_bitrate", return_value=0)
+    @patch("service.audio_splitter._probe_audio", return_value=(80.0, "aac"))
+    @patch("service.audio_splitter._read_chunk_async")
+    def test_error_propagates(self, mock_read, mock_probe, mock_bitrate, tmp_path):
+        """ffmpeg のエラーは同期版の呼び出し側へ送出する"""
+        audio = tmp_path / "rec.m4a"
+        audio.write_bytes(b"a" * (2 * 1024 * 1024))
+        mock_read.side_effect = RuntimeError("ffmpeg の実行に失敗しました")
+
+        with pytest.raises(RuntimeError, match="ffmpeg"):
+            list(iter_audio_chunks(str(audio), target_chunk_size_mb=1.0))
+
+
+class TestFileSink:
+    """FileSinkクラスのテスト"""
+
+    def test_writes_split_audio_file_names(self, tmp_path):
+        """split_audio_file と同じ名前で書き出す"""
+        sink = FileSink("/in/rec.wav", str(tmp_path / "out"), "wav")
+        path = sink(AudioChunk(1, 10.0, 10.0, b"data"))
+        assert path == str(tmp_path / "out" / "rec_part2.wav")
+        assert open(path, "rb").read() == b"data"
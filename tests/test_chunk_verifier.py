@@ -0,0 +1,78 @@
+import asyncio
+import wave
+from unittest.mock import patch
+
+from service.chunk_verifier import ChunkCheck, check_chunk, check_chunks, total_duration_matches
+
+
+def _write_wav(path, seconds: float, sample_rate: int = 8000) -> str:
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(b"\0\0" * int(seconds * sample_rate))
+    return str(path)
+
+
+class TestCheckChunk:
+    """check_chunk関数のテスト"""
+
+    def test_valid_chunk(self, tmp_path):
+        """サイズ・長さとも計画どおりなら問題なし"""
+        path = _write_wav(tmp_path / "a.wav", 10.0)
+        check = check_chunk(0, path, 10.0, 1024 * 1024, "wav")
+        assert check.duration_s == 10.0
+        assert not check.oversized
+        assert not check.truncated
+
+    def test_oversized(self, tmp_path):
+        """目標サイズを超えたチャンクを検出する"""
+        path = _write_wav(tmp_path / "a.wav", 10.0)
+        check = check_chunk(0, path, 10.0, 100_000, "wav")
+        assert check.oversized
+        assert not check.truncated
+
+    def test_truncated(self, tmp_path):
+        """計画より短いチャンクを検出する"""
+        path = _write_wav(tmp_path / "a.wav", 4.0)
+        assert check_chunk(0, path, 10.0, 1024 * 1024, "wav").truncated
+
+    def test_missing_file(self, tmp_path):
+        """出力が無いチャンクは長さ不明として扱う"""
+        check = check_chunk(3, str(tmp_path / "none.wav"), 10.0, 1024, "wav")
+        assert check.duration_s is None
+        assert check.truncated
+
+    @patch("service.chunk_verifier._probe_audio")
+    def test_probe_for_other_formats(self, mock_probe, tmp_path):
+        """WAV/MP3 以外は ffprobe で長さを取得し、失敗すれば長さ不明とする"""
+        path = tmp_path / "a.m4a"
+        path.write_bytes(b"x" * 10)
+        mock_probe.return_value = (9.9, "aac")
+        assert not check_chunk(0, str(path), 10.0, 1024, "m4a").truncated
+        mock_probe.side_effect = RuntimeError("ffprobe")
+        assert check_chunk(0, str(path), 10.0, 1024, "m4a").duration_s is None
+
+
+class TestCheckChunks:
+    """check_chunks関数のテスト"""
+
+    def test_keeps_order(self, tmp_path):
+        """指定したチャンク番号と順序のまま結果を返す"""
+        paths = [_write_wav(tmp_path / f"{i}.wav", i + 1.0) for i in range(3)]
+        checks = asyncio.run(check_chunks(
+            [(5 + i, path, i + 1.0) for i, path in enumerate(paths)], 1024 * 1024, "wav", max_workers=2,
+        ))
+        assert [check.index for check in checks] == [5, 6, 7]
+        assert [check.duration_s for check in checks] == [1.0, 2.0, 3.0]
+
+
+class TestTotalDurationMatches:
+    """total_duration_matches関数のテスト"""
+
+    def test_tolerance(self):
+        """合計が入力の再生時間の 1% (最低1秒)以内なら一致とみなす"""
+        checks = [ChunkCheck(i, "", 0, 0, 30.0, 30.0) for i in range(4)]
+        assert total_duration_matches(checks, 120.5)
+        assert not total_duration_matches(checks, 125.0)
+        assert not total_duration_matches(checks[:3] + [ChunkCheck(3, "", 0, 0, None, 30.0)], 120.0)
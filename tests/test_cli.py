@@ -0,0 +1,135 @@
+import io
+import json
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from service.cli import EXIT_CANCELLED, EXIT_NOT_FOUND, EXIT_OK, EXIT_SPLIT_ERROR, main
+from service.cancellation import SplitCancelledError
+from service.job_report import SplitReport, SplitResult
+from service.progress_events import ChunkDone
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def _run(argv):
+    stdout = io.StringIO()
+    code = main(argv, stdout=stdout)
+    return code, [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+
+class TestCliMain:
+    """main関数のテスト"""
+
+    @pytest.fixture
+    def input_file(self, tmp_path):
+        path = tmp_path / "input.m4a"
+        path.write_bytes(b"\0" * 100)
+        return str(path)
+
+    def test_success_outputs_json(self, input_file, tmp_path):
+        """成功時は進捗と結果を JSON Lines で出力し、0 を返す"""
+        report = SplitReport(file_path=input_file, split_mode="parallel", input_bytes=100, chunk_count=2)
+
+        def fake_split(file_path, output_dir, **kwargs):
+            kwargs["progress_callback"]("分割中")
+            kwargs["event_callback"](ChunkDone(index=0, output_path="a", completed=1, total=2))
+            return SplitResult(["a", "b"], report)
+
+        with patch("service.audio_splitter.split_audio_file", side_effect=fake_split) as mock_split, \
+                patch("service.ffmpeg_capabilities.discover_capabilities"):
+            code, records = _run([input_file, "-o", str(tmp_path), "--target-mb", "10", "--format", "mp3",
+                                  "--workers", "3", "--no-cache"])
+
+        assert code == EXIT_OK
+        assert records[0] == {"event": "message", "message": "分割中"}
+        assert records[1]["event"] == "chunk_done"
+        assert records[1]["total"] == 2
+        result = records[-1]
+        assert result["event"] == "result"
+        assert result["status"] == "ok"
+        assert result["outputs"] == ["a", "b"]
+        assert result["report"]["chunk_count"] == 2
+        kwargs = mock_split.call_args.kwargs
+        assert kwargs["target_chunk_size_mb"] == 10
+        assert kwargs["output_format"] == "mp3"
+        assert kwargs["max_workers"] == 3
+
+    def test_quiet_outputs_result_only(self, input_file, tmp_path):
+        """--quiet では結果の1行だけを出力する"""
+        def fake_split(file_path, output_dir, **kwargs):
+            kwargs["progress_callback"]("分割中")
+            return SplitResult(["a"])
+
+        with patch("service.audio_splitter.split_audio_file", side_effect=fake_split), \
+                patch("service.ffmpeg_capabilities.discover_capabilities"):
+            code, records = _run([input_file, "-o", str(tmp_path), "--no-cache", "-q"])
+
+        assert code == EXIT_OK
+        assert len(records) == 1
+        assert records[0]["report"] is None
+
+    def test_missing_input(self, tmp_path):
+        """入力ファイルが無い場合は分割処理を読み込まずに 3 を返す"""
+        code, records = _run([str(tmp_path / "missing.m4a"), "-o", str(tmp_path)])
+
+        assert code == EXIT_NOT_FOUND
+        assert records[-1]["status"] == "error"
+
+    def test_split_error(self, input_file, tmp_path):
+        """ffmpeg 関連のエラーは 4 を返し、メッセージを出力する"""
+        with patch("service.audio_splitter.split_audio_file", side_effect=RuntimeError("ffmpeg の実行に失敗しました")), \
+                patch("service.ffmpeg_capabilities.discover_capabilities"):
+            code, records = _run([input_file, "-o", str(tmp_path), "--no-cache"])
+
+        assert code == EXIT_SPLIT_ERROR
+        assert records[-1]["message"] == "ffmpeg の実行に失敗しました"
+
+    def test_ffmpeg_not_found(self, input_file, tmp_path):
+        """ffmpeg が無い場合は分割を始めずに 4 を返す"""
+        with patch("service.audio_splitter.split_audio_file") as mock_split, \
+                patch("service.ffmpeg_capabilities.discover_capabilities",
+                      side_effect=RuntimeError("ffmpeg が見つかりません")):
+            code, records = _run([input_file, "-o", str(tmp_path), "--no-cache"])
+
+        assert code == EXIT_SPLIT_ERROR
+        assert records[-1]["message"] == "ffmpeg が見つかりません"
+        mock_split.assert_not_called()
+
+    def test_cancelled(self, input_file, tmp_path):
+        """キャンセルされた場合は 130 を返す"""
+        with patch("service.audio_splitter.split_audio_file", side_effect=SplitCancelledError("キャンセル")), \
+                patch("service.ffmpeg_capabilities.discover_capabilities", return_value=MagicMock()):
+            code, records = _run([input_file, "-o", str(tmp_path), "--no-cache"])
+
+        assert code == EXIT_CANCELLED
+        assert records[-1]["status"] == "cancelled"
+
+    def test_usage_error(self, input_file, tmp_path):
+        """引数の誤りは argparse と同じく 2 で終了する"""
+        with pytest.raises(SystemExit) as exc_info:
+            main([input_file, "-o", str(tmp_path), "--workers", "0"], stdout=io.StringIO())
+
+        assert exc_info.value.code == 2
+
+
+class TestCliImports:
+    """起動時に読み込むモジュールのテスト"""
+
+    def test_no_gui_or_engine_on_import(self):
+        """CLI の読み込みと --help では tkinter・app・分割処理(numpy)を読み込まない"""
+        code = (
+            "import sys, contextlib, io\n"
+            "from service.cli import main\n"
+            "with contextlib.suppress(SystemExit), contextlib.redirect_stdout(io.StringIO()):\n"
+            "    main(['--help'])\n"
+            "print(','.join(m for m in ('tkinter', 'app', 'numpy', 'service.audio_splitter') if m in sys.modules))\n"
+        )
+        completed = subprocess.run(
+            [sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        )
+
+        assert completed.stdout.strip() == ""
@@ -0,0 +1,123 @@
+import configparser
+import threading
+
+from service.concurrency import ConcurrencyController, load_concurrency_settings
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _controller(floor=1, ceiling=8, initial=2, load=(0.5, 8000.0)):
+    clock = FakeClock()
+    loads = [load]
+    controller = ConcurrencyController(floor, ceiling, initial, sample_load=lambda: loads[-1], clock=clock)
+    return controller, clock, loads
+
+
+def _run_window(controller, clock, media_s_per_chunk: float, elapsed_s: float) -> None:
+    """現在の上限と同じ数のチャンクを完了させる"""
+    count = controller.limit
+    for _ in range(count):
+        controller.acquire()
+    clock.now += elapsed_s
+    for _ in range(count):
+        controller.release(media_s_per_chunk)
+
+
+class TestConcurrencyController:
+    """ConcurrencyControllerクラスのテスト"""
+
+    def test_additive_increase_while_throughput_grows(self):
+        """スループットが伸びている間は1つずつ増やす"""
+        controller, clock, _ = _controller(initial=2)
+        _run_window(controller, clock, 10.0, 1.0)
+        assert controller.limit == 3
+        _run_window(controller, clock, 10.0, 1.0)
+        assert controller.limit == 4
+
+    def test_multiplicative_decrease_on_throughput_drop(self):
+        """スループットが落ちたら半分に減らす"""
+        controller, clock, _ = _controller(initial=4)
+        _run_window(controller, clock, 10.0, 1.0)   # 40x, 5 へ
+        _run_window(controller, clock, 10.0, 5.0)   # 10x に低下
+        assert controller.limit == 2
+
+    def test_decrease_on_run_queue_overload(self):
+        """CPU 数を超えてプロセスが実行を待っていたら半分に減らす"""
+        controller, clock, loads = _controller(initial=6)
+        loads.append((2.0, 8000.0))
+        _run_window(controller, clock, 10.0, 1.0)
+        assert controller.limit == 3
+
+    def test_decrease_on_low_memory(self):
+        """空きメモリが少なければ減らす"""
+        controller, clock, loads = _controller(initial=4)
+        loads.append((0.5, 100.0))
+        _run_window(controller, clock, 10.0, 1.0)
+        assert controller.limit == 2
+
+    def test_bounds(self):
+        """下限・上限を超えない"""
+        controller, clock, loads = _controller(floor=2, ceiling=3, initial=3)
+        _run_window(controller, clock, 10.0, 1.0)
+        assert controller.limit == 3
+        loads.append((2.0, 8000.0))
+        _run_window(controller, clock, 10.0, 1.0)
+        assert controller.limit == 2
+
+    def test_cpu_bound_workload_keeps_workers(self):
+        """CPU 律速の再エンコード(CPU 数まではプロセス数に比例して速くなる)は CPU 数まで増やし、減らさない"""
+        cores = 8
+        controller, clock, loads = _controller(ceiling=cores, initial=4)
+        for _ in range(10):
+            limit = controller.limit
+            # 各プロセスが CPU を1つ使い切る(CPU 使用率は 100% だが実行待ちは無い)
+            loads.append((min(limit, cores) / cores, 8000.0))
+            _run_window(controller, clock, 10.0, max(1.0, limit / cores))
+            assert controller.limit >= limit
+        assert controller.limit == cores
+
+    def test_no_repeated_decrease_after_cut(self):
+        """減らした直後はスループットが減った分だけ下がっても、さらに減らさない"""
+        controller, clock, loads = _controller(initial=8)
+        _run_window(controller, clock, 10.0, 1.0)   # 80x(上限 8 のまま)
+        loads.append((2.0, 8000.0))
+        _run_window(controller, clock, 10.0, 1.0)   # 過負荷で 4 へ
+        assert controller.limit == 4
+        loads.append((0.5, 8000.0))
+        _run_window(controller, clock, 10.0, 1.0)   # 4 並列で 40x(1並列あたりは同じ)
+        assert controller.limit == 4
+
+    def test_acquire_blocks_at_limit(self):
+        """上限に達したら release されるまで待つ"""
+        controller, _, _ = _controller(initial=1, ceiling=1)
+        controller.acquire()
+        acquired = threading.Event()
+        thread = threading.Thread(target=lambda: (controller.acquire(), acquired.set()))
+        thread.start()
+        assert not acquired.wait(0.05)
+        controller.release()
+        assert acquired.wait(1.0)
+        thread.join()
+
+
+class TestLoadConcurrencySettings:
+    """load_concurrency_settings関数のテスト"""
+
+    def test_settings(self):
+        """設定値を読む"""
+        config = configparser.ConfigParser()
+        config.read_dict({"Concurrency": {"adaptive": "True", "min_workers": "2", "max_workers": "6"}})
+        assert load_concurrency_settings(config) == (True, 2, 6)
+
+    def test_defaults(self):
+        """セクションが無ければ自動調整しない"""
+        adaptive, floor, ceiling = load_concurrency_settings(configparser.ConfigParser())
+        assert adaptive is False
+        assert floor == 1
+        assert ceiling >= 1
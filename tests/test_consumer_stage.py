@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from service.consumer_stage import ConsumerStage
+
+
+class TestConsumerStage:
+    """ConsumerStageクラスのテスト"""
+
+    def test_index_order(self):
+        """order="index" では出力の順序に関わらずチャンク番号の順に渡す"""
+        received = []
+
+        async def run():
+            stage = ConsumerStage(lambda index, path: received.append(index) or path.upper(), order="index")
+            stage.expect([0, 1, 2])
+            for index in (2, 0, 1):
+                stage.submit(index, f"p{index}")
+            return await stage.drain()
+
+        assert asyncio.run(run()) == ["P0", "P1", "P2"]
+        assert received == [0, 1, 2]
+
+    def test_backpressure(self):
+        """未処理のチャンクが上限に達すると、consumer が1つ終えるまで acquire を待たせる"""
+        release = threading.Event()
+
+        def consumer(index, path):
+            release.wait(5)
+
+        async def run():
+            stage = ConsumerStage(consumer, max_pending=2)
+            await stage.acquire()
+            await stage.acquire()
+            stage.submit(0, "a")
+            stage.submit(1, "b")
+            blocked = asyncio.ensure_future(stage.acquire())
+            await asyncio.sleep(0.05)
+            assert not blocked.done()
+            release.set()
+            await asyncio.wait_for(blocked, 5)
+            await stage.drain()
+
+        asyncio.run(run())
+
+    def test_failure_stops_new_chunks(self):
+        """consumer が失敗すると以降の acquire と drain がエラーになる"""
+        def consumer(index, path):
+            raise ValueError("upload failed")
+
+        async def run():
+            stage = ConsumerStage(consumer, max_pending=4)
+            stage.expect([0])
+            await stage.acquire()
+            stage.submit(0, "a")
+            with pytest.raises(RuntimeError, match="チャンク 1 の後処理に失敗しました"):
+                await stage.drain()
+            with pytest.raises(RuntimeError):
+                await stage.acquire()
+
+        asyncio.run(run())
+
+    def test_first_result_time(self):
+        """最初の consumer の処理が終わるまでの時間を記録する"""
+        async def run():
+            stage = ConsumerStage(lambda index, path: time.sleep(0.01), started_at=time.perf_counter() - 1.0)
+            stage.submit(0, "a")
+            await stage.drain()
+            return stage.first_result_s
+
+        first_result_s = asyncio.run(run())
+
+        assert first_result_s is not None
+        assert first_result_s >= 1.0
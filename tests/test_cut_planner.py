@@ -0,0 +1,94 @@
+from array import array
+
+import pytest
+
+from service.cut_planner import _plan_by_packets, _plan_for_silence, _plan_uniform, _spans_from_boundaries
+
+MB = 1024 * 1024
+
+
+class TestPlanUniform:
+    """_plan_uniform関数のテスト"""
+
+    def test_equal_spans(self):
+        """再生時間を等分する"""
+        assert _plan_uniform(90.0, 3) == [(0.0, 30.0), (30.0, 30.0), (60.0, 30.0)]
+
+    def test_single_chunk(self):
+        """チャンク数1の場合は全体"""
+        assert _plan_uniform(12.5, 1) == [(0.0, 12.5)]
+
+
+class TestPlanForSilence:
+    """_plan_for_silence関数のテスト"""
+
+    def test_chunks_fit_after_moving(self):
+        """分割位置を前後に動かしても各チャンクが目標サイズ相当の長さを超えない"""
+        spans, tolerance_s = _plan_for_silence(1000.0, 100.0, 25.0, 5.0)
+        max_chunk_s = 1000.0 * 25.0 / 100.0
+        assert tolerance_s == 5.0
+        assert all(duration + 2 * tolerance_s <= max_chunk_s for _, duration in spans)
+        assert len(spans) == 5
+
+    def test_tolerance_shrinks_for_short_chunks(self):
+        """チャンクが短い場合は探索幅を縮める"""
+        _, tolerance_s = _plan_for_silence(100.0, 100.0, 10.0, 5.0)
+        assert tolerance_s == pytest.approx(2.5)
+
+
+class TestSpansFromBoundaries:
+    """_spans_from_boundaries関数のテスト"""
+
+    def test_spans(self):
+        """分割位置から開始位置と長さを作る"""
+        assert _spans_from_boundaries([3.0, 7.0], 10.0) == [(0.0, 3.0), (3.0, 4.0), (7.0, 3.0)]
+
+    def test_non_increasing_boundary_dropped(self):
+        """前の位置以前の分割位置は捨てる"""
+        assert _spans_from_boundaries([5.0, 4.0, 8.0], 10.0) == [(0.0, 5.0), (5.0, 3.0), (8.0, 2.0)]
+
+
+class TestPlanByPackets:
+    """_plan_by_packets関数のテスト"""
+
+    def test_cuts_before_budget_exceeded(self):
+        """目標サイズを超える直前のパケット境界で分割する"""
+        times = array("d", [0.0, 1.0, 2.0, 3.0, 4.0])
+        sizes = array("q", [400_000] * 5)
+        spans = _plan_by_packets(times, sizes, 5.0, MB, "mp3")
+        assert spans == [(0.0, 2.0), (2.0, 2.0), (4.0, 1.0)]
+
+    def test_vbr_packs_each_chunk(self):
+        """ビットレートが変動してもチャンクごとに予算いっぱいまで詰める"""
+        times = array("d", [float(i) for i in range(8)])
+        sizes = array("q", [100_000, 100_000, 700_000, 600_000, 100_000, 100_000, 100_000, 100_000])
+        spans = _plan_by_packets(times, sizes, 8.0, MB, "mp3")
+        assert [start for start, _ in spans] == [0.0, 3.0]
+
+    def test_chunks_never_exceed_budget(self):
+        """各チャンクのパケット合計とオーバーヘッドが目標以下になる"""
+        times = array("d", [i * 0.026 for i in range(2000)])
+        sizes = array("q", [300 + (i * 37) % 700 for i in range(2000)])
+        target = 100_000
+        spans = _plan_by_packets(times, sizes, 2000 * 0.026, target, "m4a")
+        for start_s, duration_s in spans:
+            chunk = [
+                size for t, size in zip(times, sizes)
+                if start_s <= t < start_s + duration_s - 1e-9
+            ]
+            assert 8192 + sum(chunk) + 16 * len(chunk) <= target
+
+    def test_oversized_packet_gets_own_chunk(self):
+        """1パケットで目標を超える場合はそのパケット単独のチャンクにする"""
+        times = array("d", [0.0, 1.0, 2.0])
+        sizes = array("q", [100, 2 * MB, 100])
+        spans = _plan_by_packets(times, sizes, 3.0, MB, "mp3")
+        assert [start for start, _ in spans] == [0.0, 1.0, 2.0]
+
+    def test_last_span_reaches_duration(self):
+        """最後のチャンクは再生時間の終わりまで"""
+        times = array("d", [0.0, 1.0])
+        sizes = array("q", [100, 100])
+        spans = _plan_by_packets(times, sizes, 2.5, MB, "mp3")
+        assert spans == [(0.0, 2.5)]
+        assert sum(d for _, d in spans) == pytest.approx(2.5)
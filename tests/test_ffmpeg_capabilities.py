@@ -0,0 +1,147 @@
+import os
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+from service import ffmpeg_capabilities
+from service.ffmpeg_capabilities import (
+    FfmpegCapabilities,
+    _parse_encoders,
+    _parse_muxers,
+    _parse_version,
+    discover_capabilities,
+)
+from service.probe_cache import ProbeCache
+
+ENCODERS_OUTPUT = """Encoders:
+ V..... = Video
+ A..... = Audio
+ ------
+ V....D libx264              libx264 H.264 / AVC / MPEG-4 AVC (codec h264)
+ A....D aac                  AAC (Advanced Audio Coding)
+ A....D libfdk_aac           Fraunhofer FDK AAC (codec aac)
+ A....D libmp3lame           libmp3lame MP3 (MPEG audio layer 3) (codec mp3)
+"""
+
+MUXERS_OUTPUT = """File formats:
+ D. = Demuxing supported
+ .E = Muxing supported
+ --
+  E ipod            iPod H.264 MP4 (MPEG-4 Part 14)
+  E mp3             MP3 (MPEG audio layer 3)
+  E mp4             MP4 (MPEG-4 Part 14)
+  E segment         segment
+ D  wav             WAV / WAVE (Waveform Audio)
+"""
+
+VERSION_OUTPUT = "ffmpeg version 6.1.1 Copyright (c) 2000-2023 the FFmpeg developers\nbuilt with gcc 13\n"
+
+
+def _capabilities(encoders=("aac", "libmp3lame"), muxers=("ipod", "mp4", "mp3", "segment")):
+    return FfmpegCapabilities("/usr/bin/ffmpeg", "6.1.1", frozenset(encoders), frozenset(muxers))
+
+
+def _fake_run(cmd):
+    output = {"-encoders": ENCODERS_OUTPUT, "-muxers": MUXERS_OUTPUT, "-version": VERSION_OUTPUT}[cmd[-1]]
+    return subprocess.CompletedProcess(cmd, 0, output, "")
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    """PATH 上の ffmpeg/ffprobe の代わりに使う空ファイル"""
+    ffmpeg_path = tmp_path / "ffmpeg"
+    ffmpeg_path.write_bytes(b"")
+    ffmpeg_capabilities._memo.clear()
+    with patch("service.ffmpeg_capabilities.shutil.which", side_effect=lambda name: str(tmp_path / name)):
+        yield ffmpeg_path
+    ffmpeg_capabilities._memo.clear()
+
+
+class TestParse:
+    """ffmpeg の出力の解析のテスト"""
+
+    def test_parse_encoders(self):
+        """音声エンコーダだけを取り出す"""
+        assert _parse_encoders(ENCODERS_OUTPUT) == {"aac", "libfdk_aac", "libmp3lame"}
+
+    def test_parse_muxers(self):
+        """マルチプレクサ(E)だけを取り出す"""
+        assert _parse_muxers(MUXERS_OUTPUT) == {"ipod", "mp3", "mp4", "segment"}
+
+    def test_parse_version(self):
+        assert _parse_version(VERSION_OUTPUT) == "6.1.1"
+
+
+class TestFfmpegCapabilities:
+    """FfmpegCapabilitiesクラスのテスト"""
+
+    def test_prefers_faster_encoder(self):
+        """ビルドに含まれる最速のエンコーダを選ぶ"""
+        assert _capabilities(encoders=("aac", "libfdk_aac")).encoder_for("m4a") == "libfdk_aac"
+        assert _capabilities(encoders=("aac",)).encoder_for("m4a") == "aac"
+
+    def test_unknown_format_has_no_encoder(self):
+        assert _capabilities().encoder_for("flac") is None
+
+    def test_missing_encoder_raises(self):
+        """既知のフォーマットでエンコーダが無い場合はエラー"""
+        with pytest.raises(RuntimeError) as exc_info:
+            _capabilities(encoders=("aac",)).check_encoder("mp3")
+        assert "libmp3lame" in str(exc_info.value)
+
+    def test_missing_muxer_raises(self):
+        """出力形式のマルチプレクサが無い場合はエラー"""
+        with pytest.raises(RuntimeError):
+            _capabilities(muxers=("mp3",)).check_output_format("m4a")
+
+    def test_missing_segment_muxer_raises(self):
+        """segment モードで segment マルチプレクサが無い場合はエラー"""
+        capabilities = _capabilities(muxers=("ipod",))
+        capabilities.check_output_format("m4a")
+        with pytest.raises(RuntimeError):
+            capabilities.check_output_format("m4a", segment=True)
+
+
+class TestDiscoverCapabilities:
+    """discover_capabilities関数のテスト"""
+
+    @patch("service.ffmpeg_capabilities._run_command", side_effect=_fake_run)
+    def test_discovers_once_per_binary(self, mock_run, fake_ffmpeg):
+        """同じ ffmpeg は1回だけ調べる"""
+        first = discover_capabilities()
+        second = discover_capabilities()
+
+        assert first is second
+        assert first.version == "6.1.1"
+        assert first.encoder_for("m4a") == "libfdk_aac"
+        assert mock_run.call_count == 3
+
+    @patch("service.ffmpeg_capabilities._run_command", side_effect=_fake_run)
+    def test_rediscovers_when_binary_changes(self, mock_run, fake_ffmpeg):
+        """ffmpeg の更新時刻が変わったら調べ直す"""
+        discover_capabilities()
+        stat = os.stat(fake_ffmpeg)
+        os.utime(fake_ffmpeg, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        discover_capabilities()
+
+        assert mock_run.call_count == 6
+
+    @patch("service.ffmpeg_capabilities._run_command", side_effect=_fake_run)
+    def test_persisted_in_probe_cache(self, mock_run, fake_ffmpeg, tmp_path):
+        """probe_cache を指定するとプロセスをまたいで結果を再利用する"""
+        cache = ProbeCache(str(tmp_path / "cache.sqlite3"))
+        discover_capabilities(cache)
+        ffmpeg_capabilities._memo.clear()
+
+        capabilities = discover_capabilities(cache)
+
+        assert mock_run.call_count == 3
+        assert "segment" in capabilities.muxers
+
+    def test_missing_ffmpeg(self):
+        """ffmpeg が PATH に無い場合は何も実行せずにエラー"""
+        with patch("service.ffmpeg_capabilities.shutil.which", return_value=None):
+            with pytest.raises(RuntimeError) as exc_info:
+                discover_capabilities()
+        assert "ffmpeg が見つかりません" in str(exc_info.value)
@@ -0,0 +1,308 @@
+import configparser
+import sys
+import threading
+import time
+
+import pytest
+
+from service.cancellation import SplitCancelledError
+from service.folder_watcher import FolderWatcher, WatchSettings, WatchState, load_watch_settings
+
+
+def _wait_until(predicate, timeout_s=10.0):
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class _RecordingSplit:
+    """呼ばれたファイルと同時実行数を記録する分割関数"""
+
+    def __init__(self, delay_s=0.0):
+        self.calls = []
+        self.max_running = 0
+        self._running = 0
+        self._delay_s = delay_s
+        self._lock = threading.Lock()
+
+    def __call__(self, file_path, output_dir, cancel_token):
+        with self._lock:
+            self.calls.append(file_path)
+            self._running += 1
+            self.max_running = max(self.max_running, self._running)
+        try:
+            time.sleep(self._delay_s)
+            return [f"{file_path}.part1"]
+        finally:
+            with self._lock:
+                self._running -= 1
+
+
+class _RunningWatcher:
+    def __init__(self, watcher):
+        self.watcher = watcher
+        self.thread = threading.Thread(target=watcher.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self.watcher
+
+    def __exit__(self, *exc_info):
+        self.watcher.stop()
+        self.thread.join(10)
+
+
+class TestLoadWatchSettings:
+    """load_watch_settings関数のテスト"""
+
+    def test_reads_section(self):
+        """[Watch] セクションの値を読む"""
+        config = configparser.ConfigParser()
+        config.read_dict({"Watch": {
+            "settle_seconds": "3", "poll_interval_seconds": "0.5", "max_jobs": "4", "use_inotify": "False",
+        }})
+
+        assert load_watch_settings(config) == WatchSettings(3.0, 0.5, 4, False)
+
+    def test_invalid_values_fall_back(self):
+        """不正な値・セクションが無い場合は既定値"""
+        config = configparser.ConfigParser()
+        config.read_dict({"Watch": {"max_jobs": "many"}})
+
+        assert load_watch_settings(config) == WatchSettings()
+        assert load_watch_settings(configparser.ConfigParser()) == WatchSettings()
+
+
+class TestWatchState:
+    """WatchStateクラスのテスト"""
+
+    def test_persists_across_instances(self, tmp_path):
+        """記録はファイルに保存され、サイズと更新時刻が同じ間だけ分割済みとみなす"""
+        path = str(tmp_path / "state.json")
+        WatchState(path).record("/in/a.m4a", 100, 5, "done", {"outputs": 2})
+
+        state = WatchState(path)
+        assert state.is_processed("/in/a.m4a", 100, 5)
+        assert not state.is_processed("/in/a.m4a", 101, 5)
+        assert not state.is_processed("/in/b.m4a", 100, 5)
+
+    def test_prune(self, tmp_path):
+        """無くなったファイルの記録を削除する"""
+        path = str(tmp_path / "state.json")
+        state = WatchState(path)
+        state.record("/in/a.m4a", 1, 1, "done")
+        state.record("/in/b.m4a", 1, 1, "failed")
+
+        state.prune({"/in/a.m4a"})
+
+        reloaded = WatchState(path)
+        assert reloaded.is_processed("/in/a.m4a", 1, 1)
+        assert not reloaded.is_processed("/in/b.m4a", 1, 1)
+
+    def test_corrupt_file(self, tmp_path):
+        """壊れた状態ファイルは空として扱う"""
+        path = tmp_path / "state.json"
+        path.write_text("{broken", encoding="utf-8")
+
+        assert not WatchState(str(path)).is_processed("/in/a.m4a", 1, 1)
+
+
+class TestFolderWatcherSettle:
+    """書き込み完了の判定のテスト"""
+
+    def _watcher(self, tmp_path, clock):
+        watch_dir = tmp_path / "in"
+        watch_dir.mkdir()
+        return watch_dir, FolderWatcher(
+            str(watch_dir), str(tmp_path / "out"), _RecordingSplit(), WatchState(str(tmp_path / "state.json")),
+            WatchSettings(settle_s=2.0), clock=clock,
+        )
+
+    def test_waits_until_file_stops_growing(self, tmp_path):
+        """サイズが変わる間は分割待ちにせず、settle_s 秒変わらなければ分割待ちにする"""
+        now = [0.0]
+        watch_dir, watcher = self._watcher(tmp_path, lambda: now[0])
+        path = watch_dir / "a.m4a"
+        path.write_bytes(b"\0" * 10)
+
+        watcher._observe(str(path), closed=False)
+        now[0] = 1.5
+        with open(path, "ab") as f:
+            f.write(b"\0" * 10)
+        watcher._check_pending()
+        now[0] = 3.0
+        watcher._check_pending()
+        assert list(watcher._ready) == []
+
+        now[0] = 3.6
+        watcher._check_pending()
+        assert list(watcher._ready) == [str(path)]
+
+    def test_closed_file_is_ready_sooner(self, tmp_path):
+        """書き込み完了のイベントが届いたファイルは短い待ち時間で分割待ちにする"""
+        now = [0.0]
+        watch_dir, watcher = self._watcher(tmp_path, lambda: now[0])
+        path = watch_dir / "a.m4a"
+        path.write_bytes(b"\0" * 10)
+
+        watcher._observe(str(path), closed=True)
+        now[0] = 0.6
+        watcher._check_pending()
+
+        assert list(watcher._ready) == [str(path)]
+
+    def test_deduplicates_events(self, tmp_path):
+        """同じファイルのイベントは1つにまとめ、対象外の拡張子・空のファイルは無視する"""
+        now = [0.0]
+        watch_dir, watcher = self._watcher(tmp_path, lambda: now[0])
+        path = watch_dir / "a.m4a"
+        path.write_bytes(b"\0" * 10)
+        (watch_dir / "notes.txt").write_text("x")
+        (watch_dir / "empty.mp3").write_bytes(b"")
+
+        for _ in range(5):
+            watcher._observe(str(path), closed=False)
+        watcher._observe(str(watch_dir / "notes.txt"), closed=True)
+        watcher._observe(str(watch_dir / "empty.mp3"), closed=True)
+        now[0] = 5.0
+        watcher._check_pending()
+        watcher._observe(str(path), closed=True)
+
+        assert list(watcher._ready) == [str(path)]
+        assert list(watcher._pending) == [str(watch_dir / "empty.mp3")]
+
+    def test_same_directory_rejected(self, tmp_path):
+        """監視フォルダと出力先が同じ場合はエラー"""
+        with pytest.raises(RuntimeError, match="同じフォルダ"):
+            FolderWatcher(str(tmp_path), str(tmp_path), _RecordingSplit(), WatchState(str(tmp_path / "s.json")))
+
+
+class TestFolderWatcherRun:
+    """runメソッドのテスト"""
+
+    @pytest.fixture(params=[False, True], ids=["polling", "inotify"])
+    def use_inotify(self, request):
+        if request.param and not sys.platform.startswith("linux"):
+            pytest.skip("inotify は Linux のみ")
+        return request.param
+
+    def _settings(self, use_inotify, max_jobs=2):
+        return WatchSettings(settle_s=0.2, poll_interval_s=0.05, max_jobs=max_jobs, use_inotify=use_inotify)
+
+    def test_splits_existing_and_new_files(self, tmp_path, use_inotify):
+        """起動時にあるファイルと、後から置かれたファイルをそれぞれ1回だけ分割する"""
+        watch_dir = tmp_path / "in"
+        watch_dir.mkdir()
+        (watch_dir / "old.m4a").write_bytes(b"\0" * 10)
+        split = _RecordingSplit()
+        state = WatchState(str(tmp_path / "state.json"))
+        watcher = FolderWatcher(str(watch_dir), str(tmp_path / "out"), split, state, self._settings(use_inotify))
+
+        with _RunningWatcher(watcher):
+            assert _wait_until(lambda: len(split.calls) == 1)
+            new_path = watch_dir / "new.mp3"
+            with open(new_path, "wb") as f:
+                f.write(b"\0" * 10)
+                f.flush()
+                time.sleep(0.1)
+                f.write(b"\0" * 10)
+            assert _wait_until(lambda: len(split.calls) == 2)
+            time.sleep(0.3)
+
+        assert sorted(split.calls) == [str(new_path), str(watch_dir / "old.m4a")]
+        assert state.is_processed(str(new_path), 20, new_path.stat().st_mtime_ns)
+
+    def test_restart_skips_processed(self, tmp_path):
+        """再起動後は分割済みのファイルを分割し直さない"""
+        watch_dir = tmp_path / "in"
+        watch_dir.mkdir()
+        (watch_dir / "a.m4a").write_bytes(b"\0" * 10)
+        state_path = str(tmp_path / "state.json")
+        first = _RecordingSplit()
+        watcher = FolderWatcher(
+            str(watch_dir), str(tmp_path / "out"), first, WatchState(state_path), self._settings(False),
+        )
+        with _RunningWatcher(watcher):
+            assert _wait_until(lambda: len(first.calls) == 1)
+            time.sleep(0.1)
+
+        second = _RecordingSplit()
+        watcher = FolderWatcher(
+            str(watch_dir), str(tmp_path / "out"), second, WatchState(state_path), self._settings(False),
+        )
+        with _RunningWatcher(watcher):
+            time.sleep(0.5)
+
+        assert second.calls == []
+
+    def test_failure_recorded_and_cancel_not_recorded(self, tmp_path):
+        """失敗したファイルは記録して再試行せず、中止したファイルは記録しない"""
+        watch_dir = tmp_path / "in"
+        watch_dir.mkdir()
+        (watch_dir / "bad.m4a").write_bytes(b"\0" * 10)
+        (watch_dir / "stop.m4a").write_bytes(b"\0" * 10)
+
+        def split(file_path, output_dir, cancel_token):
+            if file_path.endswith("bad.m4a"):
+                raise RuntimeError("ffmpeg の実行に失敗しました")
+            raise SplitCancelledError("処理がキャンセルされました")
+
+        state = WatchState(str(tmp_path / "state.json"))
+        watcher = FolderWatcher(str(watch_dir), str(tmp_path / "out"), split, state, self._settings(False))
+        with _RunningWatcher(watcher):
+            assert _wait_until(lambda: state.is_processed(str(watch_dir / "bad.m4a"), 10,
+                                                         (watch_dir / "bad.m4a").stat().st_mtime_ns))
+            time.sleep(0.3)
+
+        assert not state.is_processed(str(watch_dir / "stop.m4a"), 10, (watch_dir / "stop.m4a").stat().st_mtime_ns)
+
+    def test_burst_bounded_concurrency(self, tmp_path, use_inotify):
+        """数百ファイルが一度に置かれても、全ファイルを1回ずつ max_jobs 個までの並列で分割する"""
+        watch_dir = tmp_path / "in"
+        watch_dir.mkdir()
+        split = _RecordingSplit(delay_s=0.001)
+        watcher = FolderWatcher(
+            str(watch_dir), str(tmp_path / "out"), split, WatchState(str(tmp_path / "state.json")),
+            self._settings(use_inotify, max_jobs=3),
+        )
+
+        with _RunningWatcher(watcher):
+            time.sleep(0.1)
+            for index in range(300):
+                (watch_dir / f"rec{index:03}.m4a").write_bytes(b"\0" * 10)
+            assert _wait_until(lambda: len(split.calls) >= 300, timeout_s=30)
+            time.sleep(0.3)
+
+        assert len(split.calls) == 300
+        assert len(set(split.calls)) == 300
+        assert split.max_running <= 3
+
+    def test_same_base_name_deferred(self, tmp_path, use_inotify):
+        """拡張子だけが違うファイルは出力を上書きし合わないよう、重なりが無くなるまで分割しない"""
+        watch_dir = tmp_path / "in"
+        watch_dir.mkdir()
+        split = _RecordingSplit()
+        messages = []
+        watcher = FolderWatcher(
+            str(watch_dir), str(tmp_path / "out"), split, WatchState(str(tmp_path / "state.json")),
+            self._settings(use_inotify), progress_callback=messages.append,
+        )
+
+        with _RunningWatcher(watcher):
+            time.sleep(0.1)
+            (watch_dir / "meeting.wav").write_bytes(b"\0" * 10)
+            (watch_dir / "meeting.m4a").write_bytes(b"\0" * 10)
+            (watch_dir / "other.mp3").write_bytes(b"\0" * 10)
+            assert _wait_until(lambda: len(split.calls) == 1)
+            assert _wait_until(lambda: sum("分割を保留します" in message for message in messages) == 2)
+            time.sleep(0.3)
+            assert split.calls == [str(watch_dir / "other.mp3")]
+
+            (watch_dir / "meeting.m4a").unlink()
+            assert _wait_until(lambda: len(split.calls) == 2)
+            time.sleep(0.3)
+
+        assert split.calls == [str(watch_dir / "other.mp3"), str(watch_dir / "meeting.wav")]
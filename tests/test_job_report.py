@@ -0,0 +1,60 @@
+import json
+import logging
+
+from service.job_report import ProcessTiming, SplitReport, SplitResult
+from utils.log_rotation import log_job_report
+
+
+def _report() -> SplitReport:
+    report = SplitReport("in.m4a", "parallel", 100 * 1024 * 1024, duration_s=600.0, strategy="copy")
+    report.processes = [ProcessTiming(0, 0.01, 2.0), ProcessTiming(1, 0.03, 2.0)]
+    report.split_s = 2.0
+    report.total_s = 3.0
+    return report
+
+
+class TestSplitReport:
+    """SplitReportクラスのテスト"""
+
+    def test_effective_parallelism(self):
+        """ffmpeg の実行時間の合計 / 分割処理の経過時間"""
+        assert _report().effective_parallelism == 2.0
+
+    def test_x_realtime(self):
+        assert _report().x_realtime == 200.0
+
+    def test_zero_time(self):
+        """時間が 0 の場合は 0 を返す"""
+        report = SplitReport("in.m4a", "parallel", 0)
+        assert report.effective_parallelism == 0.0
+        assert report.x_realtime == 0.0
+
+    def test_to_dict_is_json_serializable(self):
+        """ログに出力できるよう JSON に変換できる"""
+        data = json.loads(json.dumps(_report().to_dict()))
+        assert data["effective_parallelism"] == 2.0
+        assert data["spawn_s_total"] == 0.04
+        assert data["processes"][1] == {"index": 1, "spawn_s": 0.03, "run_s": 2.0}
+
+
+class TestSplitResult:
+    """SplitResultクラスのテスト"""
+
+    def test_behaves_as_list(self):
+        """従来どおり出力パスのリストとして扱える"""
+        report = _report()
+        result = SplitResult(["a.m4a", "b.m4a"], report)
+        assert result == ["a.m4a", "b.m4a"]
+        assert result.report is report
+
+
+class TestLogJobReport:
+    """log_job_report関数のテスト"""
+
+    def test_logs_json(self, caplog):
+        """performance ロガーに1行の JSON を出力する"""
+        with caplog.at_level(logging.INFO, logger="performance"):
+            log_job_report({"file_path": "音声.m4a", "total_s": 1.5})
+        record = caplog.records[-1]
+        assert record.name == "performance"
+        assert json.loads(record.getMessage()) == {"file_path": "音声.m4a", "total_s": 1.5}
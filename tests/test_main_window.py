@@ -4,6 +4,8 @@ from unittest.mock import Mock, patch
 import pytest
 
 from app.main_window import AudiofilesplitMainWindow
+from service.cancellation import CancellationToken, SplitCancelledError
+from service.progress_events import ChunkDone, ChunkProgress
 
 
 class ImmediateThread:
@@ -18,6 +20,13 @@ class ImmediateThread:
             self._target(*self._args)
 
 
+@pytest.fixture(autouse=True)
+def mock_discover_capabilities():
+    """ffmpeg の機能検出のモック(テスト環境に ffmpeg が無くても動くようにする)"""
+    with patch('app.main_window.discover_capabilities') as mock_discover:
+        yield mock_discover
+
+
 @pytest.fixture
 def mock_root():
     """Tkinterルートウィンドウのモック"""
@@ -596,3 +605,171 @@ class TestSplitErrorHandling:
         window._poll_progress_queue()
 
         mock_showerror.assert_called_once()
+
+
+class TestProgressEvents:
+    """進捗イベントの表示のテスト"""
+
+    @patch('app.progress_window.tk.Label')
+    @patch('app.progress_window.tk.Toplevel')
+    @patch('app.main_window.tk.Button')
+    @patch('app.main_window.load_config')
+    def test_chunk_progress_updates_detail(
+        self,
+        mock_load_config,
+        mock_button,
+        mock_toplevel,
+        mock_label,
+        mock_root,
+        mock_config
+    ):
+        """ChunkProgress はメインスレッドで進捗率・速度・残り時間の表示に反映する"""
+        mock_load_config.return_value = mock_config
+
+        window = AudiofilesplitMainWindow(mock_root)
+        window._show_progress_window()
+        # 完了まで再ポーリングし続けないよう、after は呼び出しを記録するだけにする
+        mock_root.after = Mock()
+        window._on_progress(ChunkProgress(0, 5.0, 42.34, 3.2, 83.0))
+        window._poll_progress_queue()
+
+        detail_label = mock_label.return_value
+        detail_label.config.assert_called_with(text="進捗: 42.3% / 速度: 3.20x / 残り: 1:23")
+
+    @patch('app.main_window.tk.Button')
+    @patch('app.main_window.load_config')
+    def test_other_events_not_queued(
+        self,
+        mock_load_config,
+        mock_button,
+        mock_root,
+        mock_config
+    ):
+        """表示に使わないイベントはキューに積まない(完了の表示はメッセージで行う)"""
+        mock_load_config.return_value = mock_config
+
+        window = AudiofilesplitMainWindow(mock_root)
+        window._on_progress(ChunkDone(0, "a_part1.mp3", 1, 2))
+
+        assert window._progress_queue.empty()
+
+
+class TestSplitCancellation:
+    """分割処理のキャンセルのテスト"""
+
+    @patch('app.main_window.tk.Button')
+    @patch('app.main_window.load_config')
+    @patch('app.main_window.messagebox.showerror')
+    @patch('app.main_window.messagebox.showinfo')
+    def test_on_split_error_cancelled(
+        self,
+        mock_showinfo,
+        mock_showerror,
+        mock_load_config,
+        mock_button,
+        mock_root,
+        mock_config
+    ):
+        """キャンセル時はエラーではなくキャンセルした旨を表示する"""
+        mock_load_config.return_value = mock_config
+
+        window = AudiofilesplitMainWindow(mock_root)
+        window._on_split_error(SplitCancelledError("処理がキャンセルされました"))
+
+        mock_showerror.assert_not_called()
+        mock_showinfo.assert_called_once()
+        assert "キャンセル" in mock_showinfo.call_args[0][1]
+
+    @patch('app.progress_window.tk.Label')
+    @patch('app.progress_window.tk.Toplevel')
+    @patch('app.main_window.tk.Button')
+    @patch('app.main_window.load_config')
+    def test_cancel_button_cancels_token(
+        self,
+        mock_load_config,
+        mock_button,
+        mock_toplevel,
+        mock_label,
+        mock_root,
+        mock_config
+    ):
+        """進捗ウィンドウのキャンセルボタンでトークンがキャンセルされる"""
+        mock_load_config.return_value = mock_config
+
+        window = AudiofilesplitMainWindow(mock_root)
+        window._cancel_token = CancellationToken()
+        window._show_progress_window()
+
+        cancel_command = mock_button.call_args.kwargs['command']
+        cancel_command()
+
+        assert window._cancel_token.cancelled
+        mock_label.return_value.config.assert_called_with(text="キャンセルしています...")
+
+
+class TestCapabilityCheck:
+    """ffmpeg の機能検出のテスト"""
+
+    @patch('app.main_window.threading.Thread', ImmediateThread)
+    @patch('app.main_window.tk.Button')
+    @patch('app.main_window.load_config')
+    @patch('app.main_window.messagebox.showerror')
+    def test_missing_ffmpeg_fails_before_file_selection(
+        self,
+        mock_showerror,
+        mock_load_config,
+        mock_button,
+        mock_root,
+        mock_config,
+        mock_discover_capabilities
+    ):
+        """起動時の検出で ffmpeg が無いと分かっていれば、ファイル選択の前にエラーを表示して調べ直す"""
+        mock_load_config.return_value = mock_config
+        mock_discover_capabilities.side_effect = RuntimeError("ffmpeg が見つかりません")
+
+        window = AudiofilesplitMainWindow(mock_root)
+        with patch.object(window, '_select_file') as mock_select_file:
+            window.split_audio_handler()
+
+        mock_select_file.assert_not_called()
+        mock_showerror.assert_called_once()
+        assert "ffmpeg が見つかりません" in mock_showerror.call_args[0][1]
+        assert mock_discover_capabilities.call_count == 2
+
+    @patch('app.progress_window.tk.Label')
+    @patch('app.progress_window.tk.Toplevel')
+    @patch('app.main_window.tk.Button')
+    @patch('app.main_window.load_config')
+    def test_discovery_runs_off_gui_thread(
+        self,
+        mock_load_config,
+        mock_button,
+        mock_toplevel,
+        mock_label,
+        mock_root,
+        mock_config,
+        mock_discover_capabilities
+    ):
+        """起動時の検出が終わっていなくても、ボタンの処理では ffmpeg を実行せず分割のスレッドで検出する"""
+        mock_load_config.return_value = mock_config
+        threads = []
+
+        def deferred_thread(target=None, args=(), daemon=None):
+            thread = Mock()
+            threads.append((target, args))
+            return thread
+
+        with patch('app.main_window.threading.Thread', side_effect=deferred_thread):
+            window = AudiofilesplitMainWindow(mock_root)
+            window._select_file = Mock(return_value="C:\\test\\audio.mp3")
+            mock_root.after = Mock()
+            with patch('app.main_window.os.path.exists', return_value=True):
+                window._process_split_audio()
+
+        mock_discover_capabilities.assert_not_called()
+        assert [target for target, _ in threads] == [window._discover_capabilities, window._run_split]
+        with patch('app.main_window.split_audio_file') as mock_split:
+            window._run_split(*threads[1][1])
+
+        mock_discover_capabilities.assert_called_once()
+        assert mock_split.call_args[1]['capabilities'] is mock_discover_capabilities.return_value
@@ -0,0 +1,83 @@
+import json
+
+from service.manifest import SplitManifest, _get_manifest_path, _input_fingerprint
+
+
+def _write(path, data: bytes) -> str:
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+def _manifest(tmp_path, chunks=((0.0, 10.0), (10.0, 10.0))):
+    return SplitManifest.create(
+        str(tmp_path / "a_manifest.json"), {"size": 1}, {"output_format": "m4a"}, list(chunks), True
+    )
+
+
+class TestInputFingerprint:
+    """_input_fingerprint関数のテスト"""
+
+    def test_changes_with_content(self, tmp_path):
+        """内容が変われば識別情報も変わる"""
+        path = _write(tmp_path / "a.mp3", b"a" * 100)
+        before = _input_fingerprint(path)
+        _write(tmp_path / "a.mp3", b"b" * 100)
+        assert _input_fingerprint(path)["sha256"] != before["sha256"]
+
+    def test_manifest_path(self, tmp_path):
+        """マニフェストは出力ディレクトリに置く"""
+        assert _get_manifest_path("/in/rec.mp3", "/out").endswith("rec_manifest.json")
+
+
+class TestSplitManifest:
+    """SplitManifestクラスのテスト"""
+
+    def test_save_and_load(self, tmp_path):
+        """保存した内容を読み込める"""
+        manifest = _manifest(tmp_path)
+        manifest.save()
+
+        loaded = SplitManifest.load(manifest.path)
+
+        assert loaded is not None
+        assert loaded.chunks == [(0.0, 10.0), (10.0, 10.0)]
+        assert loaded.stream_copy is True
+        assert loaded.matches({"size": 1}, {"output_format": "m4a"})
+        assert not loaded.matches({"size": 2}, {"output_format": "m4a"})
+
+    def test_load_broken_file(self, tmp_path):
+        """壊れたマニフェストは None"""
+        path = _write(tmp_path / "m.json", b"{not json")
+        assert SplitManifest.load(path) is None
+
+    def test_completed_chunks_verified(self, tmp_path):
+        """完了済みでも出力が欠けている・改変されているチャンクは含めない"""
+        manifest = _manifest(tmp_path, [(0.0, 1.0), (1.0, 1.0), (2.0, 1.0)])
+        paths = [_write(tmp_path / f"p{i}.m4a", b"x" * 10) for i in range(3)]
+        for index, path in enumerate(paths):
+            manifest.mark_done(index, path)
+
+        (tmp_path / "p1.m4a").unlink()
+        _write(tmp_path / "p2.m4a", b"y" * 10)
+
+        assert manifest.completed_chunks() == {0}
+        saved = json.loads((tmp_path / "a_manifest.json").read_text(encoding="utf-8"))
+        assert [chunk["status"] for chunk in saved["chunks"]] == ["done"] * 3
+
+    def test_rebuild(self, tmp_path):
+        """分け直した計画に置き換え、元のチャンクの記録は引き継ぎ、新しいチャンクは完了として記録する"""
+        manifest = _manifest(tmp_path)
+        first = _write(tmp_path / "a_part1.m4a", b"1" * 10)
+        manifest.mark_done(0, first)
+        recorded = dict(manifest.data["chunks"][0])
+        pieces = [_write(tmp_path / "p1.m4a", b"p" * 4), _write(tmp_path / "p2.m4a", b"q" * 5)]
+
+        manifest.rebuild([(0.0, 10.0), (10.0, 5.0), (15.0, 5.0)], [0, None, None], [first] + pieces)
+
+        loaded = SplitManifest.load(manifest.path)
+        assert loaded is not None
+        assert loaded.chunks == [(0.0, 10.0), (10.0, 5.0), (15.0, 5.0)]
+        assert loaded.data["chunks"][0]["sha256"] == recorded["sha256"]
+        assert [c["size"] for c in loaded.data["chunks"][1:]] == [4, 5]
+        assert loaded.completed_chunks() == {0, 1, 2}
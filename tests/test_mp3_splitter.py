@@ -0,0 +1,173 @@
+import os
+import struct
+from unittest.mock import patch
+
+from service.audio_splitter import split_audio_file
+from service.mp3_splitter import plan_mp3_chunks, read_mp3_chunk, read_mp3_info, write_mp3_chunk
+
+# MPEG1 Layer III 44.1kHz ステレオ、CRC 無し。ビットレートのインデックス → ヘッダ
+_HEADER_128K = 0xFFFB9000  # 417 バイト
+_HEADER_160K = 0xFFFBA000  # 522 バイト
+_HEADER_PADDED = 0xFFFB9200  # 128kbps + パディングで 418 バイト
+
+
+def _frame(header: int, fill: int) -> bytes:
+    length = {_HEADER_128K: 417, _HEADER_160K: 522, _HEADER_PADDED: 418}[header]
+    return struct.pack(">I", header) + bytes([fill]) * (length - 4)
+
+
+def _xing_frame() -> bytes:
+    frame = bytearray(_frame(_HEADER_128K, 0))
+    frame[36:40] = b"Xing"
+    return bytes(frame)
+
+
+def _write_mp3(path, headers: list[int], id3v2: bool = True, xing: bool = True, id3v1: bool = True) -> bytes:
+    audio = b"".join(_frame(header, i % 200) for i, header in enumerate(headers))
+    data = b""
+    if id3v2:
+        data += b"ID3\x03\x00\x00\x00\x00\x00\x14" + b"\0" * 20
+    if xing:
+        data += _xing_frame()
+    data += audio
+    if id3v1:
+        data += b"TAG" + b"\0" * 125
+    path.write_bytes(data)
+    return audio
+
+
+class TestReadMp3Info:
+    """read_mp3_info関数のテスト"""
+
+    def test_skips_tags_and_xing(self, tmp_path):
+        """ID3v2・Xing フレーム・ID3v1 を除いた音声フレームだけを数える"""
+        path = tmp_path / "a.mp3"
+        _write_mp3(path, [_HEADER_128K, _HEADER_PADDED] * 50)
+
+        info = read_mp3_info(str(path))
+
+        assert info is not None
+        assert info.frame_count == 100
+        assert info.frame_offsets[0] == 30 + 417
+        assert info.sample_rate == 44100
+        assert info.samples_per_frame == 1152
+        assert not info.vbr
+
+    def test_vbr(self, tmp_path):
+        path = tmp_path / "a.mp3"
+        _write_mp3(path, [_HEADER_128K, _HEADER_160K] * 50, id3v2=False, xing=False, id3v1=False)
+
+        info = read_mp3_info(str(path))
+
+        assert info is not None
+        assert info.frame_count == 100
+        assert info.vbr
+
+    def test_not_mp3(self, tmp_path):
+        path = tmp_path / "a.mp3"
+        path.write_bytes(b"\0" * 4096)
+        assert read_mp3_info(str(path)) is None
+
+    def test_mostly_garbage(self, tmp_path):
+        """先頭の数フレームの後が MP3 でなければ扱わない"""
+        path = tmp_path / "a.mp3"
+        path.write_bytes(_frame(_HEADER_128K, 1) * 3 + b"\0" * 100_000)
+        assert read_mp3_info(str(path)) is None
+
+
+class TestMp3Chunks:
+    """MP3 の分割計画と書き出しのテスト"""
+
+    def test_chunks_fit_target_and_reassemble(self, tmp_path):
+        """各チャンクは Xing フレームを含めて目標以下で、音声フレームをつなぐと入力と一致する"""
+        path = tmp_path / "a.mp3"
+        audio = _write_mp3(path, [_HEADER_128K, _HEADER_160K, _HEADER_PADDED] * 100)
+        info = read_mp3_info(str(path))
+        assert info is not None
+        target = 20_000
+
+        chunks = plan_mp3_chunks(info, target)
+
+        joined = b""
+        for index, (start_s, duration_s) in enumerate(chunks):
+            output_path = tmp_path / f"a_part{index + 1}.mp3"
+            write_mp3_chunk(str(path), str(output_path), info, start_s, duration_s)
+            data = output_path.read_bytes()
+            assert len(data) <= target
+            # 先頭は Xing フレーム(フレーム数とバイト数を持つ)
+            chunk_info = read_mp3_info(str(output_path))
+            assert chunk_info is not None
+            assert data[36:40] == b"Xing"
+            flags, frames, total = struct.unpack_from(">III", data, 40)
+            assert flags == 3
+            assert frames == chunk_info.frame_count
+            assert total == len(data)
+            joined += data[chunk_info.frame_offsets[0]:]
+
+        assert joined == audio
+        assert len(chunks) == len(audio) // target + 1
+
+    def test_cbr_writes_info_tag(self, tmp_path):
+        path = tmp_path / "a.mp3"
+        _write_mp3(path, [_HEADER_128K] * 100)
+        info = read_mp3_info(str(path))
+        assert info is not None
+        start_s, duration_s = plan_mp3_chunks(info, 10_000)[0]
+        output_path = tmp_path / "out.mp3"
+
+        write_mp3_chunk(str(path), str(output_path), info, start_s, duration_s)
+
+        assert output_path.read_bytes()[36:40] == b"Info"
+
+
+    def test_read_chunk_in_memory(self, tmp_path):
+        """read_mp3_chunk はファイルに書き出したチャンクと同じバイト列を返す"""
+        path = tmp_path / "a.mp3"
+        _write_mp3(path, [_HEADER_128K, _HEADER_160K] * 50)
+        info = read_mp3_info(str(path))
+        assert info is not None
+        start_s, duration_s = plan_mp3_chunks(info, 10_000)[1]
+        output_path = tmp_path / "out.mp3"
+
+        write_mp3_chunk(str(path), str(output_path), info, start_s, duration_s)
+
+        assert read_mp3_chunk(str(path), info, start_s, duration_s) == output_path.read_bytes()
+
+
+class TestSplitAudioFileNativeMp3:
+    """split_audio_file で MP3 を MP3 に分割するテスト"""
+
+    @patch("service.audio_splitter.log_job_report")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    def test_no_ffmpeg(self, mock_probe, mock_split_one, mock_log, tmp_path):
+        """ffprobe/ffmpeg を使わずにフレーム境界で分割する"""
+        path = tmp_path / "rec.mp3"
+        _write_mp3(path, [_HEADER_128K, _HEADER_160K] * 2000)
+
+        result = split_audio_file(str(path), str(tmp_path / "out"), target_chunk_size_mb=0.5, output_format="mp3")
+
+        mock_probe.assert_not_called()
+        mock_split_one.assert_not_called()
+        assert len(result) == 4
+        assert all(os.path.getsize(p) <= 0.5 * 1024 * 1024 for p in result)
+        assert result.report is not None
+        assert result.report.strategy == "native"
+
+    @patch("service.audio_splitter.log_job_report")
+    @patch("service.audio_splitter._find_quiet_points")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    def test_snap_to_silence_uses_ffmpeg(self, mock_probe, mock_split_one, mock_quiet, mock_log, tmp_path):
+        """無音区間に合わせる場合は従来どおり ffmpeg で分割する"""
+        path = tmp_path / "rec.mp3"
+        _write_mp3(path, [_HEADER_128K, _HEADER_160K] * 2000)
+        mock_probe.return_value = (104.0, "mp3")
+        mock_quiet.side_effect = lambda file_path, boundaries, *args, **kwargs: boundaries
+
+        split_audio_file(
+            str(path), str(tmp_path / "out"), target_chunk_size_mb=0.5, output_format="mp3", snap_to_silence=True,
+        )
+
+        mock_probe.assert_called_once()
+        assert mock_split_one.call_count > 0
@@ -0,0 +1,153 @@
+import configparser
+import os
+import time
+
+from service.output_cache import OutputCache, content_fingerprint, open_output_cache
+
+
+def _write_chunks(directory, name, sizes):
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for index, size in enumerate(sizes):
+        path = directory / f"{name}_part{index + 1}.m4a"
+        path.write_bytes(bytes([index + 1]) * size)
+        paths.append(str(path))
+    return paths
+
+
+class TestContentFingerprint:
+    """content_fingerprint関数のテスト"""
+
+    def test_same_content_different_path(self, tmp_path):
+        """パス・更新時刻が違っても内容が同じなら同じ指紋"""
+        data = os.urandom(5 * 1024 * 1024)
+        first = tmp_path / "a.m4a"
+        second = tmp_path / "sub" / "b.m4a"
+        second.parent.mkdir()
+        first.write_bytes(data)
+        second.write_bytes(data)
+        os.utime(second, ns=(0, 0))
+
+        assert content_fingerprint(str(first)) == content_fingerprint(str(second))
+
+    def test_detects_changes(self, tmp_path):
+        """先頭・末尾・サイズの変化で指紋が変わる"""
+        data = bytearray(os.urandom(5 * 1024 * 1024))
+        path = tmp_path / "a.m4a"
+        path.write_bytes(data)
+        original = content_fingerprint(str(path))
+
+        for changed in (b"\0" + bytes(data[1:]), bytes(data[:-1]) + b"\0", bytes(data) + b"\0"):
+            path.write_bytes(changed)
+            assert content_fingerprint(str(path)) != original
+
+    def test_small_file_hashes_everything(self, tmp_path):
+        """小さなファイルは全体のハッシュ"""
+        path = tmp_path / "a.m4a"
+        path.write_bytes(b"a" * 1000)
+        original = content_fingerprint(str(path))
+        path.write_bytes(b"a" * 500 + b"b" + b"a" * 499)
+
+        assert content_fingerprint(str(path)) != original
+
+
+class TestOutputCache:
+    """OutputCacheクラスのテスト"""
+
+    def test_store_and_restore(self, tmp_path):
+        """保存したチャンクを別の出力先へ、データを共有しない複製で出力する"""
+        cache = OutputCache(str(tmp_path / "cache"))
+        outputs = _write_chunks(tmp_path / "out1", "rec", [10, 20])
+        cache.store("key", outputs)
+
+        out2 = tmp_path / "out2"
+        restored = cache.restore("key", lambda index: str(out2 / f"copy_part{index + 1}.m4a"))
+
+        assert restored is not None
+        assert restored == [str(out2 / "copy_part1.m4a"), str(out2 / "copy_part2.m4a")]
+        assert (out2 / "copy_part2.m4a").read_bytes() == b"\2" * 20
+        assert os.stat(restored[0]).st_ino != os.stat(outputs[0]).st_ino
+
+    def test_overwritten_outputs_leave_cache_unchanged(self, tmp_path):
+        """保存元・出力先のチャンクをその場で書き換えても(ffmpeg -y など)、キャッシュと他の出力先は変わらない"""
+        cache = OutputCache(str(tmp_path / "cache"))
+        outputs = _write_chunks(tmp_path / "out1", "rec", [10])
+        cache.store("key", outputs)
+        restored = cache.restore("key", lambda index: str(tmp_path / "out2" / f"{index}.m4a"))
+        assert restored is not None
+
+        for path in (outputs[0], restored[0]):
+            with open(path, "wb") as f:
+                f.write(b"changed!!!")
+
+        again = cache.restore("key", lambda index: str(tmp_path / "out3" / f"{index}.m4a"))
+        assert again is not None
+        assert (tmp_path / "out3" / "0.m4a").read_bytes() == b"\1" * 10
+
+    def test_miss(self, tmp_path):
+        """キャッシュに無いキーは None"""
+        cache = OutputCache(str(tmp_path / "cache"))
+
+        assert cache.restore("missing", lambda index: str(tmp_path / f"{index}.m4a")) is None
+
+    def test_modified_entry_invalidates(self, tmp_path):
+        """キャッシュ内のチャンクが直接書き換えられたエントリは使わずに削除する"""
+        cache = OutputCache(str(tmp_path / "cache"))
+        outputs = _write_chunks(tmp_path / "out1", "rec", [10])
+        cache.store("key", outputs)
+        time.sleep(0.01)
+        cached_path = tmp_path / "cache" / "outputs" / "key" / "00000.m4a"
+        cached_path.write_bytes(b"changed")
+
+        assert cache.restore("key", lambda index: str(tmp_path / "out2" / f"{index}.m4a")) is None
+        assert not (tmp_path / "cache" / "outputs" / "key").exists()
+
+    def test_lru_eviction(self, tmp_path):
+        """合計サイズが上限を超えたら最後に使われた時刻が古いものから削除する"""
+        cache = OutputCache(str(tmp_path / "cache"), max_bytes=250)
+        cache.store("a", _write_chunks(tmp_path / "a", "a", [100]))
+        time.sleep(0.01)
+        cache.store("b", _write_chunks(tmp_path / "b", "b", [100]))
+        time.sleep(0.01)
+        assert cache.restore("a", lambda index: str(tmp_path / "ra" / f"{index}.m4a")) is not None
+        time.sleep(0.01)
+        cache.store("c", _write_chunks(tmp_path / "c", "c", [100]))
+
+        def path_for(index):
+            return str(tmp_path / "r" / f"{index}.m4a")
+
+        assert cache.restore("a", path_for) is not None
+        assert cache.restore("b", path_for) is None
+        assert cache.restore("c", path_for) is not None
+
+    def test_larger_than_cap_not_stored(self, tmp_path):
+        """上限より大きな結果は保存しない"""
+        cache = OutputCache(str(tmp_path / "cache"), max_bytes=50)
+        cache.store("key", _write_chunks(tmp_path / "out", "rec", [100]))
+
+        assert cache.restore("key", lambda index: str(tmp_path / f"{index}.m4a")) is None
+
+
+class TestOpenOutputCache:
+    """open_output_cache関数のテスト"""
+
+    def test_disabled(self):
+        """output_cache_enabled が False・未設定なら None"""
+        config = configparser.ConfigParser()
+        config.read_dict({"Cache": {"output_cache_enabled": "False"}})
+
+        assert open_output_cache(config) is None
+        assert open_output_cache(configparser.ConfigParser()) is None
+
+    def test_settings(self, tmp_path):
+        """キャッシュディレクトリと上限を設定から読む"""
+        config = configparser.ConfigParser()
+        config.read_dict({"Cache": {
+            "output_cache_enabled": "True", "cache_directory": str(tmp_path), "output_cache_max_mb": "1",
+        }})
+
+        cache = open_output_cache(config)
+
+        assert cache is not None
+        assert cache.directory == str(tmp_path)
+        assert cache.max_bytes == 1024 * 1024
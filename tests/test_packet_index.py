@@ -0,0 +1,119 @@
+import os
+from array import array
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from service.audio_splitter import split_audio_file
+from service.packet_index import build_packet_index, open_packet_index, packet_index_path
+
+
+def _records(count: int = 100):
+    times = array("d", [i * 0.026 for i in range(count)])
+    sizes = array("q", [400 + i % 7 for i in range(count)])
+    positions = array("q", [1000 + 410 * i for i in range(count)])
+    keyframes = array("B", [1] * count)
+    return times, sizes, positions, keyframes
+
+
+@pytest.fixture
+def audio(tmp_path):
+    path = tmp_path / "rec.mp3"
+    path.write_bytes(b"a" * 4096)
+    return path
+
+
+class TestPacketIndex:
+    """パケットインデックスの作成・読み込みのテスト"""
+
+    @patch("service.packet_index._probe_packet_records")
+    def test_build_and_reopen(self, mock_probe, audio, tmp_path):
+        """作成したインデックスをメモリマップで開き直せる"""
+        mock_probe.return_value = _records()
+        index_dir = str(tmp_path / "index")
+
+        built = build_packet_index(str(audio), index_dir, 2.6, "mp3")
+        reopened = open_packet_index(str(audio), index_dir)
+
+        assert reopened is not None
+        assert isinstance(reopened.records, np.memmap)
+        assert len(reopened) == 100
+        assert reopened.duration_s == 2.6
+        assert reopened.codec == "mp3"
+        np.testing.assert_array_equal(reopened.times, built.times)
+        np.testing.assert_array_equal(reopened.sizes, built.sizes)
+        assert reopened.positions[1] == 1410
+        assert reopened.keyframes.all()
+
+    def test_missing_index(self, audio, tmp_path):
+        assert open_packet_index(str(audio), str(tmp_path / "index")) is None
+
+    @patch("service.packet_index._probe_packet_records")
+    def test_stale_index_ignored(self, mock_probe, audio, tmp_path):
+        """入力が変更されたらインデックスを使わない"""
+        mock_probe.return_value = _records()
+        index_dir = str(tmp_path / "index")
+        build_packet_index(str(audio), index_dir, 2.6, "mp3")
+
+        audio.write_bytes(b"b" * 8192)
+
+        assert open_packet_index(str(audio), index_dir) is None
+
+    @patch("service.packet_index._probe_packet_records")
+    def test_truncated_index_ignored(self, mock_probe, audio, tmp_path):
+        """途中で切れたインデックスは使わない"""
+        mock_probe.return_value = _records()
+        index_dir = str(tmp_path / "index")
+        path = build_packet_index(str(audio), index_dir, 2.6, "mp3").path
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) - 10)
+
+        assert open_packet_index(str(audio), index_dir) is None
+
+    def test_path_is_unique_per_input(self, tmp_path):
+        """別ディレクトリの同名ファイルは別のインデックスになる"""
+        first = packet_index_path(str(tmp_path / "a" / "rec.mp3"), str(tmp_path))
+        second = packet_index_path(str(tmp_path / "b" / "rec.mp3"), str(tmp_path))
+        assert first != second
+        assert os.path.basename(first).startswith("rec.mp3.")
+
+
+class TestSplitWithPacketIndex:
+    """split_audio_file の packet_index_dir 引数のテスト"""
+
+    @patch("service.audio_splitter.log_job_report")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.packet_index._probe_packet_records")
+    @patch("service.audio_splitter._probe_audio")
+    def test_second_plan_skips_ffprobe(
+        self, mock_probe_audio, mock_probe_records, mock_split_one, mock_log, tmp_path,
+    ):
+        """2回目以降は目標サイズを変えても ffprobe を実行せずにインデックスから計画する"""
+        audio = tmp_path / "rec.mp3"
+        audio.write_bytes(b"a" * (3 * 1024 * 1024))
+        mock_probe_audio.return_value = (100.0, "mp3")
+        count = 1000
+        mock_probe_records.return_value = (
+            array("d", [i * 0.1 for i in range(count)]),
+            array("q", [3 * 1024 * 1024 // count] * count),
+            array("q", range(count)),
+            array("B", [1] * count),
+        )
+        index_dir = str(tmp_path / "index")
+
+        first = split_audio_file(
+            str(audio), str(tmp_path / "out1"), target_chunk_size_mb=1.0, output_format="mp3",
+            byte_accurate=True, packet_index_dir=index_dir,
+        )
+        second = split_audio_file(
+            str(audio), str(tmp_path / "out2"), target_chunk_size_mb=0.5, output_format="mp3",
+            byte_accurate=True, packet_index_dir=index_dir,
+        )
+
+        assert mock_probe_audio.call_count == 1
+        assert mock_probe_records.call_count == 1
+        assert len(first) == 4
+        assert len(second) == 7
+        assert second.report is not None
+        assert second.report.bytes_read == second.report.input_bytes
@@ -0,0 +1,76 @@
+import configparser
+import os
+from unittest.mock import Mock
+
+from service.probe_cache import ProbeCache, open_probe_cache
+
+
+def _write(path, data: bytes) -> str:
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+class TestProbeCache:
+    """ProbeCacheクラスのテスト"""
+
+    def test_miss_then_hit(self, tmp_path):
+        """初回は probe を実行し、2回目はキャッシュから返す"""
+        audio = _write(tmp_path / "a.mp3", b"x" * 10)
+        cache = ProbeCache(str(tmp_path / "cache" / "probe.sqlite3"))
+        probe = Mock(return_value=[12.5, "mp3"])
+
+        assert cache.get_or_probe(audio, "audio", probe) == [12.5, "mp3"]
+        assert cache.get_or_probe(audio, "audio", probe) == [12.5, "mp3"]
+        probe.assert_called_once()
+
+    def test_modified_file_is_reprobed(self, tmp_path):
+        """サイズや更新時刻が変わったファイルは再度 probe する"""
+        audio = _write(tmp_path / "a.mp3", b"x" * 10)
+        cache = ProbeCache(str(tmp_path / "probe.sqlite3"))
+        cache.put(audio, "audio", [1.0, "mp3"])
+
+        _write(tmp_path / "a.mp3", b"x" * 20)
+        assert cache.get(audio, "audio") is None
+
+    def test_lru_eviction(self, tmp_path):
+        """上限を超えると最後に使われた時刻が古いものから削除する"""
+        files = [_write(tmp_path / f"{i}.mp3", b"x") for i in range(3)]
+        cache = ProbeCache(str(tmp_path / "probe.sqlite3"), max_bytes=60)
+        value = "v" * 20  # JSON で 22 バイト
+
+        cache.put(files[0], "audio", value)
+        cache.put(files[1], "audio", value)
+        cache.get(files[0], "audio")
+        cache.put(files[2], "audio", value)
+
+        assert cache.get(files[0], "audio") == value
+        assert cache.get(files[1], "audio") is None
+        assert cache.get(files[2], "audio") == value
+
+    def test_broken_cache_falls_back_to_probe(self, tmp_path):
+        """キャッシュが使えない場合も probe の結果を返す"""
+        audio = _write(tmp_path / "a.mp3", b"x")
+        _write(tmp_path / "blocker", b"")
+        cache = ProbeCache(str(tmp_path / "blocker" / "probe.sqlite3"))
+
+        assert cache.get_or_probe(audio, "audio", lambda: [3.0, "aac"]) == [3.0, "aac"]
+
+
+class TestOpenProbeCache:
+    """open_probe_cache関数のテスト"""
+
+    def test_disabled(self):
+        """無効化されている場合は None"""
+        config = configparser.ConfigParser()
+        config.read_dict({"Cache": {"probe_cache_enabled": "False"}})
+        assert open_probe_cache(config) is None
+
+    def test_settings(self, tmp_path):
+        """保存先と上限サイズを設定から読む"""
+        config = configparser.ConfigParser()
+        config.read_dict({"Cache": {"cache_directory": str(tmp_path), "probe_cache_max_mb": "2"}})
+        cache = open_probe_cache(config)
+        assert cache is not None
+        assert cache.db_path == os.path.join(str(tmp_path), "probe_cache.sqlite3")
+        assert cache.max_bytes == 2 * 1024 * 1024
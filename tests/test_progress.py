@@ -0,0 +1,119 @@
+import pytest
+
+from service.progress import ProgressTracker, _format_eta, format_progress
+from service.progress_events import ChunkProgress
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _tracker(durations, completed=(), interval_s=0.5):
+    clock = FakeClock()
+    messages: list[str] = []
+    tracker = ProgressTracker(durations, messages.append, completed, interval_s=interval_s, clock=clock)
+    return tracker, clock, messages
+
+
+class TestFormatEta:
+    """_format_eta関数のテスト"""
+
+    def test_minutes(self):
+        assert _format_eta(83.4) == "1:23"
+
+    def test_hours(self):
+        assert _format_eta(3725) == "1:02:05"
+
+
+class TestProgressTracker:
+    """ProgressTrackerクラスのテスト"""
+
+    def test_combines_running_chunks(self):
+        """実行中のチャンクの出力済み時間と速度を合計する"""
+        tracker, _, messages = _tracker([100.0, 100.0])
+        tracker.update(0, 50.0, 2.0)
+        tracker.update(1, 30.0, 3.0)
+
+        percent, speed, eta_s = tracker.snapshot()
+
+        assert percent == 40.0
+        assert speed == 5.0
+        assert eta_s == 24.0
+        assert messages == ["進捗: 25.0% / 速度: 2.00x / 残り: 1:15"]
+
+    def test_throttles_notifications(self):
+        """通知は interval_s 秒に1回までにする"""
+        tracker, clock, messages = _tracker([100.0])
+        tracker.update(0, 10.0, 1.0)
+        clock.now = 0.2
+        tracker.update(0, 20.0, 1.0)
+        clock.now = 0.6
+        tracker.update(0, 30.0, 1.0)
+
+        assert len(messages) == 2
+        assert messages[-1].startswith("進捗: 30.0%")
+
+    def test_finished_chunk_speed_removed(self):
+        """完了したチャンクは速度の合計から外し、開始からの平均で残り時間を求める"""
+        tracker, clock, _ = _tracker([100.0, 100.0])
+        tracker.update(0, 90.0, 10.0)
+        clock.now = 10.0
+        tracker.finish(0)
+
+        percent, speed, eta_s = tracker.snapshot()
+
+        assert percent == 50.0
+        assert speed == 10.0
+        assert eta_s == 10.0
+
+    def test_stalled_chunk_reports_zero_speed(self):
+        """止まっている ffmpeg は速度 0 として表示し、残り時間は出さない"""
+        tracker, _, messages = _tracker([100.0])
+        tracker.update(0, 10.0, 0.0)
+
+        assert messages == ["進捗: 10.0% / 速度: 0.00x"]
+
+    def test_resumed_chunks_count_as_done(self):
+        """再開時に完了済みのチャンクは最初から進捗に含める"""
+        tracker, _, _ = _tracker([60.0, 40.0], completed=[0])
+
+        percent, speed, eta_s = tracker.snapshot()
+
+        assert percent == 60.0
+        assert speed is None
+        assert eta_s is None
+
+    def test_clamps_to_chunk_duration(self):
+        """ffmpeg がチャンク長を超える時間を報告しても 100% を超えない"""
+        tracker, _, _ = _tracker([10.0])
+        tracker.update(0, 10.5, 1.0)
+
+        assert tracker.snapshot()[0] == 100.0
+
+    def test_on_event_receives_every_update(self):
+        """on_event にはテキストの間引きと関係なく、更新のたびに ChunkProgress を渡す"""
+        clock = FakeClock()
+        events: list[ChunkProgress] = []
+        tracker = ProgressTracker([10.0, 10.0], None, clock=clock, on_event=events.append)
+        clock.now = 1.0
+        tracker.update(0, 5.0, 2.0)
+        tracker.update(1, 5.0, 2.0)
+
+        assert [event.index for event in events] == [0, 1]
+        assert events[-1].percent == pytest.approx(50.0)
+        assert events[-1].speed == pytest.approx(4.0)
+        assert events[-1].eta_s == pytest.approx(2.5)
+
+
+class TestFormatProgress:
+    """format_progress関数のテスト"""
+
+    def test_all_values(self):
+        assert format_progress(42.34, 3.2, 83) == "進捗: 42.3% / 速度: 3.20x / 残り: 1:23"
+
+    def test_unknown_values_omitted(self):
+        assert format_progress(0.0, None, None) == "進捗: 0.0%"
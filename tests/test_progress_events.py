@@ -0,0 +1,116 @@
+import threading
+import time
+
+from service.progress_events import (
+    ChunkDone,
+    ChunkProgress,
+    ChunkStarted,
+    JobDone,
+    JobStarted,
+    ProgressDispatcher,
+)
+
+
+def _progress(out_time_s: float) -> ChunkProgress:
+    return ChunkProgress(0, out_time_s, out_time_s, 1.0, None)
+
+
+class TestProgressDispatcher:
+    """ProgressDispatcherクラスのテスト"""
+
+    def test_delivers_in_order(self):
+        """イベントを積まれた順に届ける"""
+        received = []
+        dispatcher = ProgressDispatcher(received.append)
+        events = [
+            JobStarted("a.mp3", 2, 20.0, True),
+            ChunkStarted(0, 0.0, 10.0),
+            ChunkDone(0, "a_part1.mp3", 1, 2),
+            JobDone(2, 1.0, 20.0),
+        ]
+        for event in events:
+            dispatcher.emit(event)
+        dispatcher.close()
+
+        assert received == events
+
+    def test_coalesces_progress_while_consumer_busy(self):
+        """callback の処理中に続けて積まれた ChunkProgress は最新のものだけを届ける"""
+        received = []
+        release = threading.Event()
+
+        def callback(event):
+            release.wait()
+            received.append(event)
+
+        dispatcher = ProgressDispatcher(callback)
+        dispatcher.emit(ChunkStarted(0, 0.0, 10.0))
+        for out_time_s in range(1, 6):
+            dispatcher.emit(_progress(float(out_time_s)))
+        dispatcher.emit(ChunkDone(0, "a_part1.mp3", 1, 1))
+        release.set()
+        dispatcher.close()
+
+        assert received == [ChunkStarted(0, 0.0, 10.0), _progress(5.0), ChunkDone(0, "a_part1.mp3", 1, 1)]
+
+    def test_progress_not_coalesced_across_other_events(self):
+        """間に別のイベントがある ChunkProgress は間引かない"""
+        received = []
+        release = threading.Event()
+
+        def callback(event):
+            release.wait()
+            received.append(event)
+
+        dispatcher = ProgressDispatcher(callback)
+        dispatcher.emit(ChunkStarted(0, 0.0, 10.0))
+        dispatcher.emit(_progress(1.0))
+        dispatcher.emit(ChunkStarted(1, 10.0, 10.0))
+        dispatcher.emit(_progress(2.0))
+        release.set()
+        dispatcher.close()
+
+        assert received == [ChunkStarted(0, 0.0, 10.0), _progress(1.0), ChunkStarted(1, 10.0, 10.0), _progress(2.0)]
+
+    def test_emit_does_not_wait_for_slow_consumer(self):
+        """callback が遅くても emit はすぐに戻る"""
+        release = threading.Event()
+
+        def slow_callback(event):
+            release.wait()
+
+        dispatcher = ProgressDispatcher(slow_callback)
+
+        started = time.perf_counter()
+        for out_time_s in range(1000):
+            dispatcher.emit(_progress(float(out_time_s)))
+        elapsed = time.perf_counter() - started
+        release.set()
+        dispatcher.close()
+
+        assert elapsed < 1.0
+
+    def test_callback_error_does_not_stop_delivery(self):
+        """callback の例外はログに出し、後続のイベントは届ける"""
+        received = []
+
+        def callback(event):
+            if isinstance(event, ChunkStarted):
+                raise ValueError("boom")
+            received.append(event)
+
+        dispatcher = ProgressDispatcher(callback)
+        dispatcher.emit(ChunkStarted(0, 0.0, 10.0))
+        dispatcher.emit(JobDone(1, 1.0, 10.0))
+        dispatcher.close()
+
+        assert received == [JobDone(1, 1.0, 10.0)]
+
+    def test_emit_after_close_ignored(self):
+        """close 後の emit は無視する"""
+        received = []
+        dispatcher = ProgressDispatcher(received.append)
+        dispatcher.close()
+        dispatcher.emit(JobDone(0, 0.0, 0.0))
+
+        assert received == []
@@ -0,0 +1,91 @@
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from service.silence_detector import _SAMPLE_RATE, _block_levels_db, _choose_quiet_point, _find_quiet_points
+
+
+def _pcm(segments: list[tuple[float, float]]) -> bytes:
+    """(秒数, 振幅) の列から 16bit PCM を生成"""
+    parts = []
+    for seconds, amplitude in segments:
+        t = np.arange(int(seconds * _SAMPLE_RATE)) / _SAMPLE_RATE
+        parts.append((amplitude * 32767 * np.sin(2 * np.pi * 440 * t)).astype("<i2"))
+    return np.concatenate(parts).tobytes()
+
+
+def _chunked(data: bytes, size: int):
+    for offset in range(0, len(data), size):
+        yield data[offset:offset + size]
+
+
+class TestBlockLevelsDb:
+    """_block_levels_db関数のテスト"""
+
+    def test_silence_and_full_scale(self):
+        """無音は非常に低く、フルスケールの正弦波は約 -3dBFS"""
+        levels = _block_levels_db(_pcm([(0.1, 0.0), (0.1, 1.0)]), 400)
+        assert len(levels) == 4
+        assert levels[0] < -150
+        assert levels[3] == pytest.approx(-3.0, abs=0.1)
+
+    def test_partial_block_is_dropped(self):
+        """端数のサンプルはブロックに含めない"""
+        assert len(_block_levels_db(b"\x00\x00" * 401, 400)) == 1
+
+
+class TestChooseQuietPoint:
+    """_choose_quiet_point関数のテスト"""
+
+    def test_nearest_quiet_block(self):
+        """無音ブロックが複数あれば元の位置に最も近いものを選ぶ"""
+        levels = np.array([-60.0, -10.0, -10.0, -10.0, -60.0, -10.0])
+        assert _choose_quiet_point(levels, 0.0, 3.9, 1.0, -40.0) == 4.5
+
+    def test_quietest_when_no_silence(self):
+        """無音が無ければ最もレベルの低いブロックを選ぶ"""
+        levels = np.array([-10.0, -20.0, -15.0])
+        assert _choose_quiet_point(levels, 10.0, 11.0, 1.0, -40.0) == 11.5
+
+
+class TestFindQuietPoints:
+    """_find_quiet_points関数のテスト"""
+
+    @patch("service.silence_detector._iter_pcm")
+    def test_moves_to_gap(self, mock_iter):
+        """分割位置を近くの無音区間へ移す"""
+        audio = _pcm([(12.0, 0.5), (1.0, 0.0), (7.0, 0.5)])
+        mock_iter.side_effect = lambda path, rate, size, *args: _chunked(audio, size)
+
+        points = _find_quiet_points("in.wav", [10.0], tolerance_s=5.0)
+
+        assert 12.0 <= points[0] <= 13.0
+
+    @patch("service.silence_detector._iter_pcm")
+    def test_stops_reading_after_last_window(self, mock_iter):
+        """最後の探索範囲を読み終えたらデコードを打ち切る"""
+        audio = _pcm([(60.0, 0.5)])
+        reads: list[int] = []
+
+        def fake_iter(path, rate, size, *args):
+            for data in _chunked(audio, 4000):
+                reads.append(len(data))
+                yield data
+        mock_iter.side_effect = fake_iter
+
+        _find_quiet_points("in.wav", [5.0], tolerance_s=1.0)
+
+        assert sum(reads) < len(audio)
+
+    @patch("service.silence_detector._iter_pcm")
+    def test_boundary_past_end_is_kept(self, mock_iter):
+        """音声の終端より後ろの分割位置はそのまま"""
+        audio = _pcm([(2.0, 0.5)])
+        mock_iter.side_effect = lambda path, rate, size, *args: _chunked(audio, size)
+
+        assert _find_quiet_points("in.wav", [100.0], tolerance_s=1.0) == [100.0]
+
+    def test_no_boundaries(self):
+        """分割位置が無ければデコードしない"""
+        assert _find_quiet_points("in.wav", [], tolerance_s=1.0) == []
@@ -0,0 +1,202 @@
+import os
+import struct
+import wave
+from unittest.mock import patch
+
+import pytest
+
+from service.audio_splitter import split_audio_file
+from service.wav_splitter import (
+    _wav_header,
+    fix_streamed_wav,
+    plan_wav_chunks,
+    read_wav_chunk,
+    read_wav_info,
+    write_wav_chunk,
+)
+
+
+def _write_wav(path, frames: int, sample_rate: int = 8000, channels: int = 2) -> bytes:
+    data = bytes((i * 7) % 256 for i in range(frames * channels * 2))
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(data)
+    return data
+
+
+def _read_frames(path) -> bytes:
+    with wave.open(str(path), "rb") as w:
+        return w.readframes(w.getnframes())
+
+
+class TestReadWavInfo:
+    """read_wav_info関数のテスト"""
+
+    def test_pcm_wav(self, tmp_path):
+        path = tmp_path / "a.wav"
+        _write_wav(path, 8000)
+
+        info = read_wav_info(str(path))
+
+        assert info is not None
+        assert info.sample_rate == 8000
+        assert info.block_align == 4
+        assert info.data_offset == 44
+        assert info.total_frames == 8000
+        assert info.duration_s == 1.0
+
+    def test_rf64(self, tmp_path):
+        """RF64 のデータサイズは ds64 チャンクから読む"""
+        fmt = struct.pack("<HHIIHH", 1, 1, 8000, 16000, 2, 16)
+        data = b"\x01\x00" * 100
+        path = tmp_path / "a.wav"
+        path.write_bytes(
+            b"RF64" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+            + b"ds64" + struct.pack("<IQQQI", 28, 0, len(data), 100, 0)
+            + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+            + b"data" + struct.pack("<I", 0xFFFFFFFF) + data
+        )
+
+        info = read_wav_info(str(path))
+
+        assert info is not None
+        assert info.data_size == len(data)
+        assert info.total_frames == 100
+
+    def test_not_wav(self, tmp_path):
+        path = tmp_path / "a.wav"
+        path.write_bytes(b"ID3" + b"\0" * 100)
+        assert read_wav_info(str(path)) is None
+
+    def test_compressed_wav(self, tmp_path):
+        """PCM 以外(ここでは μ-law)は ffmpeg に任せる"""
+        fmt = struct.pack("<HHIIHH", 7, 1, 8000, 8000, 1, 8)
+        path = tmp_path / "a.wav"
+        path.write_bytes(
+            b"RIFF" + struct.pack("<I", 36 + 10) + b"WAVE"
+            + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data" + struct.pack("<I", 10) + b"\0" * 10
+        )
+        assert read_wav_info(str(path)) is None
+
+
+class TestWavHeader:
+    """_wav_header関数のテスト"""
+
+    def test_rf64_over_4gb(self):
+        """4GB を超えるデータは RF64 ヘッダにする"""
+        fmt = struct.pack("<HHIIHH", 1, 2, 48000, 192000, 4, 16)
+        header = _wav_header(fmt, 5 * 1024 ** 3)
+        assert header[:4] == b"RF64"
+        assert header[12:16] == b"ds64"
+        assert struct.unpack_from("<Q", header, 28)[0] == 5 * 1024 ** 3
+
+    def test_riff_under_4gb(self):
+        fmt = struct.pack("<HHIIHH", 1, 2, 48000, 192000, 4, 16)
+        assert _wav_header(fmt, 1000)[:4] == b"RIFF"
+
+
+class TestPlanWavChunks:
+    """plan_wav_chunks関数のテスト"""
+
+    def test_chunks_fit_target(self, tmp_path):
+        """ヘッダを含めて目標サイズ以下になり、サンプル境界で分かれる"""
+        path = tmp_path / "a.wav"
+        _write_wav(path, 10_000)
+        info = read_wav_info(str(path))
+        assert info is not None
+
+        chunks = plan_wav_chunks(info, 10_000)
+
+        frames = [round(duration_s * info.sample_rate) for _, duration_s in chunks]
+        assert sum(frames) == 10_000
+        assert all(44 + f * info.block_align <= 10_000 for f in frames)
+        assert max(frames) - min(frames) <= 1
+
+
+class TestWriteWavChunk:
+    """write_wav_chunk関数のテスト"""
+
+    @pytest.mark.parametrize("copy_method", ["native", "mmap"])
+    def test_chunks_reassemble_input(self, tmp_path, monkeypatch, copy_method):
+        """出力チャンクの音声データをつなぐと入力と一致する(コピー方法によらない)"""
+        if copy_method == "mmap":
+            monkeypatch.delattr(os, "copy_file_range", raising=False)
+            monkeypatch.delattr(os, "sendfile", raising=False)
+        path = tmp_path / "a.wav"
+        data = _write_wav(path, 10_001)
+        info = read_wav_info(str(path))
+        assert info is not None
+
+        joined = b""
+        for index, (start_s, duration_s) in enumerate(plan_wav_chunks(info, 10_000)):
+            output_path = tmp_path / f"a_part{index + 1}.wav"
+            write_wav_chunk(str(path), str(output_path), info, start_s, duration_s)
+            assert os.path.getsize(output_path) <= 10_000
+            joined += _read_frames(output_path)
+
+        assert joined == data
+
+
+class TestReadWavChunk:
+    """read_wav_chunk・fix_streamed_wav関数のテスト"""
+
+    def test_same_as_written_chunk(self, tmp_path):
+        """ファイルに書き出したチャンクと同じバイト列を返す"""
+        path = tmp_path / "in.wav"
+        _write_wav(path, 10_001)
+        info = read_wav_info(str(path))
+        assert info is not None
+        write_wav_chunk(str(path), str(tmp_path / "out.wav"), info, 0.25, 0.5)
+        assert read_wav_chunk(str(path), info, 0.25, 0.5) == (tmp_path / "out.wav").read_bytes()
+
+    def test_fix_streamed_sizes(self, tmp_path):
+        """パイプ出力の仮のサイズを実際の長さに書き換える"""
+        path = tmp_path / "in.wav"
+        frames = _write_wav(path, 1000)
+        data = bytearray(path.read_bytes())
+        struct.pack_into("<I", data, 4, 0xFFFFFFFF)
+        struct.pack_into("<I", data, 40, 0xFFFFFFFF)
+
+        fix_streamed_wav(data)
+
+        (tmp_path / "fixed.wav").write_bytes(data)
+        assert _read_frames(tmp_path / "fixed.wav") == frames
+
+
+class TestSplitAudioFileNativeWav:
+    """split_audio_file で PCM WAV を WAV に分割するテスト"""
+
+    @patch("service.audio_splitter.log_job_report")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    def test_no_ffmpeg(self, mock_probe, mock_split_one, mock_log, tmp_path):
+        """ffprobe/ffmpeg を使わずに分割する"""
+        path = tmp_path / "rec.wav"
+        data = _write_wav(path, 300_000, sample_rate=44100)
+
+        result = split_audio_file(
+            str(path), str(tmp_path / "out"), target_chunk_size_mb=0.5, output_format="wav", max_workers=2,
+        )
+
+        mock_probe.assert_not_called()
+        mock_split_one.assert_not_called()
+        assert len(result) == 3
+        assert b"".join(_read_frames(p) for p in result) == data
+        assert result.report is not None
+        assert result.report.strategy == "native"
+
+    @patch("service.audio_splitter.log_job_report")
+    @patch("service.audio_splitter._split_one_chunk_async")
+    @patch("service.audio_splitter._probe_audio")
+    def test_other_format_uses_ffmpeg(self, mock_probe, mock_split_one, mock_log, tmp_path):
+        """WAV 以外への変換は従来どおり ffmpeg で行い、チャンク数は再エンコード後のビットレートから決める"""
+        path = tmp_path / "rec.wav"
+        _write_wav(path, 300_000, sample_rate=44100)
+        mock_probe.return_value = (300_000 / 44100, "pcm_s16le")
+
+        split_audio_file(str(path), str(tmp_path / "out"), target_chunk_size_mb=0.5, output_format="m4a")
+
+        mock_probe.assert_called_once()
+        assert mock_split_one.call_count == 1
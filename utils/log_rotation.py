@@ -1,9 +1,11 @@
 import configparser
+import json
 import logging
 import os
 import re
 from datetime import datetime, timedelta
 from logging.handlers import TimedRotatingFileHandler
+from typing import Any
 
 from utils.config_manager import load_config, get_config_value
 
@@ -97,6 +99,11 @@ def cleanup_old_logs(log_directory: str, retention_days: int, project_name: str)
         logging.error(f"ログクリーンアップ処理中にエラーが発生しました: {str(e)}")
 
 
+def log_job_report(report: dict[str, Any]) -> None:
+    """分割ジョブのパフォーマンスレポートを1行の JSON として 'performance' ロガーに出力"""
+    logging.getLogger('performance').info(json.dumps(report, ensure_ascii=False))
+
+
 def setup_debug_logging(config: configparser.ConfigParser | None = None) -> logging.Logger | None:
     if config is None:
         config = load_config()